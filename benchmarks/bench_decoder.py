@@ -0,0 +1,60 @@
+"""
+Compares the throughput of `MessageDecoder` with the naive line by line
+`DatMessage(**json.loads(line))` reader of the text stdin, on a JSON stream of
+record messages.
+
+    python -m benchmarks.bench_decoder --messages 20000 --dims 0
+"""
+import argparse
+import io
+import json
+import time
+from typing import Any, Callable, Dict, Iterable
+from benchmarks.bench_wire_format import build_messages
+from dat_core.pydantic_models import DatMessage
+from dat_core.serialization import MessageDecoder, MessageWriter, WireFormat
+
+
+def naive_reader(stream: io.BytesIO) -> Iterable[DatMessage]:
+    # What connectors do with `for line in sys.stdin`, a text stream
+    for line in io.TextIOWrapper(stream, encoding='utf-8'):
+        yield DatMessage(**json.loads(line))
+
+
+def decoder_reader(stream: io.BytesIO) -> Iterable[DatMessage]:
+    return MessageDecoder().decode(stream)
+
+
+def run(payload: bytes, reader: Callable[[io.BytesIO], Iterable[DatMessage]], repeat: int) -> Dict[str, Any]:
+    best = float('inf')
+    for _ in range(repeat):
+        _start = time.perf_counter()
+        n_messages = sum(1 for _ in reader(io.BytesIO(payload)))
+        best = min(best, time.perf_counter() - _start)
+    return {'msgs_per_s': n_messages / best, 'mb_per_s': len(payload) / best / 1e6}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--messages', type=int, default=20000)
+    parser.add_argument('--dims', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    buffer = io.BytesIO()
+    writer = MessageWriter(buffer, WireFormat.JSON)
+    for message in build_messages(args.messages, args.dims or None):
+        writer.write(message)
+    payload = buffer.getvalue()
+
+    results = {
+        'messages': args.messages,
+        'naive': run(payload, naive_reader, args.repeat),
+        'decoder': run(payload, decoder_reader, args.repeat),
+    }
+    results['speedup'] = results['decoder']['msgs_per_s'] / results['naive']['msgs_per_s']
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
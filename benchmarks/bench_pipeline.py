@@ -0,0 +1,193 @@
+"""
+End-to-end throughput of a sync: a synthetic source read with `SourceBase.read`,
+optionally a fake generator adding vectors, and `DataProcessor.processor` loading into
+an in-memory loader. Like connector processes, the stages are connected by OS pipes
+carrying serialized messages. Every scenario runs in a fresh process so that its peak
+RSS is its own.
+
+Reports the records/sec, the peak RSS and the p50/p99 batch load latency of every
+scenario and compares them with a baseline, exiting with 1 on a regression.
+
+    python -m benchmarks.bench_pipeline
+    python -m benchmarks.bench_pipeline --scenario vectors --wire-format msgpack
+    python -m benchmarks.bench_pipeline --update-baseline
+"""
+import argparse
+import json
+import os
+import resource
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from typing import Any, Dict, Iterable, Iterator, List
+import numpy as np
+from benchmarks.synthetic import FakeGenerator, InMemoryLoader, SyntheticSource
+from dat_core.connectors.destinations.data_processor import DataProcessor
+from dat_core.loggers import logger
+from dat_core.pydantic_models import (
+    ConnectorSpecification,
+    DatCatalog,
+    DatDocumentStream,
+    DatMessage,
+    Level,
+    Type,
+)
+from dat_core.serialization import MessageWriter, WireFormat, read_messages
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), 'baseline.json')
+
+SCENARIOS: Dict[str, Dict[str, Any]] = {
+    # Many small text chunks, bound by the per message overhead
+    'small_chunks': dict(records=20000, chunk_size=200, dims=0, latency=0.0, batch_size=500),
+    # Few large text chunks, bound by the bytes moved
+    'large_chunks': dict(records=4000, chunk_size=8000, dims=0, latency=0.0, batch_size=500),
+    # Records going through the generator, with 1536 dimensions vectors
+    'vectors': dict(records=5000, chunk_size=500, dims=1536, latency=0.0, batch_size=500),
+    # The same records with the buffered records held within 1 MiB
+    'vectors_budget': dict(records=5000, chunk_size=500, dims=1536, latency=0.0, batch_size=500,
+                           memory_budget_bytes=1 << 20),
+    # A destination with a 5 ms round trip per batch
+    'slow_loader': dict(records=5000, chunk_size=500, dims=0, latency=0.005, batch_size=100),
+    # The same destination loading 4 batches at a time
+    'slow_loader_pipelined': dict(records=5000, chunk_size=500, dims=0, latency=0.005, batch_size=100, workers=4),
+    # The same destination with a batch size adapting from 100 up to 1000 records
+    'slow_loader_adaptive': dict(records=5000, chunk_size=500, dims=0, latency=0.005, batch_size=100,
+                                 max_batch_size=1000),
+}
+
+
+def piped(messages: Iterable[DatMessage], wire_format: WireFormat) -> Iterator[DatMessage]:
+    """
+    Writes the messages to a pipe from a thread and yields them as read from the other
+    end, like the stdout of a connector piped to the stdin of the next one.
+    """
+    read_fd, write_fd = os.pipe()
+    errors: List[BaseException] = []
+
+    def produce() -> None:
+        try:
+            with open(write_fd, 'wb') as out:
+                writer = MessageWriter(out, wire_format)
+                for message in messages:
+                    writer.write(message)
+        except BaseException as exc:
+            errors.append(exc)
+
+    producer = threading.Thread(target=produce, daemon=True)
+    producer.start()
+    with open(read_fd, 'rb') as stream:
+        yield from read_messages(stream)
+    producer.join()
+    if errors:
+        raise errors[0]
+
+
+def generated(generator: FakeGenerator, messages: Iterable[DatMessage]) -> Iterator[DatMessage]:
+    for message in messages:
+        if message.type == Type.RECORD:
+            yield from generator.generate(None, message)
+        else:
+            yield message
+
+
+def peak_rss_mb() -> float:
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Bytes on macOS, KiB on Linux
+    return max_rss / (1 << 20) if sys.platform == 'darwin' else max_rss / (1 << 10)
+
+
+def run_scenario(name: str, wire_format: WireFormat, scale: float) -> Dict[str, Any]:
+    """
+    Runs a scenario of `SCENARIOS` and returns its measures.
+    """
+    logger.set_level(Level.WARNING)
+    params = SCENARIOS[name]
+    n_records = max(1, int(params['records'] * scale))
+    config = ConnectorSpecification(
+        name='synthetic', module_name='synthetic', connection_specification={'dat_name': 'synthetic'})
+    catalog = DatCatalog(document_streams=[DatDocumentStream(name='synthetic', namespace='bench')])
+    loader = InMemoryLoader(latency=params['latency'])
+
+    _start = time.perf_counter()
+    messages = piped(SyntheticSource(n_records, params['chunk_size']).read(config, catalog), wire_format)
+    if params['dims']:
+        messages = piped(generated(FakeGenerator(params['dims']), messages), wire_format)
+    processor = DataProcessor(None, loader, params['batch_size'], max_workers=params.get('workers', 1),
+                              max_batch_size=params.get('max_batch_size'),
+                              memory_budget_bytes=params.get('memory_budget_bytes'))
+    for _ in processor.processor(catalog, messages):
+        pass
+    elapsed = time.perf_counter() - _start
+
+    assert loader.n_loaded == n_records, f'{loader.n_loaded} records loaded out of {n_records}'
+    latencies_ms = np.array(loader.batch_latencies) * 1000
+    return {
+        'records': n_records,
+        'records_per_s': round(n_records / elapsed, 1),
+        'peak_rss_mb': round(peak_rss_mb(), 1),
+        'batch_p50_ms': round(float(np.percentile(latencies_ms, 50)), 3),
+        'batch_p99_ms': round(float(np.percentile(latencies_ms, 99)), 3),
+    }
+
+
+def find_regressions(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]],
+                     tolerance: float) -> List[str]:
+    """
+    Returns a description of every scenario slower, or using more memory, than its
+    baseline by more than `tolerance`, e.g. 0.25 for 25%.
+    """
+    regressions = []
+    for name, result in results.items():
+        expected = baseline.get(name)
+        if expected is None or expected['records'] != result['records']:
+            # Not comparable, e.g. run with another --scale
+            continue
+        if result['records_per_s'] < expected['records_per_s'] * (1 - tolerance):
+            regressions.append(
+                f"{name}: {result['records_per_s']} records/s, baseline {expected['records_per_s']}")
+        if result['peak_rss_mb'] > expected['peak_rss_mb'] * (1 + tolerance):
+            regressions.append(
+                f"{name}: {result['peak_rss_mb']} MiB peak RSS, baseline {expected['peak_rss_mb']}")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scenario', action='append', choices=sorted(SCENARIOS),
+                        help='Scenario to run, may be repeated. Defaults to every scenario.')
+    parser.add_argument('--wire-format', type=WireFormat, default=WireFormat.JSON, choices=list(WireFormat))
+    parser.add_argument('--scale', type=float, default=1.0, help='Multiplies the number of records.')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--tolerance', type=float, default=0.25)
+    parser.add_argument('--update-baseline', action='store_true',
+                        help='Store the results as the baseline instead of comparing them.')
+    args = parser.parse_args()
+
+    results = {}
+    for name in args.scenario or SCENARIOS:
+        with ProcessPoolExecutor(max_workers=1, mp_context=get_context('spawn')) as executor:
+            results[name] = executor.submit(run_scenario, name, args.wire_format, args.scale).result()
+        print(f'{name}: {json.dumps(results[name])}', file=sys.stderr)
+
+    baselines: Dict[str, Dict[str, Dict[str, Any]]] = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as _f:
+            baselines = json.load(_f)
+    if args.update_baseline:
+        baselines.setdefault(args.wire_format.value, {}).update(results)
+        with open(args.baseline, 'w') as _f:
+            json.dump(baselines, _f, indent=2, sort_keys=True)
+            _f.write('\n')
+        print(json.dumps(results, indent=2))
+        return
+
+    regressions = find_regressions(results, baselines.get(args.wire_format.value, {}), args.tolerance)
+    print(json.dumps({'results': results, 'regressions': regressions}, indent=2))
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""
+Compares the in-memory `resolve_refs` inliner with the jsonref dumps/loads round trip
+that `SourceBase.discover` used before, on a catalog with dynamic streams.
+
+    python -m benchmarks.bench_schema_resolver --streams 500
+"""
+import argparse
+import copy
+import json
+import time
+from typing import Any, Callable, Dict, List, Literal, Union
+import jsonref
+from pydantic import Field, create_model
+from dat_core.pydantic_models import (
+    CustomGenerateJsonSchema,
+    DatDocumentStream,
+    resolve_refs,
+)
+
+
+def build_catalog_schema(n_streams: int) -> Dict[str, Any]:
+    """
+    Builds the catalog schema of a source with `n_streams` dynamic streams, the same
+    way `SourceBase.discover` does for `_has_dynamic_streams` sources.
+    """
+    stream_classes = [
+        create_model(
+            f'Stream{idx}',
+            __base__=DatDocumentStream,
+            name=(Literal[f'stream_{idx}'], Field(f'stream_{idx}')),
+            namespace=(str, Field(f'namespace_{idx}')),
+        )
+        for idx in range(n_streams)
+    ]
+    catalog_class = create_model(
+        'GenericCatalog',
+        document_streams=(List[Union[tuple(stream_classes)]], ...),
+    )
+    return catalog_class.model_json_schema(schema_generator=CustomGenerateJsonSchema)
+
+
+def post_process(resolved: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    The splitter settings rewrite done by `SourceBase.discover` on the resolved schema.
+    """
+    for doc_stream in resolved['properties']['document_streams']['items']['anyOf']:
+        splitter_settings = doc_stream['properties']['advanced']['properties']['splitter_settings']
+        if 'anyOf' in splitter_settings:
+            splitter_settings['oneOf'] = splitter_settings['anyOf'].copy()
+            del splitter_settings['anyOf']
+    return resolved
+
+
+def jsonref_path(schema: Dict[str, Any]) -> Dict[str, Any]:
+    return post_process(jsonref.loads(jsonref.dumps(schema)))
+
+
+def resolve_refs_path(schema: Dict[str, Any]) -> Dict[str, Any]:
+    return post_process(resolve_refs(schema))
+
+
+def timeit(func: Callable[[], Any], repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        _start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - _start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--streams', type=int, default=500)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    schema = build_catalog_schema(args.streams)
+    # Both paths must produce the same document
+    assert json.dumps(copy.deepcopy(jsonref_path(schema)), sort_keys=True) == \
+        json.dumps(resolve_refs_path(schema), sort_keys=True)
+
+    results = {
+        'streams': args.streams,
+        # Resolving and rewriting the splitter settings
+        'jsonref_resolve_s': timeit(lambda: jsonref_path(schema), args.repeat),
+        'resolve_refs_resolve_s': timeit(lambda: resolve_refs_path(schema), args.repeat),
+        # Resolving and then walking the whole document into plain dicts
+        'jsonref_resolve_walk_s': timeit(lambda: copy.deepcopy(jsonref_path(schema)), args.repeat),
+        'resolve_refs_resolve_walk_s': timeit(lambda: copy.deepcopy(resolve_refs_path(schema)), args.repeat),
+    }
+    results['speedup_resolve'] = results['jsonref_resolve_s'] / results['resolve_refs_resolve_s']
+    results['speedup_resolve_walk'] = results['jsonref_resolve_walk_s'] / results['resolve_refs_resolve_walk_s']
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
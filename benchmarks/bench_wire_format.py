@@ -0,0 +1,79 @@
+"""
+Compares the messages/sec of the JSON and msgpack wire formats, writing and then
+reading back record messages with and without vectors.
+
+    python -m benchmarks.bench_wire_format --messages 20000 --dims 1536
+"""
+import argparse
+import io
+import json
+import time
+from typing import Any, Dict, List, Optional
+import numpy as np
+from dat_core.pydantic_models import (
+    Data,
+    DatDocumentMessage,
+    DatDocumentStream,
+    DatMessage,
+    StreamMetadata,
+    Type,
+)
+from dat_core.serialization import MessageWriter, WireFormat, read_messages
+
+
+def build_messages(n_messages: int, dims: Optional[int]) -> List[DatMessage]:
+    rng = np.random.default_rng(0)
+    stream = DatDocumentStream(name='docs', namespace='ns')
+    return [
+        DatMessage(type=Type.RECORD, record=DatDocumentMessage(
+            namespace='ns',
+            stream=stream,
+            data=Data(
+                document_chunk=f'chunk {idx} ' * 20,
+                vectors=rng.random(dims, dtype=np.float32) if dims else None,
+                metadata=StreamMetadata(
+                    dat_source='src', dat_stream='docs', dat_run_id='run',
+                    dat_record_id=str(idx), dat_last_modified=idx),
+            ),
+        ))
+        for idx in range(n_messages)
+    ]
+
+
+def run(messages: List[DatMessage], wire_format: WireFormat) -> Dict[str, Any]:
+    buffer = io.BytesIO()
+    writer = MessageWriter(buffer, wire_format)
+    _start = time.perf_counter()
+    for message in messages:
+        writer.write(message)
+    encode_s = time.perf_counter() - _start
+
+    buffer.seek(0)
+    _start = time.perf_counter()
+    n_read = sum(1 for _ in read_messages(buffer))
+    decode_s = time.perf_counter() - _start
+    assert n_read == len(messages)
+    return {
+        'bytes_per_message': len(buffer.getvalue()) / len(messages),
+        'encode_msgs_per_s': len(messages) / encode_s,
+        'decode_msgs_per_s': len(messages) / decode_s,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--messages', type=int, default=20000)
+    parser.add_argument('--dims', type=int, default=1536)
+    args = parser.parse_args()
+
+    results = {}
+    for label, dims in (('text_only', None), (f'vectors_{args.dims}', args.dims)):
+        messages = build_messages(args.messages, dims)
+        results[label] = {
+            wire_format.value: run(messages, wire_format) for wire_format in WireFormat
+        }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
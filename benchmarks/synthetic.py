@@ -0,0 +1,135 @@
+"""
+Synthetic connectors for the benchmarks: a source streaming generated documents, a
+deterministic fake generator and an in-memory loader with injectable latency.
+"""
+import threading
+import time
+import zlib
+from typing import Any, Dict, Generator, Iterator, List, Mapping, Optional, Tuple
+import numpy as np
+from dat_core.connectors.destinations.loader import Loader
+from dat_core.connectors.generators.base import GeneratorBase
+from dat_core.connectors.sources.base import SourceBase
+from dat_core.connectors.sources.stream import Stream
+from dat_core.pydantic_models import (
+    ConnectorSpecification,
+    DatCatalog,
+    DatDocumentMessage,
+    DatDocumentStream,
+    DatMessage,
+)
+
+_WORDS = (
+    'lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor '
+    'incididunt ut labore et dolore magna aliqua'
+).split()
+
+
+def make_document_chunk(idx: int, chunk_size: int) -> str:
+    """
+    Returns a deterministic text of `chunk_size` characters for the `idx`-th record.
+    """
+    words = []
+    length = 0
+    position = idx
+    while length < chunk_size:
+        word = _WORDS[position % len(_WORDS)]
+        words.append(word)
+        length += len(word) + 1
+        position += 7
+    return ' '.join(words)[:chunk_size]
+
+
+class SyntheticStream(Stream):
+    """
+    Stream of `n_records` generated documents of `chunk_size` characters each.
+    """
+    _name = 'synthetic'
+
+    def __init__(self, config: ConnectorSpecification, n_records: int, chunk_size: int) -> None:
+        self._config = config
+        self.n_records = n_records
+        self.chunk_size = chunk_size
+
+    def read_records(self, catalog: DatCatalog, configured_stream: DatDocumentStream,
+                     cursor_value: Any = None) -> Generator[DatMessage, Any, Any]:
+        for idx in range(self.n_records):
+            yield self.as_record_message(
+                configured_stream,
+                make_document_chunk(idx, self.chunk_size),
+                f'synthetic/{idx // 100}.txt',
+                dat_last_modified=idx + 1,
+                extra_metadata={'dat_record_id': str(idx)},
+            )
+
+
+class SyntheticSource(SourceBase):
+    """
+    Source with a single `SyntheticStream`.
+    """
+
+    def __init__(self, n_records: int, chunk_size: int) -> None:
+        self.n_records = n_records
+        self.chunk_size = chunk_size
+
+    def check_connection(self, config: ConnectorSpecification) -> Tuple[bool, Optional[Any]]:
+        return True, None
+
+    def streams(self, config: Mapping[str, Any], json_schemas: Mapping[str, Mapping[str, Any]] = None) -> List[Stream]:
+        return [SyntheticStream(config, self.n_records, self.chunk_size)]
+
+
+class FakeGenerator(GeneratorBase):
+    """
+    Generator attaching a float32 vector of `dims` dimensions to every record, the same
+    vector for the same document chunk.
+    """
+
+    def __init__(self, dims: int) -> None:
+        super().__init__()
+        self.dims = dims
+
+    def check_connection(self, config: ConnectorSpecification) -> Tuple[bool, Optional[Any]]:
+        return True, None
+
+    def generate(self, config: ConnectorSpecification, dat_message: DatMessage) -> Iterator[DatMessage]:
+        data = dat_message.record.data
+        rng = np.random.default_rng(zlib.crc32(data.document_chunk.encode()))
+        data.vectors = rng.random(self.dims, dtype=np.float32)
+        yield dat_message
+
+
+class InMemoryLoader(Loader):
+    """
+    Loader counting the loaded records, sleeping `latency` seconds per batch to stand in
+    for the round trip to a vector database. The duration of every `load` call is
+    recorded in `batch_latencies`. Batches may be loaded from several threads.
+    """
+
+    def __init__(self, latency: float = 0.0) -> None:
+        super().__init__(None)
+        self.latency = latency
+        self.n_loaded = 0
+        self.batch_latencies: List[float] = []
+        self._lock = threading.Lock()
+
+    def load(self, document_chunks: List[DatDocumentMessage], namespace: str, stream: str) -> None:
+        _start = time.perf_counter()
+        if self.latency:
+            time.sleep(self.latency)
+        elapsed = time.perf_counter() - _start
+        with self._lock:
+            self.n_loaded += len(document_chunks)
+            self.batch_latencies.append(elapsed)
+
+    def delete(self, filter: Any, namespace: str) -> None:
+        pass
+
+    def check(self) -> Optional[str]:
+        return None
+
+    def initiate_sync(self, configured_catalog: DatCatalog) -> None:
+        pass
+
+    def prepare_metadata_filter(self, filter: Dict[str, Any]) -> Any:
+        return filter
@@ -1,12 +1,13 @@
 from abc import ABC, abstractmethod
 from typing import (Any, Dict, Optional, Tuple)
-import jsonref
 from dat_core.pydantic_models import (
     CustomGenerateJsonSchema,
+    resolve_refs,
     ConnectorSpecification,
     DatConnectionStatus,
     Status,
 )
+from dat_core.connectors.schema_cache import schema_cache, schema_cache_key
 
 
 class ConnectorBase(ABC):
@@ -29,10 +30,20 @@ class ConnectorBase(ABC):
 
     def spec(self) -> Dict:
         """
-        Will return source specification
+        Will return source specification. The resolved schema is cached per
+        specification class, see `SchemaCache`.
+        """
+        return schema_cache.get_or_build(
+            schema_cache_key('spec', self._spec_class),
+            self._build_spec,
+        )
+
+    def _build_spec(self) -> Dict:
+        """
+        Generates the specification schema and resolves its $refs
         """
         _spec = self._spec_class.model_json_schema(schema_generator=CustomGenerateJsonSchema)
-        _resolved_spec =  jsonref.loads(jsonref.dumps(_spec))
+        _resolved_spec = resolve_refs(_spec)
         # _conn_spec = _resolved_spec['properties']['connection_specification']
         # for _schema in _conn_spec['allOf']:
         #     for k,v in _schema.items():
@@ -41,7 +52,17 @@ class ConnectorBase(ABC):
         # del _resolved_spec['$defs']
         return _resolved_spec
 
+    def write_schema_cache(self, directory: str) -> None:
+        """
+        Precomputes the schemas of this connector, e.g. at image build time, and writes them
+        to `directory`. Point the `DAT_SCHEMA_CACHE_DIR` environment variable to it so that
+        they are loaded at startup instead of being generated.
 
+        Args:
+            directory (str): The directory to write the schemas to.
+        """
+        self.spec()
+        schema_cache.dump(directory)
 
     def check(self, config: ConnectorSpecification) -> DatConnectionStatus:
         """
@@ -0,0 +1,195 @@
+import hashlib
+import os
+import sqlite3
+import threading
+from typing import Iterable, Iterator, Optional, Set, Tuple
+from dat_core.metrics import metrics
+from dat_core.pydantic_models import (
+    DatCatalog,
+    DatDocumentMessage,
+    DatMessage,
+    DatRecordBatchMessage,
+    Type,
+    WriteSyncMode,
+)
+
+# Environment variable with the directory of the state kept between runs, e.g. the content hash index
+STATE_DIR_ENV = 'DAT_STATE_DIR'
+CONTENT_HASH_INDEX_FILE = 'content_hashes.sqlite'
+
+# (dat_source, dat_stream, dat_record_id)
+RecordKey = Tuple[str, str, str]
+
+
+def content_hash(document_chunk: Optional[str]) -> str:
+    """
+    Returns the hash of a document chunk stored in the `ContentHashIndex`.
+    """
+    return hashlib.blake2b((document_chunk or '').encode(), digest_size=16).hexdigest()
+
+
+def record_key(record: DatDocumentMessage) -> RecordKey:
+    metadata = record.data.metadata
+    return metadata.dat_source, metadata.dat_stream, metadata.dat_record_id
+
+
+class ContentHashIndex:
+    """
+    A SQLite table mapping every (dat_source, dat_stream, dat_record_id) loaded to a
+    destination to the hash of its document chunk, kept between runs so that the chunks
+    that did not change can be skipped, see `ContentHashFilter`.
+
+    Args:
+        path (str): The SQLite file, created if needed.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        # Records are loaded, and their hashes stored, from the loader threads
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._connection:
+            self._connection.execute('PRAGMA journal_mode=WAL')
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS content_hashes ('
+                'dat_source TEXT NOT NULL, dat_stream TEXT NOT NULL, dat_record_id TEXT NOT NULL, '
+                'hash TEXT NOT NULL, PRIMARY KEY (dat_source, dat_stream, dat_record_id))'
+            )
+
+    @classmethod
+    def from_env(cls) -> Optional['ContentHashIndex']:
+        """
+        Returns the index of the `DAT_STATE_DIR` directory, None if the variable is not set.
+        """
+        state_dir = os.environ.get(STATE_DIR_ENV)
+        if not state_dir:
+            return None
+        os.makedirs(state_dir, exist_ok=True)
+        return cls(os.path.join(state_dir, CONTENT_HASH_INDEX_FILE))
+
+    def get(self, key: RecordKey) -> Optional[str]:
+        """
+        Returns the hash of the chunk last stored for a record, None if there is none.
+        """
+        with self._lock:
+            row = self._connection.execute(
+                'SELECT hash FROM content_hashes WHERE dat_source = ? AND dat_stream = ? AND dat_record_id = ?',
+                key,
+            ).fetchone()
+        return row[0] if row is not None else None
+
+    def update(self, entries: Iterable[Tuple[RecordKey, str]]) -> None:
+        """
+        Stores the hashes of loaded records, in a single transaction.
+
+        Args:
+            entries (Iterable[Tuple[RecordKey, str]]): The key and hash of every record.
+        """
+        with self._lock, self._connection:
+            self._connection.executemany(
+                'INSERT OR REPLACE INTO content_hashes (dat_source, dat_stream, dat_record_id, hash) '
+                'VALUES (?, ?, ?, ?)',
+                [(*key, hash_) for key, hash_ in entries],
+            )
+
+    def update_records(self, records: Iterable[DatDocumentMessage]) -> None:
+        """
+        Stores the hashes of loaded records.
+        """
+        self.update((record_key(record), content_hash(record.data.document_chunk)) for record in records)
+
+    def update_record_batch(self, record_batch: DatRecordBatchMessage) -> None:
+        """
+        Stores the hashes of the records of a loaded batch.
+        """
+        self.update(zip(_record_batch_keys(record_batch), map(content_hash, record_batch.document_chunks)))
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+
+def _record_batch_keys(record_batch: DatRecordBatchMessage) -> Iterator[RecordKey]:
+    return zip(record_batch.metadata['dat_source'], record_batch.metadata['dat_stream'], record_batch.ids)
+
+
+class ContentHashFilter:
+    """
+    Drops the records whose document chunk has the same hash as the version of the record
+    stored in a `ContentHashIndex`, so that an incremental run re-emitting whole documents
+    only embeds and loads the chunks that changed. Skipped records are counted by the
+    `content_hash_skipped_records` counter.
+
+    The filter only reads the index: the hashes are stored by `DataProcessor` once the
+    records are loaded, so that a record failing to load is not skipped by the next run.
+    It can run before the generator, with the index of the destination, and in the
+    destination itself.
+
+    Only the records of APPEND streams are dropped. The destination of a REPLACE stream
+    is emptied at every run. An UPSERT stream deletes the previous version of every
+    `dat_record_id` it loads, which would take the dropped chunks of a document along with
+    the changed chunk sharing their `dat_record_id`.
+
+    Args:
+        index (ContentHashIndex): The hashes of the loaded records.
+        configured_catalog (Optional[DatCatalog], optional): The catalog, for the write
+            sync modes of the streams. Defaults to None, dropping records of any stream.
+    """
+
+    def __init__(self, index: ContentHashIndex, configured_catalog: Optional[DatCatalog] = None) -> None:
+        self.index = index
+        # Streams whose records are loaded whatever their hash
+        self._unfiltered_streams: Set[Tuple[Optional[str], str]] = set()
+        if configured_catalog is not None:
+            self._unfiltered_streams = {
+                (stream.namespace, stream.name) for stream in configured_catalog.document_streams
+                if stream.write_sync_mode != WriteSyncMode.APPEND.name
+            }
+
+    def _is_unchanged(self, key: RecordKey, document_chunk: Optional[str]) -> bool:
+        return self.index.get(key) == content_hash(document_chunk)
+
+    def is_unchanged(self, record: DatDocumentMessage) -> bool:
+        """
+        True if the record should be skipped: its chunk is the one already loaded.
+        """
+        if (record.namespace, record.stream.name) in self._unfiltered_streams:
+            return False
+        if not self._is_unchanged(record_key(record), record.data.document_chunk):
+            return False
+        metrics.counter('content_hash_skipped_records', stream=record.stream.name).inc()
+        return True
+
+    def filter_record_batch(self, record_batch: DatRecordBatchMessage) -> Optional[DatRecordBatchMessage]:
+        """
+        Returns the batch without its unchanged records, None if none changed.
+        """
+        if (record_batch.namespace, record_batch.stream.name) in self._unfiltered_streams:
+            return record_batch
+        changed = [
+            idx for idx, (key, document_chunk) in
+            enumerate(zip(_record_batch_keys(record_batch), record_batch.document_chunks))
+            if not self._is_unchanged(key, document_chunk)
+        ]
+        n_skipped = len(record_batch) - len(changed)
+        if n_skipped:
+            metrics.counter('content_hash_skipped_records', stream=record_batch.stream.name).inc(n_skipped)
+        if not changed:
+            return None
+        return record_batch if not n_skipped else record_batch.take(changed)
+
+    def filter(self, messages: Iterable[DatMessage]) -> Iterator[DatMessage]:
+        """
+        Passes the messages through without the unchanged records, e.g. before the generator.
+        """
+        for message in messages:
+            if message.type == Type.RECORD:
+                if self.is_unchanged(message.record):
+                    continue
+            elif message.type == Type.RECORD_BATCH:
+                record_batch = self.filter_record_batch(message.record_batch)
+                if record_batch is None:
+                    continue
+                if record_batch is not message.record_batch:
+                    message = DatMessage(type=Type.RECORD_BATCH, record_batch=record_batch)
+            yield message
@@ -0,0 +1,421 @@
+import struct
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Hashable, Iterator, List, Optional, Tuple
+from dat_core.metrics import metrics
+from dat_core.pydantic_models import DatMessage, Type
+from dat_core.serialization import LazyDatMessage, WireFormat, encode_msgpack
+
+# Default number of payload bytes buffered per stream before a flush
+DEFAULT_MAX_BATCH_BYTES = 16 * 1024 * 1024
+# Default number of seconds a record may wait in a buffer before a flush
+DEFAULT_MAX_LINGER_SECONDS = 30.0
+# Default number of seconds a load may take before the adaptive batch size decreases
+DEFAULT_TARGET_LOAD_SECONDS = 2.0
+# Fraction of a full batch a buffer must hold to be flushed early to stay within a memory
+# budget, emptier buffers are spilled to disk instead
+DEFAULT_MIN_FORCED_FLUSH_FILL = 0.25
+# Bytes counted for a metadata value that is not a string
+_METADATA_VALUE_SIZE = 8
+
+
+def _metadata_size(metadata: Any) -> int:
+    values = list(vars(metadata).values()) + list((metadata.model_extra or {}).values())
+    return sum(len(value) if isinstance(value, str) else _METADATA_VALUE_SIZE
+               for value in values if value is not None)
+
+
+def record_payload_size(message: DatMessage) -> int:
+    """
+    Estimates the payload bytes of a record message: the length of the raw message for
+    a `LazyDatMessage`, else the length of the document chunk plus the vector bytes plus
+    the length of the metadata values.
+    """
+    if isinstance(message, LazyDatMessage) and not message.is_materialized:
+        return len(message.raw)
+    data = message.record.data
+    nbytes = len(data.document_chunk) if data.document_chunk else 0
+    if data.vectors is not None:
+        nbytes += getattr(data.vectors, 'nbytes', 0) or 4 * len(data.vectors)
+    if data.metadata is not None:
+        nbytes += _metadata_size(data.metadata)
+    return nbytes
+
+
+class BatchPolicy:
+    """
+    Decides when the buffered records of a stream are flushed. A flush is due as soon as
+    any of the configured limits has been reached.
+
+    Args:
+        max_records (int): Number of records per batch.
+        max_bytes (Optional[int], optional): Number of payload bytes per batch. Defaults to None.
+        max_linger_seconds (Optional[float], optional): Seconds the first record of a batch
+            may wait. Defaults to None.
+    """
+
+    def __init__(self,
+        max_records: int,
+        max_bytes: Optional[int] = None,
+        max_linger_seconds: Optional[float] = None,
+    ) -> None:
+        self.max_records = max_records
+        self.max_bytes = max_bytes
+        self.max_linger_seconds = max_linger_seconds
+
+    def is_due(self, records: int, nbytes: int, max_records: Optional[int] = None) -> bool:
+        """
+        Args:
+            records (int): Records in the batch.
+            nbytes (int): Payload bytes in the batch.
+            max_records (Optional[int], optional): Number of records per batch of this
+                stream, instead of the policy's. Defaults to None.
+
+        Returns:
+            bool: True if the batch is full.
+        """
+        if records >= (max_records or self.max_records):
+            return True
+        if self.max_bytes and nbytes >= self.max_bytes:
+            return True
+        return False
+
+
+class AdaptiveBatchSize:
+    """
+    Adjusts the number of records per batch of every (namespace, stream) from the duration
+    and outcome of its loads, with additive increase and multiplicative decrease (AIMD): a
+    full batch loaded within `target_seconds` grows the batch size of its stream by
+    `increase_step` records, while a slower or failed load multiplies it by
+    `decrease_factor`. The batch size of a stream thus settles just below the size its
+    destination starts to struggle with. The sizes stay within `min_size` and `max_size`
+    and are reported by the `destination_batch_size` gauge.
+
+    Args:
+        initial_size (int): Batch size of a stream before its first load.
+        min_size (int, optional): Smallest batch size. Defaults to 1.
+        max_size (Optional[int], optional): Largest batch size. Defaults to None, no limit.
+        target_seconds (float, optional): Longest acceptable load. Defaults to 2.
+        increase_step (Optional[int], optional): Records added after a fast load. Defaults
+            to a tenth of `initial_size`.
+        decrease_factor (float, optional): Factor applied after a slow or failed load.
+            Defaults to 0.5.
+
+    Raises:
+        ValueError: If `max_size` is smaller than `min_size` or `decrease_factor` is not
+            between 0 and 1.
+    """
+
+    def __init__(self,
+        initial_size: int,
+        min_size: int = 1,
+        max_size: Optional[int] = None,
+        target_seconds: float = DEFAULT_TARGET_LOAD_SECONDS,
+        increase_step: Optional[int] = None,
+        decrease_factor: float = 0.5,
+    ) -> None:
+        if max_size is not None and max_size < min_size:
+            raise ValueError(f'max_size {max_size} is smaller than min_size {min_size}')
+        if not 0 < decrease_factor < 1:
+            raise ValueError(f'decrease_factor {decrease_factor} is not between 0 and 1')
+        self.min_size = max(1, min_size)
+        self.max_size = max_size
+        self.initial_size = self._clamp(initial_size)
+        self.target_seconds = target_seconds
+        self.increase_step = increase_step or max(1, self.initial_size // 10)
+        self.decrease_factor = decrease_factor
+        self._sizes: Dict[Tuple[str, str], int] = {}
+        # Loads may be observed from the loader threads
+        self._lock = threading.Lock()
+
+    def _clamp(self, size: int) -> int:
+        size = max(self.min_size, size)
+        return min(self.max_size, size) if self.max_size is not None else size
+
+    def size(self, key: Tuple[str, str]) -> int:
+        """
+        The current batch size of the stream `key`, a (namespace, stream) tuple.
+        """
+        size = self._sizes.get(key)
+        if size is None:
+            size = self._set(key, self.initial_size)
+        return size
+
+    def _set(self, key: Tuple[str, str], size: int) -> int:
+        with self._lock:
+            self._sizes[key] = size
+        metrics.gauge('destination_batch_size', namespace=key[0], stream=key[1]).set(size)
+        return size
+
+    def record_success(self, key: Tuple[str, str], n_records: int, seconds: float) -> None:
+        """
+        Adjusts the batch size of a stream after a batch of `n_records` records was loaded
+        in `seconds`. Only a full batch grows the size: a partial one, flushed by the
+        linger time or at the end of a sync, says nothing about larger batches.
+        """
+        size = self.size(key)
+        if seconds > self.target_seconds:
+            self._set(key, self._clamp(int(size * self.decrease_factor)))
+        elif n_records >= size:
+            self._set(key, self._clamp(size + self.increase_step))
+
+    def record_failure(self, key: Tuple[str, str]) -> None:
+        """
+        Decreases the batch size of a stream after a load failed, e.g. timed out.
+        """
+        self._set(key, self._clamp(int(self.size(key) * self.decrease_factor)))
+
+    @contextmanager
+    def observe(self, key: Tuple[str, str], n_records: int) -> Iterator[None]:
+        """
+        Times the load of a batch of `n_records` records of the stream `key` in the `with`
+        block and adjusts the batch size of the stream. Errors are passed through.
+        """
+        _start = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self.record_failure(key)
+            raise
+        self.record_success(key, n_records, time.perf_counter() - _start)
+
+
+class _SpillFile:
+    """
+    A temporary file holding buffered records out of memory. The records are written as
+    they were received if they were not materialized, else as msgpack, and are read back
+    as `LazyDatMessage`s. The file is deleted once closed.
+    """
+    _FRAME = struct.Struct('>?I')
+
+    def __init__(self) -> None:
+        self._file = tempfile.TemporaryFile(prefix='dat-spill-')
+        self.nbytes = 0
+
+    def write(self, messages: List[DatMessage]) -> int:
+        """
+        Appends records and returns the offset to read them back from.
+        """
+        offset = self._file.seek(0, 2)
+        frames = []
+        for message in messages:
+            if isinstance(message, LazyDatMessage) and not message.is_materialized:
+                is_json, payload = message.wire_format == WireFormat.JSON, message.raw
+            else:
+                is_json, payload = False, encode_msgpack(message)
+            frames.append(self._FRAME.pack(is_json, len(payload)) + payload)
+        data = b''.join(frames)
+        self._file.write(data)
+        self.nbytes += len(data)
+        return offset
+
+    def read(self, offset: int, count: int) -> List[LazyDatMessage]:
+        """
+        Reads back `count` records written at `offset`.
+        """
+        self._file.seek(offset)
+        messages = []
+        for _ in range(count):
+            is_json, length = self._FRAME.unpack(self._file.read(self._FRAME.size))
+            wire_format = WireFormat.JSON if is_json else WireFormat.MSGPACK
+            messages.append(LazyDatMessage(self._file.read(length), wire_format, Type.RECORD))
+        return messages
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class _StreamBuffer:
+
+    def __init__(self, created_at: float) -> None:
+        self.messages: List[DatMessage] = []
+        self.nbytes = 0
+        self.created_at = created_at
+        # Offset and number of the records of the buffer in the spill file, written before `messages`
+        self.spilled: List[Tuple[int, int]] = []
+        self.n_spilled = 0
+        self.spilled_nbytes = 0
+
+    def __len__(self) -> int:
+        return self.n_spilled + len(self.messages)
+
+    @property
+    def memory_nbytes(self) -> int:
+        return self.nbytes - self.spilled_nbytes
+
+
+BatchKey = Hashable
+
+
+class StreamBatcher:
+    """
+    Buffers record messages per stream and hands out a stream's batch as soon as it is
+    full for the `BatchPolicy`, whatever the other streams hold. The input never needs to
+    be materialized: memory is bounded by the policy limits times the number of streams,
+    and can be bounded overall with `enforce_budget`.
+
+    Args:
+        policy (BatchPolicy): When a batch is full.
+        size_of (Callable[[DatMessage], int], optional): Payload bytes of a record. Defaults
+            to `record_payload_size`.
+        clock (Callable[[], float], optional): Monotonic clock. Defaults to time.monotonic.
+        max_records_of (Optional[Callable[[BatchKey], int]], optional): Number of records
+            per batch of a stream, e.g. `AdaptiveBatchSize.size`, instead of the policy's.
+            Defaults to None.
+    """
+
+    def __init__(self,
+        policy: BatchPolicy,
+        size_of: Callable[[DatMessage], int] = record_payload_size,
+        clock: Callable[[], float] = time.monotonic,
+        max_records_of: Optional[Callable[[BatchKey], int]] = None,
+    ) -> None:
+        self._policy = policy
+        self._size_of = size_of
+        self._clock = clock
+        self._max_records_of = max_records_of
+        self._buffers: Dict[BatchKey, _StreamBuffer] = {}
+        # Earliest time a buffer lingers for too long, None when nothing is buffered
+        self._next_deadline: Optional[float] = None
+        # Payload bytes of the records buffered in memory
+        self._memory_nbytes = 0
+        self._spill_file: Optional[_SpillFile] = None
+
+    def __contains__(self, key: BatchKey) -> bool:
+        return key in self._buffers
+
+    def __len__(self) -> int:
+        """
+        The number of buffered records.
+        """
+        return sum(len(buffer) for buffer in self._buffers.values())
+
+    @property
+    def nbytes(self) -> int:
+        """
+        The number of payload bytes of the records buffered in memory, i.e. not spilled.
+        """
+        return self._memory_nbytes
+
+    @property
+    def spilled_nbytes(self) -> int:
+        """
+        The number of bytes written to the spill file so far.
+        """
+        return self._spill_file.nbytes if self._spill_file is not None else 0
+
+    def _max_records(self, key: BatchKey) -> int:
+        return self._max_records_of(key) if self._max_records_of is not None else self._policy.max_records
+
+    def add(self, key: BatchKey, message: DatMessage) -> Optional[List[DatMessage]]:
+        """
+        Buffers a record of the stream `key`.
+
+        Returns:
+            Optional[List[DatMessage]]: The batch of the stream if it is now full, else None.
+        """
+        buffer = self._buffers.get(key)
+        if buffer is None:
+            buffer = self._buffers[key] = _StreamBuffer(self._clock())
+            if self._policy.max_linger_seconds is not None:
+                deadline = buffer.created_at + self._policy.max_linger_seconds
+                if self._next_deadline is None or deadline < self._next_deadline:
+                    self._next_deadline = deadline
+        nbytes = self._size_of(message)
+        buffer.messages.append(message)
+        buffer.nbytes += nbytes
+        self._memory_nbytes += nbytes
+        max_records = self._max_records_of(key) if self._max_records_of is not None else None
+        if self._policy.is_due(len(buffer), buffer.nbytes, max_records):
+            return self.pop(key)
+        return None
+
+    def _take(self, buffer: _StreamBuffer) -> List[DatMessage]:
+        """
+        Returns the records of a removed buffer, reading back the spilled ones first.
+        """
+        self._memory_nbytes -= buffer.memory_nbytes
+        if not buffer.spilled:
+            return buffer.messages
+        messages: List[DatMessage] = []
+        for offset, count in buffer.spilled:
+            messages += self._spill_file.read(offset, count)
+        return messages + buffer.messages
+
+    def pop(self, key: BatchKey) -> Optional[List[DatMessage]]:
+        """
+        Removes and returns the buffered records of a stream, None if there are none.
+        """
+        buffer = self._buffers.pop(key, None)
+        return self._take(buffer) if buffer is not None else None
+
+    def expired(self) -> List[Tuple[BatchKey, List[DatMessage]]]:
+        """
+        Removes and returns the batches whose first record was buffered more than
+        `max_linger_seconds` ago. Cheap to call for every message.
+        """
+        if self._next_deadline is None:
+            return []
+        now = self._clock()
+        if now < self._next_deadline:
+            return []
+        linger = self._policy.max_linger_seconds
+        expired_keys = [key for key, buffer in self._buffers.items() if now >= buffer.created_at + linger]
+        batches = [(key, self._take(self._buffers.pop(key))) for key in expired_keys]
+        self._next_deadline = min(
+            (buffer.created_at + linger for buffer in self._buffers.values()), default=None)
+        return batches
+
+    def enforce_budget(self,
+        max_nbytes: int,
+        min_fill: float = DEFAULT_MIN_FORCED_FLUSH_FILL,
+    ) -> List[Tuple[BatchKey, List[DatMessage]]]:
+        """
+        Brings the payload bytes buffered in memory down to `max_nbytes`, starting with the
+        stream holding the most. A stream holding at least `min_fill` of a full batch is
+        flushed early: its batch is removed and returned. As a last resort, the records of
+        an emptier stream are spilled to a temporary file, and read back once its batch is
+        full, so that many streams each holding a few records do not end up loaded in
+        tiny batches.
+
+        Args:
+            max_nbytes (int): The memory budget of the buffers.
+            min_fill (float, optional): The fraction of a full batch, in records, a buffer
+                must hold to be flushed early. Defaults to 0.25.
+
+        Returns:
+            List[Tuple[BatchKey, List[DatMessage]]]: The batches flushed early.
+        """
+        batches = []
+        while self._memory_nbytes > max_nbytes:
+            key, buffer = max(self._buffers.items(), key=lambda item: item[1].memory_nbytes)
+            if len(buffer) >= min_fill * self._max_records(key):
+                batches.append((key, self.pop(key)))
+                continue
+            if self._spill_file is None:
+                self._spill_file = _SpillFile()
+            buffer.spilled.append((self._spill_file.write(buffer.messages), len(buffer.messages)))
+            buffer.n_spilled += len(buffer.messages)
+            self._memory_nbytes -= buffer.memory_nbytes
+            buffer.spilled_nbytes = buffer.nbytes
+            buffer.messages = []
+        return batches
+
+    def drain(self) -> List[Tuple[BatchKey, List[DatMessage]]]:
+        """
+        Removes and returns every buffered batch, in the order the streams were first buffered.
+        """
+        batches = [(key, self._take(buffer)) for key, buffer in self._buffers.items()]
+        self._buffers.clear()
+        self._next_deadline = None
+        return batches
+
+    def close(self) -> None:
+        """
+        Deletes the spill file, once every batch is removed.
+        """
+        if self._spill_file is not None:
+            self._spill_file.close()
+            self._spill_file = None
@@ -0,0 +1,102 @@
+import threading
+from typing import Any, Dict, List, Optional
+import numpy as np
+from dat_core.pydantic_models import DatDocumentMessage, DatRecordBatchMessage
+
+
+def _metadata_dict(metadata: Any) -> Dict[str, Any]:
+    # Reads the fields straight from the model, much cheaper than model_dump
+    return {**vars(metadata), **(metadata.model_extra or {})}
+
+
+class ColumnBatch:
+    """
+    The records of a batch as columns, as passed to `Loader.load_batch`.
+
+    Attributes:
+        ids (List[str]): The `dat_record_id` of every record.
+        vectors (Optional[np.ndarray]): The vectors as a C-contiguous float32 matrix, one row
+            per record, None if the records have no vectors. The matrix may be a view of a
+            buffer reused for the next batches: loaders keeping it past `load_batch` must
+            copy it.
+        texts (List[Optional[str]]): The document chunk of every record.
+        metadata (List[Dict[str, Any]]): The metadata of every record, `dat_record_id`
+            included.
+    """
+
+    __slots__ = ('ids', 'vectors', 'texts', 'metadata')
+
+    def __init__(self,
+        ids: List[str],
+        vectors: Optional[np.ndarray],
+        texts: List[Optional[str]],
+        metadata: List[Dict[str, Any]],
+    ) -> None:
+        self.ids = ids
+        self.vectors = vectors
+        self.texts = texts
+        self.metadata = metadata
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @classmethod
+    def from_record_batch(cls, record_batch: DatRecordBatchMessage) -> 'ColumnBatch':
+        """
+        Builds the columns of a RECORD_BATCH message, sharing its vector matrix if it is
+        already float32.
+        """
+        names = list(record_batch.metadata)
+        metadata = [dict(zip(names, values)) for values in zip(*record_batch.metadata.values())] \
+            if names else [{} for _ in record_batch.ids]
+        for row, record_id in zip(metadata, record_batch.ids):
+            row['dat_record_id'] = record_id
+        vectors = None
+        if record_batch.vectors is not None:
+            vectors = np.ascontiguousarray(record_batch.vectors, dtype=np.float32)
+        return cls(list(record_batch.ids), vectors, list(record_batch.document_chunks), metadata)
+
+
+class ColumnBuilder:
+    """
+    Builds the `ColumnBatch` of lists of records, copying their vectors into a float32
+    buffer kept per thread and reused for the next batches, so that loading does not
+    allocate a new matrix for every batch. The vectors of a batch are valid until the next
+    batch is built on the same thread.
+    """
+
+    def __init__(self) -> None:
+        self._local = threading.local()
+
+    def _buffer(self, n_rows: int, dims: int) -> np.ndarray:
+        buffer = getattr(self._local, 'buffer', None)
+        if buffer is None or buffer.shape[0] < n_rows or buffer.shape[1] != dims:
+            # Only ever grows, to the largest batch seen
+            buffer = self._local.buffer = np.empty((n_rows, dims), dtype=np.float32)
+        return buffer[:n_rows]
+
+    def build(self, documents: List[DatDocumentMessage]) -> ColumnBatch:
+        """
+        Raises:
+            ValueError: If only some records have vectors, or their dimensions differ.
+        """
+        ids, texts, metadata, vectors = [], [], [], []
+        for document in documents:
+            data = document.data
+            record_metadata = _metadata_dict(data.metadata)
+            ids.append(record_metadata['dat_record_id'])
+            texts.append(data.document_chunk)
+            metadata.append(record_metadata)
+            vectors.append(data.vectors)
+        n_with_vectors = sum(vector is not None for vector in vectors)
+        if not n_with_vectors:
+            return ColumnBatch(ids, None, texts, metadata)
+        if n_with_vectors != len(vectors):
+            raise ValueError('Either all or none of the records of a batch must have vectors')
+        dims = len(vectors[0])
+        matrix = self._buffer(len(vectors), dims)
+        for row, vector in enumerate(vectors):
+            if len(vector) != dims:
+                raise ValueError(f'Record {ids[row]} has {len(vector)} dimensions, expected {dims}')
+            matrix[row] = vector
+        return ColumnBatch(ids, matrix, texts, metadata)
@@ -1,27 +1,140 @@
 import json
+import threading
 from collections import defaultdict
-from typing import Any, Dict, Iterable, List, Tuple
+from contextlib import nullcontext
+from typing import Any, ContextManager, Dict, Iterable, List, Optional, Set, Tuple
+from dat_core.connectors.content_hash import ContentHashFilter, ContentHashIndex
+from dat_core.connectors.destinations.batcher import (
+    DEFAULT_MAX_BATCH_BYTES,
+    DEFAULT_MAX_LINGER_SECONDS,
+    DEFAULT_TARGET_LOAD_SECONDS,
+    AdaptiveBatchSize,
+    BatchPolicy,
+    StreamBatcher,
+)
+from dat_core.connectors.destinations.columns import ColumnBuilder
+from dat_core.connectors.destinations.dead_letter import DeadLetterFile
 from dat_core.connectors.destinations.loader import Loader
+from dat_core.connectors.destinations.pipeline import LoadPipeline, StateBarrier
+from dat_core.connectors.destinations.retry import RetryPolicy
+from dat_core.connectors.destinations.utils import create_chunks
 from dat_core.pydantic_models import (
     DatMessage, Type, DatDocumentMessage,
     StreamStatus, DatCatalog, WriteSyncMode,
-    Level, DatLogMessage
+    Level, DatLogMessage, DatRecordBatchMessage,
+    EnumWithStr,
 )
 from dat_core.loggers import logger
+from dat_core.metrics import metrics
+from dat_core.profiling import profile_messages
+from dat_core.serialization import LazyDatMessage
+
+
+class UpsertStrategy(EnumWithStr):
+    """
+    How the previous version of the records of an UPSERT stream is deleted.
+
+    - PER_BATCH: before every batch is loaded, with a delete filtering on its record ids.
+    - SWEEP: once the stream is COMPLETED, with as few deletes as the destination's
+      `Loader.MAX_DELETE_FILTER_IDS` allows. Until then both versions of the loaded
+      records are in the destination, and if the sync fails before, the previous ones
+      are left there.
+
+    Both delete with the filter of `DataProcessor._delete_records`, whose `dat_run_id`
+    the loaders match against the records of the other runs.
+    """
+    PER_BATCH = 'per_batch'
+    SWEEP = 'sweep'
+
+
+class _UpsertSweep:
+    """
+    The records of an UPSERT stream loaded by a run, whose previous version is deleted
+    once the stream is COMPLETED.
+    """
+
+    def __init__(self, dat_run_id: str, dat_source: str) -> None:
+        self.dat_run_id = dat_run_id
+        self.dat_source = dat_source
+        self.ids: Set[str] = set()
 
 
 class DataProcessor:
     """
     This class is responsible for processing the data and loading it to the destination.
 
+    Records are buffered per (namespace, stream) and a stream's batch is loaded as soon
+    as it holds `batch_size` records or `max_batch_bytes` payload bytes, or once its
+    first record has waited for `max_linger_seconds`, whatever the other streams hold.
+    The linger time is checked whenever a message is received.
+
+    A batch is passed to `Loader.load_batch` as columns if the loader implements it, the
+    vectors being copied into a float32 matrix reused from batch to batch, and to
+    `Loader.load` otherwise.
+
+    With a `memory_budget_bytes`, the payload bytes of the buffered records, see
+    `record_payload_size`, are kept within the budget by flushing the fullest buffers
+    early, or by spilling the emptier ones to a temporary file, see
+    `StreamBatcher.enforce_budget`. They are reported by the `destination_buffered_bytes`
+    gauge. The batches being loaded, at most `max_in_flight`, come on top of the budget.
+
+    With `min_batch_size` or `max_batch_size` set, `batch_size` is only the initial
+    batch size: the batch size of every stream then adapts to the duration of its loads,
+    see `AdaptiveBatchSize`, and is reported by the `destination_batch_size` gauge.
+
+    Loads and deletes failing with a transient error are retried, see `RetryPolicy`. A
+    batch rejected as too large is split in half until its halves are accepted, so that a
+    single oversized record does not hold back the others. The records that still fail
+    are written to `dead_letter_path`, if set, see `DeadLetterFile`; otherwise the error
+    is raised and the sync fails.
+
+    The previous version of the records of an UPSERT stream is deleted before every
+    batch, or with `upsert_strategy` SWEEP, once the stream is COMPLETED; its COMPLETED
+    state is only yielded once they are. A sweep delete that still fails is logged and
+    written to the dead letter file, if set; otherwise the error is raised once the other
+    deletes of the sweep are done, and the COMPLETED state is not yielded.
+
+    With a `content_hash_index`, the records whose document chunk did not change since
+    it was loaded are skipped, see `ContentHashFilter`, and the hashes of the loaded
+    records are stored in the index.
+
+    With `max_workers` greater than 1 the batches are loaded on a thread pool while the
+    next ones are built; the batches of an UPSERT stream are still loaded one at a time.
+    Whatever the number of workers, a STATE message is only yielded once every record
+    received before it is loaded, so that a sync resumed from it misses no record.
+
     Args:
         config: The configuration for the data processor.
         loader: The loader object to load the data to the destination.
         batch_size: The batch size for processing the data.
+        max_batch_bytes: The maximum payload bytes of a batch.
+        max_linger_seconds: The maximum time a record waits for its batch to fill up.
+        max_workers: The number of batches loaded at the same time.
+        max_in_flight: The maximum number of batches waiting for or being loaded.
+        min_batch_size: The smallest adaptive batch size.
+        max_batch_size: The largest adaptive batch size.
+        target_load_seconds: The longest load before the adaptive batch size decreases.
+        retry_policy: How failed loads and deletes are retried.
+        dead_letter_path: The file of the records that could not be loaded.
+        upsert_strategy: When the previous version of the records of UPSERT streams is deleted.
+        content_hash_index: The hashes of the chunks loaded by the previous runs.
+        memory_budget_bytes: The maximum payload bytes of the records buffered in memory.
     """
 
     def __init__(
         self, config: Any, loader: Loader, batch_size: int,
+        max_batch_bytes: Optional[int] = DEFAULT_MAX_BATCH_BYTES,
+        max_linger_seconds: Optional[float] = DEFAULT_MAX_LINGER_SECONDS,
+        max_workers: int = 1,
+        max_in_flight: Optional[int] = None,
+        min_batch_size: Optional[int] = None,
+        max_batch_size: Optional[int] = None,
+        target_load_seconds: float = DEFAULT_TARGET_LOAD_SECONDS,
+        retry_policy: Optional[RetryPolicy] = None,
+        dead_letter_path: Optional[str] = None,
+        upsert_strategy: UpsertStrategy = UpsertStrategy.PER_BATCH,
+        content_hash_index: Optional[ContentHashIndex] = None,
+        memory_budget_bytes: Optional[int] = None,
     ) -> None:
         """
         Initialize the DataProcessor object.
@@ -29,7 +142,34 @@ class DataProcessor:
         Args:
             config (Any): The configuration object.
             loader (Loader): The loader object.
-            batch_size (int): The batch size for processing data.
+            batch_size (int): The maximum number of records of a batch, the initial one if
+                the batch size is adaptive.
+            max_batch_bytes (Optional[int], optional): The maximum payload bytes of a batch,
+                see `record_payload_size`. None for no limit. Defaults to 16 MiB.
+            max_linger_seconds (Optional[float], optional): The maximum seconds a record waits
+                for its batch to fill up. None for no limit. Defaults to 30.
+            max_workers (int, optional): The number of batches loaded at the same time, on
+                a thread pool if greater than 1. The loader must then be thread safe.
+                Defaults to 1.
+            max_in_flight (Optional[int], optional): The maximum number of batches waiting
+                for or being loaded. Defaults to twice `max_workers`.
+            min_batch_size (Optional[int], optional): The smallest batch size. Setting it
+                or `max_batch_size` makes the batch size adaptive. Defaults to None.
+            max_batch_size (Optional[int], optional): The largest batch size. Defaults to None.
+            target_load_seconds (float, optional): The longest acceptable `Loader.load`,
+                slower loads decrease the adaptive batch size. Defaults to 2.
+            retry_policy (Optional[RetryPolicy], optional): How failed loads and deletes are
+                retried. Defaults to `RetryPolicy()`, 5 attempts.
+            dead_letter_path (Optional[str], optional): The file the records that could not
+                be loaded are appended to. Defaults to None, failing the sync instead.
+            upsert_strategy (UpsertStrategy, optional): When the previous version of the
+                records of UPSERT streams is deleted. Defaults to PER_BATCH.
+            content_hash_index (Optional[ContentHashIndex], optional): The hashes of the
+                chunks loaded by the previous runs, to skip the unchanged records. Defaults
+                to None, loading every record.
+            memory_budget_bytes (Optional[int], optional): The maximum payload bytes of the
+                records buffered in memory, across streams. Defaults to None, bounded only
+                by `max_batch_bytes` per stream.
 
         Returns:
             None
@@ -37,6 +177,20 @@ class DataProcessor:
         self.config = config
         self.loader = loader
         self.batch_size = batch_size
+        self.max_batch_bytes = max_batch_bytes
+        self.max_linger_seconds = max_linger_seconds
+        self.max_workers = max_workers
+        self.max_in_flight = max_in_flight
+        self.batch_sizer: Optional[AdaptiveBatchSize] = None
+        if min_batch_size is not None or max_batch_size is not None:
+            self.batch_sizer = AdaptiveBatchSize(
+                batch_size, min_batch_size or 1, max_batch_size, target_load_seconds)
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.dead_letters = DeadLetterFile(dead_letter_path) if dead_letter_path else None
+        self.upsert_strategy = UpsertStrategy(upsert_strategy)
+        self.content_hash_index = content_hash_index
+        self.memory_budget_bytes = memory_budget_bytes
+        self._column_builder = ColumnBuilder()
         self._init_class_vars()
 
     def _init_class_vars(self) -> None:
@@ -44,7 +198,11 @@ class DataProcessor:
         Initializes the class variables.
         """
         self.n_records_per_stream: Dict[Tuple[str, str], int] = defaultdict(int)
+        # Guards n_records_per_stream, updated by the loader threads
+        self._n_records_lock = threading.Lock()
         self.stream_write_sync_modes: Dict[Tuple[str, str], WriteSyncMode] = {}
+        # The loaded records of the UPSERT streams to sweep, guarded by _n_records_lock
+        self._upsert_sweeps: Dict[Tuple[str, str], _UpsertSweep] = {}
 
     def _initialize_write_sync_modes(self, configured_catalog: DatCatalog) -> None:
         """
@@ -66,15 +224,102 @@ class DataProcessor:
         Returns:
             None
         """
-        write_sync_mode = self.stream_write_sync_modes.get((namespace, stream))
-        if write_sync_mode == WriteSyncMode.UPSERT.name:
-            self._process_delete(dat_messages)
+        with metrics.histogram('destination_batch_seconds', stream=stream).time():
+            if self._deletes_per_batch((namespace, stream)):
+                try:
+                    self._process_delete(dat_messages)
+                except Exception as exc:
+                    # Loading the records would duplicate their previous version
+                    self._dead_letter(namespace, stream, dat_messages, exc)
+                    return
+
+            self._load_messages(namespace, stream, dat_messages)
+
+    def _load_messages(self, namespace: str, stream: str, dat_messages: List[DatMessage]) -> None:
+        """
+        Load records with retries, splitting them in half if the destination finds them too
+        large, and dead-letter the records that still fail.
+
+        Args:
+            namespace (str): The namespace of the stream.
+            stream (str): The stream name.
+            dat_messages (List[DatMessage]): The RECORD messages to load.
 
+        Returns:
+            None
+        """
         documents = [msg.record for msg in dat_messages]
-        self.n_records_per_stream[(namespace, stream)] += len(documents)
+        try:
+            with self._observe_load(namespace, stream, len(documents)), \
+                    metrics.histogram('loader_load_seconds', stream=stream).time():
+                self._load_documents(documents, namespace, stream)
+        except Exception as exc:
+            if len(dat_messages) > 1 and self.retry_policy.is_too_large(exc):
+                self._bisect(namespace, stream, dat_messages)
+            else:
+                self._dead_letter(namespace, stream, dat_messages, exc)
+            return
+        self._count_loaded(namespace, stream, len(documents))
+        if self.content_hash_index is not None:
+            self.content_hash_index.update_records(documents)
+        if self._sweeps((namespace, stream)):
+            metadata = documents[0].data.metadata
+            self._add_to_sweep(
+                (namespace, stream),
+                [getattr(doc.data.metadata, self.loader.METADATA_DAT_RECORD_ID_FIELD) for doc in documents],
+                metadata.dat_run_id, metadata.dat_source,
+            )
+
+    def _load_documents(self, documents: List[DatDocumentMessage], namespace: str, stream: str) -> None:
+        """
+        Load documents with `Loader.load_batch` if the loader implements it, else with
+        `Loader.load`, retrying failed loads.
+        """
+        if not self.loader.implements_load_batch:
+            self.retry_policy.call(self.loader.load, documents, namespace, stream, stream=stream)
+            return
+        batch = self._column_builder.build(documents)
+        self.retry_policy.call(self.loader.load_batch, batch, namespace, stream, stream=stream)
+
+    def _bisect(self, namespace: str, stream: str, dat_messages: List[DatMessage]) -> None:
+        """
+        Load the two halves of a batch that is too large separately.
+        """
+        logger.warning('Batch of %d records of stream %s is too large, splitting it', len(dat_messages), stream)
+        metrics.counter('destination_batch_splits', stream=stream).inc()
+        middle = len(dat_messages) // 2
+        self._load_messages(namespace, stream, dat_messages[:middle])
+        self._load_messages(namespace, stream, dat_messages[middle:])
+
+    def _dead_letter(self, namespace: str, stream: str, dat_messages: List[DatMessage], error: Exception) -> None:
+        """
+        Write records that could not be loaded to the dead letter file.
+
+        Raises:
+            Exception: `error`, if there is no dead letter file.
+        """
+        if self.dead_letters is None:
+            raise error
+        logger.error(f"Failed to load {len(dat_messages)} records of stream {stream}: {error!r}. "
+                     f"Writing them to {self.dead_letters.path}")
+        self.dead_letters.write(namespace, stream, dat_messages, error)
+
+    def _count_loaded(self, namespace: str, stream: str, n_records: int) -> None:
+        """
+        Count records loaded to the destination.
+        """
+        with self._n_records_lock:
+            self.n_records_per_stream[(namespace, stream)] += n_records
+        metrics.counter('destination_records', stream=stream).inc(n_records)
+
+    def _observe_load(self, namespace: str, stream: str, n_records: int) -> ContextManager[None]:
+        """
+        Adjusts the batch size of the stream from the load in the `with` block, if it is adaptive.
+        """
+        if self.batch_sizer is None:
+            return nullcontext()
+        return self.batch_sizer.observe((namespace, stream), n_records)
 
-        self.loader.load(documents, namespace, stream)
-    
     def _process_delete(self, dat_messages) -> None:
         """
         Process the delete operation for documents with the given metadata and namespace.
@@ -87,20 +332,188 @@ class DataProcessor:
             DatLogMessage: A log message indicating the deletion operation.
 
         """
-        logger.info("Write Sync Mode is set to 'UPSERT'. Processing delete operation.")
         first_record = dat_messages[0].record #Getting first record because all the records in the batch should belong to one stream and namespace
-        stream = first_record.stream.name
-        namespace = first_record.namespace
         ids = {getattr(msg.record.data.metadata, self.loader.METADATA_DAT_RECORD_ID_FIELD) for msg in dat_messages}
+        self._delete_records(
+            first_record.namespace, first_record.stream.name, ids,
+            first_record.data.metadata.dat_run_id, first_record.data.metadata.dat_source,
+        )
+
+    def _delete_records(self, namespace: str, stream: str, ids: Iterable[str], dat_run_id: str, dat_source: str) -> None:
+        """
+        Delete the documents of the given records loaded by previous runs.
+
+        Args:
+            namespace (str): The namespace of the stream.
+            stream (str): The stream name.
+            ids (Iterable[str]): The dat_record_id of the records.
+            dat_run_id (str): The run the records belong to.
+            dat_source (str): The source the records were read from.
+        """
+        logger.info("Write Sync Mode is set to 'UPSERT'. Processing delete operation.")
         _filter={
                 self.loader.METADATA_DAT_STREAM_FIELD: stream,
                 self.loader.METADATA_DAT_RECORD_ID_FIELD: list(ids) + ["not_set"],
-                self.loader.METADATA_DAT_RUN_ID_FIELD: first_record.data.metadata.dat_run_id,
-                self.loader.METADATA_DAT_SOURCE_FIELD: first_record.data.metadata.dat_source,
+                self.loader.METADATA_DAT_RUN_ID_FIELD: dat_run_id,
+                self.loader.METADATA_DAT_SOURCE_FIELD: dat_source,
             }
         _filter = self.loader.prepare_metadata_filter(_filter)
         logger.info(f"Deleting with filter: {_filter}")
-        self.loader.delete(_filter, namespace)
+        metrics.counter('destination_deletes', stream=stream).inc()
+        self.retry_policy.call(self.loader.delete, _filter, namespace, operation='delete', stream=stream)
+
+    def _process_record_batch(self, namespace: str, stream: str, record_batch: DatRecordBatchMessage) -> None:
+        """
+        Load a RECORD_BATCH message to the destination as it is, without splitting it into records.
+
+        Args:
+            namespace (str): The namespace of the stream.
+            stream (str): The stream name.
+            record_batch (DatRecordBatchMessage): The records to load.
+
+        Returns:
+            None
+        """
+        if not len(record_batch):
+            return
+        with metrics.histogram('destination_batch_seconds', stream=stream).time():
+            if self._deletes_per_batch((namespace, stream)):
+                try:
+                    self._delete_records(
+                        namespace, stream, set(record_batch.ids),
+                        record_batch.metadata[self.loader.METADATA_DAT_RUN_ID_FIELD][0],
+                        record_batch.metadata[self.loader.METADATA_DAT_SOURCE_FIELD][0],
+                    )
+                except Exception as exc:
+                    self._dead_letter(namespace, stream, record_batch.to_record_messages(), exc)
+                    return
+            try:
+                with metrics.histogram('loader_load_seconds', stream=stream).time():
+                    self.retry_policy.call(
+                        self.loader.load_record_batch, record_batch, namespace, stream, stream=stream)
+            except Exception as exc:
+                dat_messages = record_batch.to_record_messages()
+                if len(dat_messages) > 1 and self.retry_policy.is_too_large(exc):
+                    # The halves are loaded as records
+                    self._bisect(namespace, stream, dat_messages)
+                else:
+                    self._dead_letter(namespace, stream, dat_messages, exc)
+                return
+        self._count_loaded(namespace, stream, len(record_batch))
+        if self.content_hash_index is not None:
+            self.content_hash_index.update_record_batch(record_batch)
+        if self._sweeps((namespace, stream)):
+            self._add_to_sweep(
+                (namespace, stream), record_batch.ids,
+                record_batch.metadata[self.loader.METADATA_DAT_RUN_ID_FIELD][0],
+                record_batch.metadata[self.loader.METADATA_DAT_SOURCE_FIELD][0],
+            )
+
+    def _is_upsert(self, key: Tuple[str, str]) -> bool:
+        """
+        True if the stream deletes the previous version of its records.
+        """
+        return self.stream_write_sync_modes.get(key) == WriteSyncMode.UPSERT.name
+
+    def _deletes_per_batch(self, key: Tuple[str, str]) -> bool:
+        """
+        True if every batch of the stream deletes the previous version of its records, the
+        loads of the stream must then not overlap.
+        """
+        return self._is_upsert(key) and self.upsert_strategy == UpsertStrategy.PER_BATCH
+
+    def _sweeps(self, key: Tuple[str, str]) -> bool:
+        """
+        True if the previous version of the records of the stream is deleted once it is COMPLETED.
+        """
+        return self._is_upsert(key) and self.upsert_strategy == UpsertStrategy.SWEEP
+
+    def _add_to_sweep(self, key: Tuple[str, str], ids: Iterable[str], dat_run_id: str, dat_source: str) -> None:
+        """
+        Remembers loaded records of a stream, to delete their previous version once it is COMPLETED.
+        """
+        with self._n_records_lock:
+            sweep = self._upsert_sweeps.get(key)
+            if sweep is None:
+                sweep = self._upsert_sweeps[key] = _UpsertSweep(dat_run_id, dat_source)
+            sweep.ids.update(ids)
+
+    def _sweep(self, key: Tuple[str, str]) -> None:
+        """
+        Deletes the previous version of the records of a COMPLETED stream loaded by this run,
+        with filters of at most `Loader.MAX_DELETE_FILTER_IDS` record ids.
+        """
+        with self._n_records_lock:
+            sweep = self._upsert_sweeps.pop(key, None)
+        if sweep is None:
+            return
+        namespace, stream = key
+        # Sorted so that the deletes of two runs of the same records are the same
+        ids = sorted(sweep.ids)
+        logger.info(f"Sweeping the previous version of {len(ids)} records of stream {stream}.")
+        errors = []
+        for chunk in create_chunks(ids, self.loader.MAX_DELETE_FILTER_IDS):
+            try:
+                self._delete_records(namespace, stream, chunk, sweep.dat_run_id, sweep.dat_source)
+            except Exception as exc:
+                errors.append(exc)
+                self._dead_letter_delete(namespace, stream, list(chunk), sweep, exc)
+        if errors and self.dead_letters is None:
+            # The COMPLETED state is held back, so that the stream is read and swept again
+            raise errors[0]
+
+    def _dead_letter_delete(self, namespace: str, stream: str, ids: List[str], sweep: _UpsertSweep, error: Exception) -> None:
+        """
+        Log a sweep delete that failed, and write it to the dead letter file if there is one.
+        """
+        logger.error(f"Failed to delete the previous version of {len(ids)} records of stream {stream}, "
+                     f"from {ids[0]} to {ids[-1]}: {error!r}. Both versions are left in the destination.")
+        if self.dead_letters is not None:
+            self.dead_letters.write_delete(
+                namespace, stream, ids, error, dat_run_id=sweep.dat_run_id, dat_source=sweep.dat_source)
+
+    def _release_states(self, barrier: StateBarrier, low_watermark: Optional[int]) -> Iterable[DatMessage]:
+        """
+        Yields the held STATE messages whose records are loaded, sweeping the UPSERT streams
+        before their COMPLETED state.
+        """
+        for message in barrier.release(low_watermark):
+            stream_status = self._stream_status(message)
+            if stream_status == StreamStatus.COMPLETED and self.upsert_strategy == UpsertStrategy.SWEEP:
+                self._sweep(self._state_stream_key(message))
+            yield message
+            if stream_status != StreamStatus.STARTED:
+                self._log_n_docs_per_stream()
+
+    def _log_n_docs_per_stream(self) -> None:
+        """
+        Logs the number of records loaded so far for every stream.
+        """
+        for (namespace, stream_name), n_docs in list(self.n_records_per_stream.items()):
+            logger.info(json.dumps({'namespace': namespace, 'stream_name':
+                     stream_name, 'n_docs_processed': n_docs, }))
+
+    @staticmethod
+    def _stream_status(message: DatMessage) -> Optional[StreamStatus]:
+        """
+        Returns the stream status of a STATE message. The status of a LazyDatMessage is read
+        from its raw bytes, so that the message can still be passed through without being
+        validated.
+        """
+        if isinstance(message, LazyDatMessage):
+            stream_status = message.peek(('state', 'stream_state', 'stream_status'))
+            return StreamStatus(stream_status) if stream_status is not None else None
+        return message.state.stream_state.stream_status
+
+    @staticmethod
+    def _state_stream_key(message: DatMessage) -> Tuple[str, str]:
+        """
+        Returns the (namespace, stream) of a STATE message, read from the raw bytes of a
+        LazyDatMessage.
+        """
+        if isinstance(message, LazyDatMessage):
+            return message.peek(('state', 'stream', 'namespace')), message.peek(('state', 'stream', 'name'))
+        return message.state.stream.namespace, message.state.stream.name
 
     def processor(self, configured_catalog: DatCatalog, input_messages: Iterable[DatMessage]) -> Iterable[DatMessage]:
         """
@@ -111,58 +524,116 @@ class DataProcessor:
             input_messages (Iterable[DatMessage]): The input messages to process.
 
         Yields:
-            DatMessage: The processed messages.
+            DatMessage: The processed messages, along with METRICS TRACE messages every
+                `DAT_METRICS_INTERVAL` seconds and once all messages are processed, and
+                PROFILE TRACE messages if `DAT_PROFILE` is set, see `dat_core.profiling`.
 
         Raises:
             ValueError: If the stream specified in the message is not found in the configured catalog.
         """
-        documents: Dict[Tuple[str, str], List[DatMessage]] = defaultdict(list)
-        total_documents = 0
+        return profile_messages(self._process_messages(configured_catalog, input_messages), 'write')
 
-        def yield_n_docs_per_stream():
-            for (namespace, stream_name), n_docs in self.n_records_per_stream.items():
-                logger.info(json.dumps({'namespace': namespace, 'stream_name':
-                         stream_name, 'n_docs_processed': n_docs, }))
+    def _process_messages(self, configured_catalog: DatCatalog, input_messages: Iterable[DatMessage]) -> Iterable[DatMessage]:
+        """
+        The unprofiled `processor`.
+
+        Every record gets a sequence number. A STATE message is held back until all the
+        records received before it are loaded, i.e. until the smallest sequence number of
+        the records still buffered or being loaded is past it.
+        """
+        batcher = StreamBatcher(
+            BatchPolicy(self.batch_size, self.max_batch_bytes, self.max_linger_seconds),
+            max_records_of=self.batch_sizer.size if self.batch_sizer is not None else None,
+        )
+        pipeline = LoadPipeline(self.max_workers, self.max_in_flight)
+        barrier = StateBarrier()
+        buffered_bytes = metrics.gauge('destination_buffered_bytes')
+        spilled_bytes = metrics.gauge('destination_spilled_bytes')
+        # Sequence number of the last record received, and of the first buffered record of every stream
+        last_seq = 0
+        first_buffered_seq: Dict[Tuple[str, str], int] = {}
+
+        def submit_batch(key: Tuple[str, str], dat_messages: List[DatMessage]) -> None:
+            pipeline.submit(key, first_buffered_seq.pop(key), self._process_batch, *key, dat_messages,
+                            exclusive=self._deletes_per_batch(key))
+
+        def low_watermark() -> int:
+            seqs = list(first_buffered_seq.values())
+            pending = pipeline.min_pending_seq()
+            if pending is not None:
+                seqs.append(pending)
+            return min(seqs, default=last_seq + 1)
 
         logger.info("Intializing data processor.")
         logger.info(f"Configured catalog: {configured_catalog.model_dump_json()}")
-        logger.debug(f"Processing {len(input_messages)} messages.")
 
         self._initialize_write_sync_modes(configured_catalog)
 
         self.loader.initiate_sync(configured_catalog)
+        if self.content_hash_index is not None:
+            input_messages = ContentHashFilter(self.content_hash_index, configured_catalog).filter(input_messages)
+
+        try:
+            for message in input_messages:
+                n_completed = pipeline.n_completed
+                if message.type == Type.STATE:
+                    barrier.hold(last_seq, message)
+                elif message.type == Type.RECORD:
+                    key = (message.record.namespace, message.record.stream.name)
+                    if key not in self.stream_write_sync_modes:
+                        logger.error(f"Stream {key} not found in configured catalog.")
+                        raise ValueError(f"Stream {key} not found in configured catalog.")
+
+                    # Accumulate records, the stream's batch is processed once it is full
+                    last_seq += 1
+                    first_buffered_seq.setdefault(key, last_seq)
+                    dat_messages = batcher.add(key, message)
+                    if dat_messages is not None:
+                        submit_batch(key, dat_messages)
+                elif message.type == Type.RECORD_BATCH:
+                    key = (message.record_batch.namespace, message.record_batch.stream.name)
+                    if key not in self.stream_write_sync_modes:
+                        logger.error(f"Stream {key} not found in configured catalog.")
+                        raise ValueError(f"Stream {key} not found in configured catalog.")
+
+                    # Load the records of the stream received before the batch first, to keep their order
+                    dat_messages = batcher.pop(key)
+                    if dat_messages is not None:
+                        submit_batch(key, dat_messages)
+                    last_seq += 1
+                    pipeline.submit(key, last_seq, self._process_record_batch, *key, message.record_batch,
+                                    exclusive=self._deletes_per_batch(key))
+                # Process the batches of the streams that went quiet
+                for key, dat_messages in batcher.expired():
+                    submit_batch(key, dat_messages)
+                # Flush or spill buffers to stay within the memory budget
+                if self.memory_budget_bytes is not None:
+                    for key, dat_messages in batcher.enforce_budget(self.memory_budget_bytes):
+                        metrics.counter('destination_forced_flushes', stream=key[1]).inc()
+                        submit_batch(key, dat_messages)
+                    spilled_bytes.set(batcher.spilled_nbytes)
+                buffered_bytes.set(batcher.nbytes)
+                pipeline.poll()
+                if pipeline.n_completed != n_completed:
+                    self._log_n_docs_per_stream()
+                yield from self._release_states(barrier, low_watermark())
+                trace = metrics.due_trace_message()
+                if trace is not None:
+                    yield trace
 
-        for message in input_messages:
-            if message.type == Type.STATE:
-                # Directly yield state messages and logs
-                yield message
-                if message.state.stream_state.stream_status != StreamStatus.STARTED:
-                    # yield from yield_n_docs_per_stream(dict(self.n_records_per_stream))
-                    yield_n_docs_per_stream()
-            elif message.type == Type.RECORD:
-                key = (message.record.namespace, message.record.stream.name)
-                if key not in self.stream_write_sync_modes:
-                    logger.error(f"Stream {key} not found in configured catalog.")
-                    raise ValueError(f"Stream {key} not found in configured catalog.")
-
-                # Accumulate records
-                documents[key].append(message)
-                total_documents += 1
-
-                # Process batch when threshold is reached
-                if total_documents >= self.batch_size:
-                    for (namespace, stream), dat_messages in documents.items():
-                        self._process_batch(namespace, stream, dat_messages)
-
-                    # Reset counters after processing
-                    total_documents = 0
-                    documents.clear()
-                    # yield from yield_n_docs_per_stream(dict(self.n_records_per_stream))
-                    yield_n_docs_per_stream()
-
-        # Process any remaining documents after loop
-        if documents:
-            for (namespace, stream), dat_messages in documents.items():
-                self._process_batch(namespace, stream, dat_messages)
-            # yield from yield_n_docs_per_stream(dict(self.n_records_per_stream))
-            yield_n_docs_per_stream()
+            # Process any remaining documents after loop
+            remaining = batcher.drain()
+            for key, dat_messages in remaining:
+                submit_batch(key, dat_messages)
+            pipeline.wait_all()
+            if remaining:
+                # yield from yield_n_docs_per_stream(dict(self.n_records_per_stream))
+                self._log_n_docs_per_stream()
+            yield from self._release_states(barrier, None)
+        finally:
+            pipeline.close()
+            batcher.close()
+        buffered_bytes.set(0)
+        trace = metrics.trace_message()
+        if trace is not None:
+            yield trace
@@ -0,0 +1,82 @@
+import json
+import threading
+import traceback
+from typing import Any, Iterator, List
+from dat_core.metrics import metrics
+from dat_core.pydantic_models import DatLogMessage, DatMessage, Level, Type
+from dat_core.serialization import MessageWriter, WireFormat, read_messages
+
+
+class DeadLetterFile:
+    """
+    Keeps the records a destination failed to load in a local file, so that they can be
+    loaded again later instead of failing the whole sync. The file holds newline delimited
+    JSON `DatMessage`s: for every failed batch, an ERROR LOG message describing the error
+    followed by the RECORD messages of the batch.
+
+    The file is replayed by passing its messages to the destination again, its LOG
+    messages are ignored by `DataProcessor`:
+
+        processor.processor(configured_catalog, DeadLetterFile(path).read())
+
+    The replaying processor should write its own dead letters to another file.
+
+    The deletes of an UPSERT sweep that failed are written as an ERROR LOG message alone,
+    holding the record ids whose previous version is left in the destination, see
+    `write_delete`. They are not replayed.
+
+    Args:
+        path (str): The file, appended to.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.n_records = 0
+        self.n_deletes = 0
+        # Batches fail on the loader threads
+        self._lock = threading.Lock()
+
+    def write(self, namespace: str, stream: str, dat_messages: List[DatMessage], error: BaseException) -> None:
+        """
+        Appends the RECORD messages of a batch that failed with `error`.
+        """
+        log = _error_log(error, namespace=namespace, stream_name=stream, n_records=len(dat_messages))
+        with self._lock, open(self.path, 'ab') as _f:
+            writer = MessageWriter(_f, WireFormat.JSON)
+            writer.write(log)
+            for message in dat_messages:
+                writer.write(message)
+            self.n_records += len(dat_messages)
+        metrics.counter('destination_dead_letter_records', stream=stream).inc(len(dat_messages))
+
+    def write_delete(self, namespace: str, stream: str, ids: List[str], error: BaseException, **details: Any) -> None:
+        """
+        Appends a delete of the previous version of records that failed with `error`.
+
+        Args:
+            namespace (str): The namespace of the stream.
+            stream (str): The stream name.
+            ids (List[str]): The dat_record_id of the records.
+            error (BaseException): The error of the delete.
+            **details (Any): The rest of the delete filter, e.g. `dat_run_id`.
+        """
+        log = _error_log(error, operation='delete', namespace=namespace, stream_name=stream, ids=ids, **details)
+        with self._lock, open(self.path, 'ab') as _f:
+            MessageWriter(_f, WireFormat.JSON).write(log)
+            self.n_deletes += 1
+        metrics.counter('destination_dead_letter_deletes', stream=stream).inc()
+
+    def read(self) -> Iterator[DatMessage]:
+        """
+        Yields the messages of the file, in the order they were written.
+        """
+        with open(self.path, 'rb') as _f:
+            yield from read_messages(_f)
+
+
+def _error_log(error: BaseException, **details: Any) -> DatMessage:
+    return DatMessage(type=Type.LOG, log=DatLogMessage(
+        level=Level.ERROR,
+        message=json.dumps({**details, 'error': repr(error)}),
+        stack_trace=''.join(traceback.format_exception(type(error), error, error.__traceback__)),
+    ))
@@ -1,8 +1,9 @@
 from abc import ABC, abstractmethod
 from typing import Any, List, Optional, Dict
+from dat_core.connectors.destinations.columns import ColumnBatch
 from dat_core.pydantic_models import (
     StreamMetadata, DatDocumentMessage,
-    DatCatalog,
+    DatCatalog, DatRecordBatchMessage,
 )
 
 
@@ -13,6 +14,7 @@ class Loader(ABC):
     Attributes:
         METADATA_FILTER_FIELDS (List[str]): List of metadata filter fields.
         METADATA_DAT_STREAM_FIELD (str): Metadata field for dat stream.
+        MAX_DELETE_FILTER_IDS (int): Maximum number of record ids in a delete filter.
 
     Args:
         config (Any): Configuration for the loader.
@@ -22,6 +24,8 @@ class Loader(ABC):
     METADATA_DAT_RECORD_ID_FIELD = "dat_record_id"
     METADATA_DAT_SOURCE_FIELD = "dat_source"
     METADATA_DAT_RUN_ID_FIELD = "dat_run_id"
+    # Destinations with a lower limit on the values of a filter should override it
+    MAX_DELETE_FILTER_IDS = 1000
 
 
     def __init__(self, config: Any):
@@ -42,6 +46,51 @@ class Loader(ABC):
         """
         pass
 
+    def load_batch(self, batch: ColumnBatch, namespace: str, stream: str) -> None:
+        """
+        Load a batch of records given as columns: the ids, the vectors as one float32 matrix,
+        the texts and the metadata dicts. Loaders building their client payload from columns
+        should override this, `DataProcessor` then calls it instead of `load` and builds the
+        columns once, see `ColumnBuilder`. The extra fields of `Data` are not passed.
+
+        Args:
+            batch (ColumnBatch): The records to load. Copy `batch.vectors` to keep it after
+                the call.
+            namespace (str): Namespace of the documents.
+            stream (str): Stream of the documents.
+
+        Returns:
+            None
+        """
+        raise NotImplementedError(f'{type(self).__name__} does not implement load_batch')
+
+    @property
+    def implements_load_batch(self) -> bool:
+        """
+        True if the loader overrides `load_batch`.
+        """
+        return type(self).load_batch is not Loader.load_batch
+
+    def load_record_batch(self, record_batch: DatRecordBatchMessage, namespace: str, stream: str) -> None:
+        """
+        Load a batch of records in the destination. Loaders able to write columns directly,
+        e.g. the vectors as one array, should override this; by default the batch is split
+        into records and passed to `load`, or passed to `load_batch` as columns if the
+        loader implements it.
+
+        Args:
+            record_batch (DatRecordBatchMessage): The records to load.
+            namespace (str): Namespace of the documents.
+            stream (str): Stream of the documents.
+
+        Returns:
+            None
+        """
+        if self.implements_load_batch:
+            self.load_batch(ColumnBatch.from_record_batch(record_batch), namespace, stream)
+            return
+        self.load(record_batch.to_records(), namespace, stream)
+
     @abstractmethod
     def delete(self, filter: Any, namespace: str) -> None:
         """
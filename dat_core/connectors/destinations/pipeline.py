@@ -0,0 +1,131 @@
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Deque, Dict, Hashable, List, Optional, Tuple
+from dat_core.pydantic_models import DatMessage
+
+
+class LoadPipeline:
+    """
+    Runs the batch loads of a destination on a pool of `max_workers` threads, so that
+    the next batches are decoded and built while earlier ones wait on the network. At
+    most `max_in_flight` loads are submitted at once; `submit` blocks beyond that. With
+    `max_workers` of 1 the loads run right away on the calling thread.
+
+    Every load is tagged with the sequence number of its first record, so that the
+    caller can tell which records are committed, see `min_pending_seq`. The first error
+    of a load is raised by the next call to `submit`, `poll` or `wait_all`.
+
+    Args:
+        max_workers (int, optional): Number of loads running at the same time. Defaults to 1.
+        max_in_flight (Optional[int], optional): Number of loads submitted and not done.
+            Defaults to twice `max_workers`.
+    """
+
+    def __init__(self, max_workers: int = 1, max_in_flight: Optional[int] = None) -> None:
+        self.max_workers = max(1, max_workers)
+        self.max_in_flight = max(1, max_in_flight or 2 * self.max_workers)
+        self._executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix='dat-loader') \
+            if self.max_workers > 1 else None
+        self._in_flight: Dict[Future, Tuple[Hashable, int]] = {}
+        # The last load submitted for every key, for the exclusive loads
+        self._last_by_key: Dict[Hashable, Future] = {}
+        self.n_completed = 0
+
+    def submit(self, key: Hashable, first_seq: int, func: Callable[..., Any], *args: Any,
+               exclusive: bool = False) -> None:
+        """
+        Runs `func(*args)`, the load of the records starting at `first_seq`.
+
+        Args:
+            key (Hashable): The stream of the load.
+            first_seq (int): The sequence number of its first record.
+            func (Callable[..., Any]): The load.
+            exclusive (bool, optional): Wait for the previous load of the same key to be
+                done first, e.g. for loads deleting records. Defaults to False.
+        """
+        if self._executor is None:
+            func(*args)
+            self.n_completed += 1
+            return
+        previous = self._last_by_key.get(key)
+        if exclusive and previous is not None and previous in self._in_flight:
+            wait([previous])
+        self.poll()
+        while len(self._in_flight) >= self.max_in_flight:
+            wait(list(self._in_flight), return_when=FIRST_COMPLETED)
+            self.poll()
+        future = self._executor.submit(func, *args)
+        self._in_flight[future] = (key, first_seq)
+        self._last_by_key[key] = future
+
+    def poll(self) -> int:
+        """
+        Forgets the loads that are done and returns how many there were.
+
+        Raises:
+            Exception: The error of a failed load.
+        """
+        done = [future for future in self._in_flight if future.done()]
+        for future in done:
+            key, _ = self._in_flight.pop(future)
+            if self._last_by_key.get(key) is future:
+                del self._last_by_key[key]
+            self.n_completed += 1
+            future.result()
+        return len(done)
+
+    def min_pending_seq(self) -> Optional[int]:
+        """
+        The smallest first sequence number of the loads not done yet, None if all are.
+        """
+        return min((first_seq for _, first_seq in self._in_flight.values()), default=None)
+
+    def wait_all(self) -> None:
+        """
+        Waits for every submitted load.
+
+        Raises:
+            Exception: The error of a failed load.
+        """
+        if self._in_flight:
+            wait(list(self._in_flight))
+        self.poll()
+
+    def close(self) -> None:
+        """
+        Stops the workers, dropping the loads not started yet.
+        """
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+
+
+class StateBarrier:
+    """
+    Holds STATE messages back until every record received before them is committed, so
+    that a state is never emitted, and resumed from, ahead of the data it covers.
+    """
+
+    def __init__(self) -> None:
+        self._held: Deque[Tuple[int, DatMessage]] = deque()
+
+    def __len__(self) -> int:
+        return len(self._held)
+
+    def hold(self, last_seq: int, message: DatMessage) -> None:
+        """
+        Holds a STATE message received after the record with sequence number `last_seq`.
+        """
+        self._held.append((last_seq, message))
+
+    def release(self, low_watermark: Optional[int]) -> List[DatMessage]:
+        """
+        Returns, in order, the held messages whose records are committed.
+
+        Args:
+            low_watermark (Optional[int]): The smallest sequence number of the records not
+                committed yet, None to release every held message.
+        """
+        released = []
+        while self._held and (low_watermark is None or self._held[0][0] < low_watermark):
+            released.append(self._held.popleft()[1])
+        return released
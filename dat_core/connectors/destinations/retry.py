@@ -0,0 +1,130 @@
+import random
+import re
+import time
+from typing import Any, Callable, Optional, TypeVar
+from dat_core.loggers import logger
+from dat_core.metrics import metrics
+
+# HTTP status codes of the errors worth retrying: timeouts, rate limits and unavailable servers
+RETRYABLE_STATUS_CODES = frozenset({408, 425, 429, 500, 502, 503, 504})
+# HTTP status code of a request over the size the server accepts
+PAYLOAD_TOO_LARGE_STATUS_CODE = 413
+_TOO_LARGE_PATTERN = re.compile(
+    r'too large|too big|request entity|exceeds? the (maximum|max|limit)|message size', re.IGNORECASE)
+
+_T = TypeVar('_T')
+
+
+class PayloadTooLargeError(Exception):
+    """
+    Raised by a loader when a batch is larger than what its destination accepts. The
+    batch is then split in half and the halves are loaded separately.
+    """
+
+
+def _status_code(exc: BaseException) -> Optional[int]:
+    """
+    Returns the HTTP status code of an error raised by a client library, if it has one.
+    """
+    for candidate in (exc, getattr(exc, 'response', None)):
+        for attr in ('status_code', 'status', 'code', 'http_status'):
+            value = getattr(candidate, attr, None)
+            if isinstance(value, int):
+                return value
+    return None
+
+
+def is_retryable_error(exc: BaseException) -> bool:
+    """
+    The default classifier of `RetryPolicy`: timeouts, connection errors and errors with a
+    retryable HTTP status code, e.g. 429 or 503, are transient.
+    """
+    if isinstance(exc, PayloadTooLargeError):
+        return False
+    if isinstance(exc, (TimeoutError, ConnectionError)):
+        return True
+    return _status_code(exc) in RETRYABLE_STATUS_CODES
+
+
+def is_payload_too_large_error(exc: BaseException) -> bool:
+    """
+    The default payload size classifier of `RetryPolicy`: a `PayloadTooLargeError`, an
+    error with the 413 HTTP status code or whose message says the request is too large.
+    """
+    if isinstance(exc, PayloadTooLargeError) or _status_code(exc) == PAYLOAD_TOO_LARGE_STATUS_CODE:
+        return True
+    return _TOO_LARGE_PATTERN.search(str(exc)) is not None
+
+
+class RetryPolicy:
+    """
+    Retries the calls to a destination failing with a transient error, waiting with
+    exponential backoff and full jitter between the attempts: before the n-th retry, a
+    random time between 0 and `min(max_backoff, initial_backoff * multiplier ** (n - 1))`.
+    The jitter spreads the retries of concurrent loads instead of having them hit a
+    struggling destination at the same time.
+
+    Args:
+        max_attempts (int, optional): Number of attempts, 1 for no retry. Defaults to 5.
+        initial_backoff (float, optional): Seconds of the first backoff. Defaults to 0.5.
+        max_backoff (float, optional): Longest backoff in seconds. Defaults to 30.
+        multiplier (float, optional): Growth of the backoff after every retry. Defaults to 2.
+        is_retryable (Callable[[BaseException], bool], optional): Whether an error is
+            transient. Defaults to `is_retryable_error`.
+        is_too_large (Callable[[BaseException], bool], optional): Whether an error means
+            the batch is too large and should be split, see `DataProcessor`. Defaults to
+            `is_payload_too_large_error`.
+        sleep (Callable[[float], None], optional): Waits between attempts. Defaults to time.sleep.
+    """
+
+    def __init__(self,
+        max_attempts: int = 5,
+        initial_backoff: float = 0.5,
+        max_backoff: float = 30.0,
+        multiplier: float = 2.0,
+        is_retryable: Callable[[BaseException], bool] = is_retryable_error,
+        is_too_large: Callable[[BaseException], bool] = is_payload_too_large_error,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        self.max_attempts = max(1, max_attempts)
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self.multiplier = multiplier
+        self.is_retryable = is_retryable
+        self.is_too_large = is_too_large
+        self._sleep = sleep
+
+    def backoff(self, attempt: int) -> float:
+        """
+        Returns the seconds to wait after the `attempt`-th failed attempt.
+        """
+        ceiling = min(self.max_backoff, self.initial_backoff * self.multiplier ** (attempt - 1))
+        return random.uniform(0, ceiling)
+
+    def call(self, func: Callable[..., _T], *args: Any, operation: str = 'load', stream: str = '') -> _T:
+        """
+        Calls `func(*args)` until it succeeds, it fails with an error that is not
+        retryable or `max_attempts` attempts have failed.
+
+        Args:
+            func (Callable[..., _T]): The call to the destination.
+            operation (str, optional): What the call does, for the logs and the
+                `loader_retries` counter. Defaults to 'load'.
+            stream (str, optional): The stream of the call. Defaults to ''.
+
+        Raises:
+            Exception: The error of the last attempt.
+        """
+        attempt = 1
+        while True:
+            try:
+                return func(*args)
+            except Exception as exc:
+                if attempt >= self.max_attempts or not self.is_retryable(exc):
+                    raise
+                delay = self.backoff(attempt)
+                logger.warning('%s of stream %s failed (%r), attempt %d of %d, retrying in %.2fs',
+                               operation, stream, exc, attempt, self.max_attempts, delay)
+                metrics.counter('loader_retries', operation=operation, stream=stream).inc()
+                self._sleep(delay)
+                attempt += 1
@@ -1,5 +1,10 @@
 import itertools
-from typing import Any, Iterable, Iterator, Tuple
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, TypeVar
+from dat_core.connectors.destinations.retry import RetryPolicy
+
+_R = TypeVar('_R')
+
 
 def create_chunks(iterable: Iterable[Any], batch_size: int) -> Iterator[Tuple[Any, ...]]:
     """
@@ -27,3 +32,66 @@ def create_chunks(iterable: Iterable[Any], batch_size: int) -> Iterator[Tuple[An
     while chunk:
         yield chunk
         chunk = tuple(itertools.islice(it, batch_size))
+
+
+def map_chunks(
+    iterable: Iterable[Any],
+    batch_size: int,
+    func: Callable[[Tuple[Any, ...]], _R],
+    max_workers: int = 4,
+    retry_policy: Optional[RetryPolicy] = None,
+    max_in_flight: Optional[int] = None,
+) -> List[_R]:
+    """
+    Breaks an iterable into chunks with `create_chunks` and calls `func` on every chunk
+    from a pool of `max_workers` threads, e.g. to upsert millions of vectors over as many
+    connections at once. The iterable is consumed as the chunks are sent: at most
+    `max_in_flight` chunks are held at a time.
+
+    A chunk failing with an error that `retry_policy` retries is sent again. On the first
+    error that is not, the chunks not sent yet are dropped and the error is raised once
+    the chunks being sent are done.
+
+    Args:
+        iterable (Iterable[Any]): The items to send.
+        batch_size (int): The size of each chunk.
+        func (Callable[[Tuple[Any, ...]], _R]): Sends a chunk. Called from several threads.
+        max_workers (int, optional): The number of chunks sent at the same time. Defaults to 4.
+        retry_policy (Optional[RetryPolicy], optional): How failed chunks are retried.
+            Defaults to None, no retry.
+        max_in_flight (Optional[int], optional): The number of chunks sent or waiting to
+            be. Defaults to twice `max_workers`.
+
+    Returns:
+        List[_R]: The result of `func` for every chunk, in the order of the chunks.
+
+    Raises:
+        Exception: The first error of a chunk.
+
+    Example:
+        >>> map_chunks(range(10), 3, sum, max_workers=2)
+        [3, 12, 21, 9]
+    """
+    max_in_flight = max(1, max_in_flight or 2 * max_workers)
+    call = func if retry_policy is None else \
+        lambda chunk: retry_policy.call(func, chunk, operation='chunk')
+    results: Dict[int, _R] = {}
+    in_flight: Dict[Future, int] = {}
+
+    def collect(block: bool) -> None:
+        if block:
+            wait(in_flight, return_when=FIRST_COMPLETED)
+        for future in [future for future in in_flight if future.done()]:
+            results[in_flight.pop(future)] = future.result()
+
+    executor = ThreadPoolExecutor(max(1, max_workers), thread_name_prefix='dat-chunks')
+    try:
+        n_chunks = 0
+        for n_chunks, chunk in enumerate(create_chunks(iterable, batch_size), 1):
+            collect(block=len(in_flight) >= max_in_flight)
+            in_flight[executor.submit(call, chunk)] = n_chunks - 1
+        while in_flight:
+            collect(block=True)
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+    return [results[idx] for idx in range(n_chunks)]
@@ -0,0 +1,5 @@
+# Helpers for the vector database destinations, see dat_core.connectors.destinations.utils
+from dat_core.connectors.destinations.utils import (
+    create_chunks,
+    map_chunks,
+)
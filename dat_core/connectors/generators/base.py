@@ -1,21 +1,42 @@
 from typing import Any, Tuple
+import functools
 import os
+import threading
+import time
 from typing import Iterator
 from abc import abstractmethod
 from dat_core.connectors.base import ConnectorBase
+from dat_core.metrics import metrics
+from dat_core.profiling import profile_process
 from dat_core.pydantic_models import (
     ConnectorSpecification,
     DatMessage,
+    Type,
 )
 
+# Depth of the instrumented `generate` calls of the current thread, so that a `generate`
+# calling its parent's through super() is only measured once
+_generate_depth = threading.local()
+
 
 class GeneratorBase(ConnectorBase):
     """Base abstract class for generators.
+
+    The `generate` of every subclass is instrumented: its calls per stream are counted
+    (`generator_calls`) and the time spent in it is recorded (`generator_seconds`),
+    and a METRICS TRACE message is yielded along with the output when one is due, see
+    `dat_core.metrics`. With `DAT_PROFILE` set, the process is profiled from the first
+    call on, see `dat_core.profiling`.
     """
 
     def __init__(self) -> None:
         super().__init__()
 
+    def __init_subclass__(cls, **kwargs: Any) -> None:
+        super().__init_subclass__(**kwargs)
+        if 'generate' in cls.__dict__:
+            cls.generate = _instrument_generate(cls.__dict__['generate'])
+
     @abstractmethod
     def generate(
         self,
@@ -33,3 +54,61 @@ class GeneratorBase(ConnectorBase):
             Iterator[Dict]: Each row should be wrapped around a DatMessage obj
         """
 
+    def generate_batch(
+        self,
+        config: ConnectorSpecification,
+        dat_message: DatMessage
+    ) -> Iterator[DatMessage]:
+        """
+        The generator operation for a RECORD_BATCH message. Generators able to embed
+        a whole batch at once should override this; by default every record of the
+        batch goes through `generate` and the generated records are packed back into
+        a single RECORD_BATCH message.
+
+        Args:
+            config (ConnectorSpecification): The user-provided configuration as specified by
+              the generator's spec.
+            dat_message (DatMessage): DatMessage containing a DatRecordBatchMessage
+        Yields:
+            Iterator[DatMessage]: The RECORD_BATCH message with the vectors, preceded by any
+              other message the generator yields
+        """
+        records = []
+        for record_message in dat_message.record_batch.to_record_messages():
+            for output in self.generate(config, record_message):
+                if output.type == Type.RECORD:
+                    records.append(output)
+                else:
+                    yield output
+        if records:
+            yield DatMessage.as_record_batch(records)
+
+
+def _instrument_generate(generate):
+    @functools.wraps(generate)
+    def _generate(self, config: ConnectorSpecification, dat_message: DatMessage) -> Iterator[DatMessage]:
+        depth = getattr(_generate_depth, 'value', 0)
+        if depth:
+            yield from generate(self, config, dat_message)
+            return
+        profile_process('generate')
+        stream = dat_message.record.stream.name if dat_message.record and dat_message.record.stream else ''
+        metrics.counter('generator_calls', stream=stream).inc()
+        outputs = iter(generate(self, config, dat_message))
+        elapsed = 0.0
+        while True:
+            _generate_depth.value = 1
+            _start = time.perf_counter()
+            try:
+                output = next(outputs)
+            except StopIteration:
+                break
+            finally:
+                elapsed += time.perf_counter() - _start
+                _generate_depth.value = 0
+            yield output
+        metrics.histogram('generator_seconds', stream=stream).observe(elapsed)
+        trace = metrics.due_trace_message()
+        if trace is not None:
+            yield trace
+    return _generate
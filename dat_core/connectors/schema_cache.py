@@ -0,0 +1,141 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+from pydantic import BaseModel
+
+# Directory with precomputed schemas, loaded into the cache on first use
+SCHEMA_CACHE_DIR_ENV = 'DAT_SCHEMA_CACHE_DIR'
+
+
+class SchemaCache:
+    """
+    Memoizes the resolved JSON schemas returned by `ConnectorBase.spec` and
+    `SourceBase.discover`.
+
+    Schemas are kept as JSON text and every lookup returns a freshly parsed dict, so
+    callers are free to modify what they get. Entries can be written to a directory at
+    build time with `dump` and read back at startup with `load`; if the
+    `DAT_SCHEMA_CACHE_DIR` environment variable is set, that directory is loaded on first use.
+
+    Args:
+        max_entries (int, optional): Maximum number of cached schemas; the least recently
+            used one is evicted first. Defaults to 256.
+    """
+
+    def __init__(self, max_entries: int = 256) -> None:
+        self._max_entries = max_entries
+        self._schemas: OrderedDict[str, str] = OrderedDict()
+        self._lock = threading.Lock()
+        self._env_loaded = False
+
+    def get_or_build(self, key: str, build: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Returns the schema cached under `key`, building and caching it first if needed.
+
+        Args:
+            key (str): The cache key, see `schema_cache_key`.
+            build (Callable[[], Dict[str, Any]]): Builds the schema on a cache miss.
+
+        Returns:
+            Dict[str, Any]: A copy of the cached schema.
+        """
+        self._load_env_dir()
+        with self._lock:
+            schema_json = self._schemas.get(key)
+            if schema_json is not None:
+                self._schemas.move_to_end(key)
+        if schema_json is None:
+            schema_json = json.dumps(build())
+            self._set(key, schema_json)
+        return json.loads(schema_json)
+
+    def clear(self) -> None:
+        """
+        Removes every cached schema.
+        """
+        with self._lock:
+            self._schemas.clear()
+
+    def dump(self, directory: str) -> None:
+        """
+        Writes every cached schema to `<directory>/<key>.json`.
+
+        Args:
+            directory (str): The directory to write to. Created if missing.
+        """
+        os.makedirs(directory, exist_ok=True)
+        with self._lock:
+            items = list(self._schemas.items())
+        for key, schema_json in items:
+            with open(os.path.join(directory, f'{key}.json'), 'w') as _schema_file:
+                _schema_file.write(schema_json)
+
+    def load(self, directory: str) -> None:
+        """
+        Reads the schemas written by `dump` from a directory into the cache.
+
+        Args:
+            directory (str): The directory to read from.
+        """
+        for file_name in sorted(os.listdir(directory)):
+            if not file_name.endswith('.json'):
+                continue
+            with open(os.path.join(directory, file_name)) as _schema_file:
+                self._set(file_name[:-len('.json')], _schema_file.read())
+
+    def _set(self, key: str, schema_json: str) -> None:
+        with self._lock:
+            self._schemas[key] = schema_json
+            self._schemas.move_to_end(key)
+            while len(self._schemas) > self._max_entries:
+                self._schemas.popitem(last=False)
+
+    def _load_env_dir(self) -> None:
+        if self._env_loaded:
+            return
+        self._env_loaded = True
+        directory = os.environ.get(SCHEMA_CACHE_DIR_ENV)
+        if directory and os.path.isdir(directory):
+            self.load(directory)
+
+
+def schema_cache_key(kind: str, owner: type, config: Optional[Any] = None) -> str:
+    """
+    Builds the cache key of a schema.
+
+    Args:
+        kind (str): The kind of schema, e.g. 'spec' or 'catalog'.
+        owner (type): The model class the schema is generated from, or the connector
+            class for schemas that depend on the config.
+        config (Optional[Any], optional): The config the schema depends on, if any. Defaults to None.
+
+    Returns:
+        str: A file name safe key.
+    """
+    key = f'{kind}-{owner.__module__}.{owner.__qualname__}'
+    if config is not None:
+        key = f'{key}-{config_hash(config)}'
+    return key.replace('<', '_').replace('>', '_')
+
+
+def config_hash(config: Any) -> str:
+    """
+    Returns a short stable hash of a connector config.
+
+    Args:
+        config (Any): A pydantic model or a JSON serializable mapping.
+
+    Returns:
+        str: The hex digest.
+    """
+    if isinstance(config, BaseModel):
+        config = config.model_dump(mode='json')
+    config_json = json.dumps(config, sort_keys=True, default=str)
+    return hashlib.sha256(config_json.encode()).hexdigest()[:16]
+
+
+# Use this object to cache schemas in other modules
+schema_cache = SchemaCache()
@@ -0,0 +1,81 @@
+import asyncio
+from abc import abstractmethod
+from typing import Any, AsyncGenerator, AsyncIterable, AsyncIterator, Iterable, Iterator
+from dat_core.pydantic_models import (
+    DatCatalog,
+    DatDocumentStream,
+    DatMessage,
+)
+from dat_core.connectors.sources.stream import Stream
+
+# Returned by next() in a worker thread once the wrapped iterator is exhausted
+_EXHAUSTED = object()
+
+
+class AsyncStream(Stream):
+    """
+    Base abstract class for a Dat Stream whose records are fetched with asyncio,
+    e.g. through an aiohttp client.
+
+    `SourceBase.aread` consumes these streams natively on the running event loop.
+    `SourceBase.read` still accepts them and drives them through `iterate_sync`.
+    """
+
+    @abstractmethod
+    async def read_records(self,
+        catalog: DatCatalog,
+        configured_stream: DatDocumentStream,
+        cursor_value: Any = None
+    ) -> AsyncGenerator[DatMessage, Any]:
+        """
+        Async counterpart of `Stream.read_records`. Must be implemented as an
+        async generator yielding DatMessage records.
+        """
+        yield  # pragma: no cover
+
+
+def iterate_sync(async_iterable: AsyncIterable[Any]) -> Iterator[Any]:
+    """
+    Iterate an async iterable from synchronous code.
+
+    A private event loop is created for the lifetime of the iteration, so this must
+    not be called from a thread that is already running an event loop.
+
+    Args:
+        async_iterable (AsyncIterable[Any]): The async iterable, e.g. an async generator.
+
+    Yields:
+        Iterator[Any]: Items produced by the async iterable.
+    """
+    loop = asyncio.new_event_loop()
+    async_iterator = async_iterable.__aiter__()
+    try:
+        while True:
+            try:
+                yield loop.run_until_complete(async_iterator.__anext__())
+            except StopAsyncIteration:
+                return
+    finally:
+        if hasattr(async_iterator, 'aclose'):
+            loop.run_until_complete(async_iterator.aclose())
+        loop.run_until_complete(loop.shutdown_asyncgens())
+        loop.close()
+
+
+async def iterate_async(iterable: Iterable[Any]) -> AsyncIterator[Any]:
+    """
+    Iterate a blocking iterable from asyncio code without blocking the event loop.
+    Every `next()` call runs in the default executor.
+
+    Args:
+        iterable (Iterable[Any]): The blocking iterable, e.g. `Stream.read_records(...)`.
+
+    Yields:
+        AsyncIterator[Any]: Items produced by the iterable.
+    """
+    iterator = iter(iterable)
+    while True:
+        item = await asyncio.to_thread(next, iterator, _EXHAUSTED)
+        if item is _EXHAUSTED:
+            return
+        yield item
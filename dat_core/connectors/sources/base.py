@@ -1,12 +1,12 @@
+import functools
 from abc import abstractmethod
 from typing import (
     Any, Dict, List,
     Mapping, Optional, Generator,
-    Union
+    Union, AsyncGenerator, Tuple
 )
 from pydantic import create_model
 import yaml
-import jsonref
 from dat_core.pydantic_models import (
     DatMessage,
     StreamState,
@@ -20,10 +20,22 @@ from dat_core.pydantic_models import (
     Type,
     DatStateMessage,
     CustomGenerateJsonSchema,
+    resolve_refs,
 )
 from dat_core.connectors.base import ConnectorBase
+from dat_core.connectors.schema_cache import schema_cache, schema_cache_key
 from dat_core.connectors.sources.stream import Stream
+from dat_core.connectors.sources.async_stream import AsyncStream, iterate_async, iterate_sync
+from dat_core.connectors.sources.checkpoint import max_cursor
+from dat_core.connectors.sources.concurrent import aread_concurrently, read_concurrently
 from dat_core.loggers import logger
+from dat_core.metrics import metrics
+from dat_core.profiling import aprofile_messages, profile_messages
+
+# Key of the per partition cursors in the state data of a partitioned stream
+PARTITIONS_STATE_KEY = '_partitions'
+# Marks the end of a partition in the output of `SourceBase._read_partition`
+_PARTITION_DONE = object()
 
 class SourceBase(ConnectorBase):
     """
@@ -31,6 +43,10 @@ class SourceBase(ConnectorBase):
     """
     _catalog_class = DatCatalog
     _has_dynamic_streams = False
+    # Number of streams read at the same time. Streams are read one after another unless this is > 1
+    _max_concurrent_streams = 1
+    # Maximum number of messages buffered between the stream readers and the consumer of `read`/`aread`
+    _concurrent_read_queue_size = 1000
 
 
     def read_catalog_file(self) -> Dict:
@@ -45,7 +61,8 @@ class SourceBase(ConnectorBase):
 
     def discover(self, config: ConnectorSpecification) -> Dict:
         """
-        Should publish a connectors capabilities i.e it's catalog
+        Should publish a connectors capabilities i.e it's catalog. The resolved schema is
+        cached per catalog class, or per config for sources with dynamic streams.
 
         Args:
             config (ConnectorSpecification): The user-provided configuration as specified by
@@ -54,6 +71,17 @@ class SourceBase(ConnectorBase):
         Returns:
             DatCatalog: Supported streams in the connector
         """
+        if self._has_dynamic_streams:
+            key = schema_cache_key('catalog', type(self), config)
+        else:
+            key = schema_cache_key('catalog', self._catalog_class)
+        return schema_cache.get_or_build(key, lambda: self._build_catalog_schema(config))
+
+    def _build_catalog_schema(self, config: ConnectorSpecification) -> Dict:
+        """
+        Generates the catalog schema, resolves its $refs and turns the splitter
+        settings into a oneOf
+        """
         if self._has_dynamic_streams:
             streams = self.streams(config)
             stream_classes = []
@@ -69,8 +97,7 @@ class SourceBase(ConnectorBase):
             )
             self._catalog_class = GenericCatalogModel
         _catalog = self._catalog_class.model_json_schema(schema_generator=CustomGenerateJsonSchema)
-        _resolved_catalog =  jsonref.loads(jsonref.dumps(_catalog))
-        # _resolved_catalog = resolve_refs(_catalog)
+        _resolved_catalog = resolve_refs(_catalog)
         # _document_streams = _resolved_catalog['properties']['document_streams']['items']
         # if 'anyOf' in _document_streams:
         #     _resolved_catalog['properties']['document_streams']['items'] = _document_streams['anyOf'].copy()
@@ -90,6 +117,18 @@ class SourceBase(ConnectorBase):
         # del _resolved_catalog['$defs']
         return _resolved_catalog
     
+    def write_schema_cache(self, directory: str) -> None:
+        """
+        Precomputes the spec and, for sources without dynamic streams, the catalog
+        schema and writes them to `directory`. See `ConnectorBase.write_schema_cache`.
+
+        Args:
+            directory (str): The directory to write the schemas to.
+        """
+        if not self._has_dynamic_streams:
+            self.discover(None)
+        super().write_schema_cache(directory)
+
     @abstractmethod
     def streams(self, config: Mapping[str, Any], json_schemas: Mapping[str, Mapping[str, Any]]=None) -> List[Stream]:
         """
@@ -114,6 +153,15 @@ class SourceBase(ConnectorBase):
         """
         Reads data from a data stream based on the provided configuration and catalog.
 
+        Streams are read one after another by default. When `_max_concurrent_streams` is
+        greater than 1 the streams are read on a thread pool of that size and their messages
+        are merged; the messages of a single stream keep their order.
+
+        The number of records and characters read per stream are reported in METRICS
+        TRACE messages, every `DAT_METRICS_INTERVAL` seconds and once all streams are
+        read, see `dat_core.metrics`. Set `DAT_PROFILE` to profile the read, see
+        `dat_core.profiling`.
+
         Parameters:
             config (ConnectorSpecification): The configuration object specifying the connector details.
             catalog (DatCatalog): The catalog containing information about the data streams.
@@ -129,64 +177,309 @@ class SourceBase(ConnectorBase):
             Generator[DatMessage, Any, Any]: A generator yielding DatMessage objects with the read data.
         """
         stream_instances = {s.name: s for s in self.streams(config)}
-        for configured_stream in catalog.document_streams:
-            logger.info(f'Running stream: {configured_stream.name}')
-            stream_state_data = {}
-            yield DatMessage(
-                type=Type.STATE,
-                state=DatStateMessage(
-                    stream=configured_stream,
-                    stream_state=StreamState(
-                        data=stream_state_data,
-                        stream_status=StreamStatus.STARTED,
-                    ),
-                )
+        stream_readers = [
+            functools.partial(
+                self._read_stream,
+                stream_instances.get(configured_stream.name),
+                catalog,
+                configured_stream,
+                state,
+            )
+            for configured_stream in catalog.document_streams
+        ]
+        if self._max_concurrent_streams and self._max_concurrent_streams > 1 and len(stream_readers) > 1:
+            logger.info(f'Reading {len(stream_readers)} streams with {self._max_concurrent_streams} workers')
+            messages = read_concurrently(
+                stream_readers,
+                max_workers=self._max_concurrent_streams,
+                max_queue_size=self._concurrent_read_queue_size,
+            )
+        else:
+            messages = (message for stream_reader in stream_readers for message in stream_reader())
+        read_metrics = _ReadMetrics()
+        for message in profile_messages(messages, 'read'):
+            yield message
+            trace = read_metrics.observe(message)
+            if trace is not None:
+                yield trace
+        trace = metrics.trace_message()
+        if trace is not None:
+            yield trace
+
+    def _read_stream(
+        self,
+        stream_instance: Stream,
+        catalog: DatCatalog,
+        configured_stream: DatDocumentStream,
+        state: Optional[Mapping[str, StreamState]] = None,
+    ) -> Generator[DatMessage, Any, Any]:
+        """
+        Reads a single configured stream and yields its records along with its
+        STARTED/RUNNING/COMPLETED state messages.
+
+        Args:
+            stream_instance (Stream): The stream instance as returned by `streams()`.
+            catalog (DatCatalog): The catalog containing information about the data streams.
+            configured_stream (DatDocumentStream): The configured stream to be read.
+            state (Optional[Mapping[str, StreamState]], optional): A mapping of stream names to their current state. Defaults to None.
+
+        Yields:
+            Generator[DatMessage, Any, Any]: A generator yielding DatMessage objects for this stream.
+        """
+        logger.info(f'Running stream: {configured_stream.name}')
+        stream_state = self._get_stream_state(stream_instance, configured_stream, state)
+        tracker = _StreamReadTracker(self, stream_instance, configured_stream, stream_state)
+        yield tracker.started_message()
+        partitions = stream_instance.partitions(
+            configured_stream, self._get_cursor_value(configured_stream, stream_state))
+        if partitions is not None:
+            yield from self._read_partitions(stream_instance, catalog, configured_stream, stream_state, partitions)
+            return
+        if configured_stream.read_sync_mode == ReadSyncMode.INCREMENTAL:
+            logger.info('Calling read_incremental')
+            records = self._read_incremental(stream_instance, catalog, configured_stream, stream_state)
+        else:
+            records = self._read_full_refresh(stream_instance, catalog, configured_stream)
+
+        for record in records:
+            yield from tracker.on_record(record)
+        yield from tracker.finish()
+
+    async def aread(
+        self,
+        config: ConnectorSpecification,
+        catalog: DatCatalog,
+        state: Optional[Mapping[str, StreamState]] = None,
+    ) -> AsyncGenerator[DatMessage, Any]:
+        """
+        Asyncio counterpart of `read` with the same state and checkpoint semantics.
+
+        `AsyncStream`s are consumed natively on the running event loop, blocking `Stream`s
+        are driven from the default executor. When `_max_concurrent_streams` is greater
+        than 1 that many streams are read at the same time as tasks on the event loop.
+
+        Parameters:
+            config (ConnectorSpecification): The configuration object specifying the connector details.
+            catalog (DatCatalog): The catalog containing information about the data streams.
+            state (Optional[Mapping[str, StreamState]], optional): A mapping of stream names to their current state. Defaults to None.
+
+        Yields:
+            AsyncGenerator[DatMessage, Any]: An async generator yielding DatMessage objects containing the read data.
+        """
+        stream_instances = {s.name: s for s in self.streams(config)}
+        stream_readers = [
+            functools.partial(
+                self._aread_stream,
+                stream_instances.get(configured_stream.name),
+                catalog,
+                configured_stream,
+                state,
+            )
+            for configured_stream in catalog.document_streams
+        ]
+        if self._max_concurrent_streams and self._max_concurrent_streams > 1 and len(stream_readers) > 1:
+            logger.info(f'Reading {len(stream_readers)} streams with {self._max_concurrent_streams} tasks')
+            messages = aread_concurrently(
+                stream_readers,
+                max_concurrency=self._max_concurrent_streams,
+                max_queue_size=self._concurrent_read_queue_size,
+            )
+        else:
+            messages = _chain_async(stream_readers)
+        read_metrics = _ReadMetrics()
+        async for message in aprofile_messages(messages, 'read'):
+            yield message
+            trace = read_metrics.observe(message)
+            if trace is not None:
+                yield trace
+        trace = metrics.trace_message()
+        if trace is not None:
+            yield trace
+
+    async def _aread_stream(
+        self,
+        stream_instance: Stream,
+        catalog: DatCatalog,
+        configured_stream: DatDocumentStream,
+        state: Optional[Mapping[str, StreamState]] = None,
+    ) -> AsyncGenerator[DatMessage, Any]:
+        """
+        Asyncio counterpart of `_read_stream`.
+        """
+        logger.info(f'Running stream: {configured_stream.name}')
+        stream_state = self._get_stream_state(stream_instance, configured_stream, state)
+        tracker = _StreamReadTracker(self, stream_instance, configured_stream, stream_state)
+        yield tracker.started_message()
+        cursor_value = self._get_cursor_value(configured_stream, stream_state)
+        partitions = stream_instance.partitions(configured_stream, cursor_value)
+        if partitions is not None:
+            async for message in iterate_async(self._read_partitions(
+                    stream_instance, catalog, configured_stream, stream_state, partitions)):
+                yield message
+            return
+        records = stream_instance.read_records(
+            catalog=catalog,
+            configured_stream=configured_stream,
+            cursor_value=cursor_value
+        )
+        if not isinstance(stream_instance, AsyncStream):
+            records = iterate_async(records)
+
+        async for record in records:
+            for message in tracker.on_record(record):
+                yield message
+        for message in tracker.finish():
+            yield message
+
+    def _get_stream_state(self,
+        stream_instance: Stream,
+        configured_stream: DatDocumentStream,
+        state: Optional[Mapping[str, StreamState]] = None,
+    ) -> StreamState:
+        """
+        Returns the incoming state of the configured stream and, for incremental
+        reads, falls back to the stream's default cursor field.
+        """
+        if configured_stream.read_sync_mode == ReadSyncMode.INCREMENTAL:
+            configured_stream.cursor_field = configured_stream.cursor_field or stream_instance._default_cursor
+        return state.get(configured_stream.name, StreamState(data={})) if state else StreamState(data={})
+
+    def _get_cursor_value(self, configured_stream: DatDocumentStream, stream_state: StreamState) -> Any:
+        """
+        Returns the cursor value to start an incremental read from, None for full refreshes.
+        """
+        if configured_stream.read_sync_mode == ReadSyncMode.INCREMENTAL:
+            return stream_state.data.get(configured_stream.cursor_field)
+        return None
+
+    def _read_partitions(
+        self,
+        stream_instance: Stream,
+        catalog: DatCatalog,
+        configured_stream: DatDocumentStream,
+        stream_state: StreamState,
+        partitions: List[Mapping[str, Any]],
+    ) -> Generator[DatMessage, Any, Any]:
+        """
+        Reads the partitions of a partitioned stream, up to `_max_concurrent_partitions`
+        of them at the same time.
+
+        The RUNNING state keeps a cursor and a completion flag per partition under
+        `PARTITIONS_STATE_KEY`. Partitions marked completed in the incoming state are skipped
+        and unfinished ones resume from their own cursor. A RUNNING state is emitted when
+        the stream's checkpoint policy is due for a partition and whenever a partition
+        completes. The COMPLETED state drops the partitions and keeps only the stream cursor,
+        so the next run starts from a clean set of partitions.
+
+        Args:
+            stream_instance (Stream): The stream instance being read.
+            catalog (DatCatalog): The catalog containing information about the data streams.
+            configured_stream (DatDocumentStream): The configured stream to be read.
+            stream_state (StreamState): The incoming state of the stream.
+            partitions (List[Mapping[str, Any]]): The partitions returned by `Stream.partitions`.
+
+        Yields:
+            Generator[DatMessage, Any, Any]: Records and state messages of the stream.
+        """
+        cursor_field = configured_stream.cursor_field \
+            if configured_stream.read_sync_mode == ReadSyncMode.INCREMENTAL else None
+        stream_cursor_value = self._get_cursor_value(configured_stream, stream_state)
+        previous_partition_states = stream_state.data.get(PARTITIONS_STATE_KEY) or {}
+        partition_states: Dict[str, Dict[str, Any]] = {}
+        partition_readers = []
+        for partition in partitions:
+            key = stream_instance.partition_key(partition)
+            partition_state = {'cursor': None, 'completed': False, **(previous_partition_states.get(key) or {})}
+            partition_states[key] = partition_state
+            if partition_state['completed']:
+                logger.info(f'Stream: {configured_stream.name} skipping completed partition {key}')
+                continue
+            cursor_value = partition_state['cursor'] if partition_state['cursor'] is not None \
+                else stream_cursor_value
+            partition_readers.append(functools.partial(
+                self._read_partition, stream_instance, catalog, configured_stream, key, partition, cursor_value))
+
+        max_workers = stream_instance._max_concurrent_partitions
+        logger.info(f'Stream: {configured_stream.name} reading {len(partition_readers)} '
+                    f'of {len(partitions)} partitions')
+        if max_workers and max_workers > 1 and len(partition_readers) > 1:
+            records = read_concurrently(
+                partition_readers,
+                max_workers=max_workers,
+                max_queue_size=self._concurrent_read_queue_size,
+            )
+        else:
+            records = (item for partition_reader in partition_readers for item in partition_reader())
+
+        def _checkpoint() -> DatMessage:
+            return stream_instance._checkpoint_stream_state(configured_stream, StreamState(
+                data={PARTITIONS_STATE_KEY: {k: dict(v) for k, v in partition_states.items()}},
+                stream_status=StreamStatus.RUNNING,
+            ))
+
+        checkpointers = {
+            key: stream_instance._get_state_checkpointer(partition_state['cursor'])
+            for key, partition_state in partition_states.items()
+        }
+        for key, record in records:
+            partition_state = partition_states[key]
+            checkpointer = checkpointers[key]
+            if record is _PARTITION_DONE:
+                if checkpointer.max_cursor is not None:
+                    partition_state['cursor'] = checkpointer.max_cursor
+                partition_state['completed'] = True
+                yield _checkpoint()
+                continue
+            stream_instance._observe_record(checkpointer, cursor_field, record)
+            yield record
+            if cursor_field and checkpointer.should_checkpoint():
+                partition_state['cursor'] = checkpointer.checkpoint()
+                yield _checkpoint()
+
+        stream_state_data = {}
+        if cursor_field:
+            cursor_value = max_cursor(
+                [v['cursor'] for v in partition_states.values()] + [stream_cursor_value],
+                sort_key=stream_instance._cursor_sort_key,
+            )
+            if cursor_value is not None:
+                stream_state_data[cursor_field] = cursor_value
+        logger.info(f'Stream: {configured_stream.name} complete')
+        yield DatMessage(
+            type=Type.STATE,
+            state=DatStateMessage(
+                stream=configured_stream,
+                stream_state=StreamState(
+                    data=stream_state_data,
+                    stream_status=StreamStatus.COMPLETED,
+                ),
             )
-            stream_instance = stream_instances.get(configured_stream.name)
-            stream_state = state.get(configured_stream.name, StreamState(data={})) if state else StreamState(data={})
-            if configured_stream.read_sync_mode == ReadSyncMode.INCREMENTAL:
-                configured_stream.cursor_field = configured_stream.cursor_field or stream_instance._default_cursor
-                logger.info('Calling read_incremental')
-                records = self._read_incremental(stream_instance, catalog, configured_stream, stream_state)
-            else:
-                records = self._read_full_refresh(stream_instance, catalog, configured_stream)
-
-            try:
-                first_record = next(records)
-                stream_state = self._build_stream_state_from_record(stream_instance, configured_stream, first_record) 
-                
-                yield stream_instance._checkpoint_stream_state(configured_stream, stream_state)
-                yield first_record
-
-                _record_count = 1
-                for record in records:
-                    _record_count += 1
-                    if configured_stream.read_sync_mode == ReadSyncMode.INCREMENTAL and \
-                        stream_instance._should_checkpoint_state(
-                            configured_stream.cursor_field, stream_state, record, _record_count):
-                        stream_state_data = {
-                            configured_stream.cursor_field: stream_instance._get_cursor_value_from_record(
-                                configured_stream.cursor_field, record)
-                        }
-                        stream_state = StreamState(
-                            data=stream_state_data,
-                            stream_status=StreamStatus.RUNNING,
-                        )
-                        yield stream_instance._checkpoint_stream_state(configured_stream, stream_state)
-                    yield record
-                logger.info(f'Stream: {configured_stream.name} complete')
-                yield DatMessage(
-                    type=Type.STATE,
-                    state=DatStateMessage(
-                        stream=configured_stream,
-                        stream_state=StreamState(
-                            data=stream_state_data,
-                            stream_status=StreamStatus.COMPLETED,
-                        ),
-                    )
-                )
-            except StopIteration:
-                logger.warning(f"The stream {configured_stream.name} has no records")
+        )
+
+    def _read_partition(
+        self,
+        stream_instance: Stream,
+        catalog: DatCatalog,
+        configured_stream: DatDocumentStream,
+        key: str,
+        partition: Mapping[str, Any],
+        cursor_value: Any,
+    ) -> Generator[Tuple[str, Any], Any, Any]:
+        """
+        Reads a single partition and tags every record with the partition key. The
+        partition is closed with a `_PARTITION_DONE` marker.
+        """
+        records = stream_instance.read_partition_records(
+            catalog=catalog,
+            configured_stream=configured_stream,
+            partition=partition,
+            cursor_value=cursor_value,
+        )
+        if isinstance(stream_instance, AsyncStream):
+            records = iterate_sync(records)
+        for record in records:
+            yield key, record
+        yield key, _PARTITION_DONE
 
     def _build_stream_state_from_record(self,
         stream_instance: Stream,
@@ -214,11 +507,12 @@ class SourceBase(ConnectorBase):
         be fetched incrementally
         """
         _cursor_value = stream_state.data.get(configured_stream.cursor_field)
-        yield from stream_instance.read_records(
+        records = stream_instance.read_records(
                 catalog=catalog,
                 configured_stream=configured_stream,
                 cursor_value=_cursor_value
             )
+        yield from iterate_sync(records) if isinstance(stream_instance, AsyncStream) else records
     
     def _read_full_refresh(self,
         stream_instance: Stream,
@@ -228,8 +522,161 @@ class SourceBase(ConnectorBase):
         """
         Fetch the entire data
         """
-        yield from stream_instance.read_records(
+        records = stream_instance.read_records(
                 catalog=catalog,
                 configured_stream=configured_stream,
                 cursor_value=None
             )
+        yield from iterate_sync(records) if isinstance(stream_instance, AsyncStream) else records
+
+
+
+async def _chain_async(stream_readers: List[functools.partial]) -> AsyncGenerator[DatMessage, Any]:
+    for stream_reader in stream_readers:
+        async for message in stream_reader():
+            yield message
+
+
+def _utf8_size(document_chunk: Optional[str]) -> int:
+    if not document_chunk:
+        return 0
+    # Most chunks are ASCII, whose size is their length
+    return len(document_chunk) if document_chunk.isascii() else len(document_chunk.encode('utf-8'))
+
+
+class _ReadMetrics:
+    """
+    Counts the records (`source_records`) and UTF-8 bytes of their document chunks (`source_bytes`)
+    read per stream, and returns the TRACE message to emit when one is due.
+    """
+
+    def __init__(self) -> None:
+        self._counters: Dict[str, Tuple[Any, Any]] = {}
+
+    def observe(self, message: DatMessage) -> Optional[DatMessage]:
+        if message.type == Type.RECORD:
+            record = message.record
+            n_records = 1
+            n_bytes = _utf8_size(record.data.document_chunk)
+        elif message.type == Type.RECORD_BATCH:
+            record = message.record_batch
+            n_records = len(record)
+            n_bytes = sum(map(_utf8_size, record.document_chunks))
+        else:
+            return None
+        stream = record.stream.name
+        counters = self._counters.get(stream)
+        if counters is None:
+            counters = self._counters[stream] = (
+                metrics.counter('source_records', stream=stream),
+                metrics.counter('source_bytes', stream=stream),
+            )
+        counters[0].inc(n_records)
+        counters[1].inc(n_bytes)
+        return metrics.due_trace_message()
+
+
+class _StreamReadTracker:
+    """
+    Keeps the state bookkeeping of a single stream while it is being read, so that
+    `SourceBase.read` and `SourceBase.aread` emit exactly the same state messages.
+
+    Incremental reads are checkpointed according to the stream's checkpoint policy, see
+    `Stream._get_state_checkpointer`. A RUNNING state is emitted after the records it covers
+    and only when the cursor has moved forward since the previous checkpoint.
+
+    Args:
+        source (SourceBase): The source reading the stream.
+        stream_instance (Stream): The stream instance being read.
+        configured_stream (DatDocumentStream): The configured stream being read.
+        stream_state (StreamState): The incoming state of the stream.
+    """
+
+    def __init__(self,
+        source: SourceBase,
+        stream_instance: Stream,
+        configured_stream: DatDocumentStream,
+        stream_state: StreamState,
+    ) -> None:
+        self._source = source
+        self._stream_instance = stream_instance
+        self._configured_stream = configured_stream
+        self._cursor_field = configured_stream.cursor_field \
+            if configured_stream.read_sync_mode == ReadSyncMode.INCREMENTAL else None
+        self._checkpointer = stream_instance._get_state_checkpointer(
+            source._get_cursor_value(configured_stream, stream_state))
+        self._record_count = 0
+        self._stream_state_data = {}
+
+    def started_message(self) -> DatMessage:
+        """
+        Returns the STARTED state message of the stream.
+        """
+        return DatMessage(
+            type=Type.STATE,
+            state=DatStateMessage(
+                stream=self._configured_stream,
+                stream_state=StreamState(
+                    data=self._stream_state_data,
+                    stream_status=StreamStatus.STARTED,
+                ),
+            )
+        )
+
+    def on_record(self, record: DatMessage) -> Generator[DatMessage, Any, Any]:
+        """
+        Yields the given record along with a RUNNING state message when a checkpoint is due.
+        The first record is always preceded by a RUNNING state, holding the cursor the read
+        started from as no record is covered yet. A RECORD_BATCH counts as all of its records.
+        """
+        stream_instance = self._stream_instance
+        configured_stream = self._configured_stream
+        if not self._record_count:
+            if self._cursor_field and self._checkpointer.cursor is not None:
+                self._stream_state_data = {self._cursor_field: self._checkpointer.cursor}
+            yield stream_instance._checkpoint_stream_state(configured_stream, StreamState(
+                data=self._stream_state_data,
+                stream_status=StreamStatus.RUNNING,
+            ))
+        self._record_count += stream_instance._observe_record(self._checkpointer, self._cursor_field, record)
+        yield record
+        if self._cursor_field and self._is_checkpoint_due(record):
+            self._stream_state_data = {self._cursor_field: self._checkpointer.checkpoint()}
+            yield stream_instance._checkpoint_stream_state(configured_stream, StreamState(
+                data=self._stream_state_data,
+                stream_status=StreamStatus.RUNNING,
+            ))
+
+    def _is_checkpoint_due(self, record: DatMessage) -> bool:
+        stream_instance = self._stream_instance
+        if type(stream_instance)._should_checkpoint_state is Stream._should_checkpoint_state:
+            return self._checkpointer.should_checkpoint()
+        # Streams still overriding the former hook decide themselves
+        return self._checkpointer.cursor is not None and stream_instance._should_checkpoint_state(
+            self._cursor_field,
+            StreamState(data=self._stream_state_data, stream_status=StreamStatus.RUNNING),
+            record,
+            self._record_count,
+        )
+
+    def finish(self) -> Generator[DatMessage, Any, Any]:
+        """
+        Yields the COMPLETED state message, holding the largest cursor read, once all
+        records have been read. Nothing is yielded if the stream had no records.
+        """
+        if not self._record_count:
+            logger.warning(f"The stream {self._configured_stream.name} has no records")
+            return
+        if self._cursor_field and self._checkpointer.max_cursor is not None:
+            self._stream_state_data = {self._cursor_field: self._checkpointer.max_cursor}
+        logger.info(f'Stream: {self._configured_stream.name} complete')
+        yield DatMessage(
+            type=Type.STATE,
+            state=DatStateMessage(
+                stream=self._configured_stream,
+                stream_state=StreamState(
+                    data=self._stream_state_data,
+                    stream_status=StreamStatus.COMPLETED,
+                ),
+            )
+        )
@@ -0,0 +1,197 @@
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Callable, Iterable, Optional, Tuple
+
+# Cursor values of different kinds are ordered by kind first, so that they stay comparable
+_NUMERIC_CURSOR = 0
+_TEXT_CURSOR = 1
+
+
+def cursor_sort_key(value: Any) -> Tuple[int, Any]:
+    """
+    Returns a key that orders cursor values by their meaning rather than their
+    representation. Numbers and numeric strings are compared as numbers, datetimes and
+    ISO 8601 strings as epoch seconds (naive datetimes are treated as UTC), any other
+    string is compared lexicographically.
+
+    Args:
+        value (Any): The cursor value, never None.
+
+    Returns:
+        Tuple[int, Any]: The sort key.
+    """
+    if isinstance(value, bool):
+        return _NUMERIC_CURSOR, float(value)
+    if isinstance(value, (int, float)):
+        return _NUMERIC_CURSOR, value
+    if isinstance(value, datetime):
+        return _NUMERIC_CURSOR, _datetime_to_epoch(value)
+    if isinstance(value, str):
+        try:
+            return _NUMERIC_CURSOR, float(value)
+        except ValueError:
+            pass
+        try:
+            return _NUMERIC_CURSOR, _datetime_to_epoch(datetime.fromisoformat(value))
+        except ValueError:
+            return _TEXT_CURSOR, value
+    return _TEXT_CURSOR, str(value)
+
+
+def _datetime_to_epoch(value: datetime) -> float:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+def max_cursor(values: Iterable[Any], sort_key: Callable[[Any], Any] = cursor_sort_key) -> Any:
+    """
+    Returns the largest of the given cursor values, ignoring Nones.
+    Returns None if there is no value.
+    """
+    values = [value for value in values if value is not None]
+    if not values:
+        return None
+    return max(values, key=sort_key)
+
+
+class CheckpointPolicy:
+    """
+    Decides when a stream state should be checkpointed. A checkpoint is due as soon as
+    any of the configured intervals has been reached since the last checkpoint.
+
+    Args:
+        record_interval (Optional[int]): Number of records between checkpoints.
+        byte_interval (Optional[int]): Number of record payload bytes between checkpoints.
+        seconds_interval (Optional[float]): Wall clock seconds between checkpoints.
+    """
+
+    def __init__(self,
+        record_interval: Optional[int] = None,
+        byte_interval: Optional[int] = None,
+        seconds_interval: Optional[float] = None,
+    ) -> None:
+        self.record_interval = record_interval
+        self.byte_interval = byte_interval
+        self.seconds_interval = seconds_interval
+
+    def is_due(self, records: int, nbytes: int, seconds: float) -> bool:
+        """
+        Args:
+            records (int): Records seen since the last checkpoint.
+            nbytes (int): Payload bytes seen since the last checkpoint.
+            seconds (float): Seconds elapsed since the last checkpoint.
+
+        Returns:
+            bool: True if a checkpoint is due.
+        """
+        if self.record_interval and records >= self.record_interval:
+            return True
+        if self.byte_interval and nbytes >= self.byte_interval:
+            return True
+        if self.seconds_interval is not None and seconds >= self.seconds_interval:
+            return True
+        return False
+
+
+class StateCheckpointer:
+    """
+    Tracks the cursor of a stream while it is read and tells when its state should be
+    checkpointed.
+
+    The checkpointed cursor only ever moves forward. With an `out_of_order_window` of N the
+    cursor is held back to the smallest cursor among the last N records, so that records
+    arriving at most N positions late are not skipped when a run resumes from the checkpoint.
+    A checkpoint is only suggested when the policy is due and the cursor has advanced since
+    the last checkpoint.
+
+    Args:
+        policy (CheckpointPolicy): When to checkpoint.
+        initial_cursor (Any, optional): The cursor the read started from. Defaults to None.
+        out_of_order_window (int, optional): Number of records a cursor may arrive late. Defaults to 0.
+        sort_key (Callable[[Any], Any], optional): Orders cursor values. Defaults to cursor_sort_key.
+        is_same_cursor (Optional[Callable[[Any, Any], bool]], optional): Tells whether two
+            cursor values stand for the same position, in which case the cursor did not
+            advance. Defaults to None, only relying on `sort_key`.
+        clock (Callable[[], float], optional): Monotonic clock. Defaults to time.monotonic.
+    """
+
+    def __init__(self,
+        policy: CheckpointPolicy,
+        initial_cursor: Any = None,
+        out_of_order_window: int = 0,
+        sort_key: Callable[[Any], Any] = cursor_sort_key,
+        is_same_cursor: Optional[Callable[[Any, Any], bool]] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._policy = policy
+        self._sort_key = sort_key
+        self._is_same_cursor = is_same_cursor
+        self._clock = clock
+        self._window = deque(maxlen=out_of_order_window) if out_of_order_window else None
+        self._max_cursor = initial_cursor
+        self._safe_cursor = initial_cursor
+        self._checkpointed_cursor = initial_cursor
+        self._records = 0
+        self._nbytes = 0
+        self._last_checkpoint_at = clock()
+
+    @property
+    def max_cursor(self) -> Any:
+        """
+        The largest cursor seen so far.
+        """
+        return self._max_cursor
+
+    @property
+    def cursor(self) -> Any:
+        """
+        The cursor that is safe to resume from.
+        """
+        return self._safe_cursor
+
+    def observe(self, cursor_value: Any, nbytes: int = 0) -> None:
+        """
+        Records that a record with the given cursor value and payload size was emitted.
+        """
+        self._records += 1
+        self._nbytes += nbytes
+        if cursor_value is None:
+            return
+        key = self._sort_key(cursor_value)
+        if self._max_cursor is None or key > self._sort_key(self._max_cursor):
+            self._max_cursor = cursor_value
+        if self._window is None:
+            self._safe_cursor = self._max_cursor
+            return
+        self._window.append((key, cursor_value))
+        if len(self._window) < self._window.maxlen:
+            return
+        candidate_key, candidate = min(self._window, key=lambda item: item[0])
+        if self._safe_cursor is None or candidate_key > self._sort_key(self._safe_cursor):
+            self._safe_cursor = candidate
+
+    def should_checkpoint(self) -> bool:
+        """
+        Returns True if the policy is due and the cursor advanced since the last checkpoint.
+        """
+        if not self._policy.is_due(self._records, self._nbytes, self._clock() - self._last_checkpoint_at):
+            return False
+        if self._safe_cursor is None:
+            return False
+        if self._checkpointed_cursor is None:
+            return True
+        if self._is_same_cursor is not None and self._is_same_cursor(self._checkpointed_cursor, self._safe_cursor):
+            return False
+        return self._sort_key(self._safe_cursor) > self._sort_key(self._checkpointed_cursor)
+
+    def checkpoint(self) -> Any:
+        """
+        Marks a checkpoint and returns the cursor to be stored in the state.
+        """
+        self._records = 0
+        self._nbytes = 0
+        self._last_checkpoint_at = self._clock()
+        self._checkpointed_cursor = self._safe_cursor
+        return self._safe_cursor
@@ -0,0 +1,136 @@
+import asyncio
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterable, AsyncIterator, Callable, Iterable, Iterator, Sequence
+
+# Marks the end of a single reader's output in the merge queue
+_READER_DONE = object()
+
+
+class _ReaderError:
+    """
+    Carries an exception raised inside a reader thread over to the consuming thread.
+    """
+
+    def __init__(self, exc: BaseException) -> None:
+        self.exc = exc
+
+
+def read_concurrently(
+    readers: Sequence[Callable[[], Iterable[Any]]],
+    max_workers: int,
+    max_queue_size: int = 1000,
+) -> Iterator[Any]:
+    """
+    Run every reader on a bounded thread pool and merge their output into a single iterator.
+
+    Items produced by one reader keep their relative order; items of different readers
+    are interleaved in the order they become available. The merge queue is bounded, so a
+    fast reader blocks once `max_queue_size` items are waiting to be consumed instead of
+    buffering its whole output in memory.
+
+    If a reader raises, the exception is re-raised in the consuming thread and the other
+    readers are asked to stop. Closing the returned iterator stops the readers as well.
+
+    Args:
+        readers (Sequence[Callable[[], Iterable[Any]]]): Zero-argument callables each
+            returning an iterable, e.g. a partial of a generator function.
+        max_workers (int): Maximum number of readers running at the same time.
+        max_queue_size (int, optional): Maximum number of produced but not yet consumed
+            items. Defaults to 1000.
+
+    Yields:
+        Iterator[Any]: Items produced by the readers.
+    """
+    merged: queue.Queue = queue.Queue(maxsize=max_queue_size)
+    stop = threading.Event()
+
+    def _put(item: Any) -> bool:
+        # Poll so that a blocked producer notices when the consumer has gone away
+        while not stop.is_set():
+            try:
+                merged.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _drain(reader: Callable[[], Iterable[Any]]) -> None:
+        try:
+            for item in reader():
+                if not _put(item):
+                    return
+        except BaseException as exc:
+            _put(_ReaderError(exc))
+        finally:
+            _put(_READER_DONE)
+
+    executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='dat-read')
+    try:
+        for reader in readers:
+            executor.submit(_drain, reader)
+        pending = len(readers)
+        while pending:
+            item = merged.get()
+            if item is _READER_DONE:
+                pending -= 1
+            elif isinstance(item, _ReaderError):
+                raise item.exc
+            else:
+                yield item
+    finally:
+        stop.set()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+async def aread_concurrently(
+    readers: Sequence[Callable[[], AsyncIterable[Any]]],
+    max_concurrency: int,
+    max_queue_size: int = 1000,
+) -> AsyncIterator[Any]:
+    """
+    Asyncio counterpart of `read_concurrently`. Every reader runs as a task on the
+    current event loop, at most `max_concurrency` of them at the same time, and their
+    output is merged through a bounded queue.
+
+    Args:
+        readers (Sequence[Callable[[], AsyncIterable[Any]]]): Zero-argument callables each
+            returning an async iterable, e.g. a partial of an async generator function.
+        max_concurrency (int): Maximum number of readers running at the same time.
+        max_queue_size (int, optional): Maximum number of produced but not yet consumed
+            items. Defaults to 1000.
+
+    Yields:
+        AsyncIterator[Any]: Items produced by the readers.
+    """
+    merged: asyncio.Queue = asyncio.Queue(maxsize=max_queue_size)
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def _drain(reader: Callable[[], AsyncIterable[Any]]) -> None:
+        try:
+            async with semaphore:
+                async for item in reader():
+                    await merged.put(item)
+        except asyncio.CancelledError:
+            raise
+        except BaseException as exc:
+            await merged.put(_ReaderError(exc))
+            return
+        await merged.put(_READER_DONE)
+
+    tasks = [asyncio.create_task(_drain(reader)) for reader in readers]
+    try:
+        pending = len(tasks)
+        while pending:
+            item = await merged.get()
+            if item is _READER_DONE:
+                pending -= 1
+            elif isinstance(item, _ReaderError):
+                raise item.exc
+            else:
+                yield item
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
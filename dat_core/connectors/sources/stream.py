@@ -1,3 +1,4 @@
+import json
 import time
 import uuid
 from typing import Dict, List, Optional, Iterable, Mapping, Any, Generator
@@ -9,12 +10,19 @@ from dat_core.pydantic_models import (
     DatCatalog,
     DatMessage,
     DatDocumentMessage,
+    DatRecordBatchMessage,
     Data,
     Type,
     DatStateMessage,
     StreamState,
     StreamMetadata,
 )
+from dat_core.connectors.sources.checkpoint import (
+    CheckpointPolicy,
+    StateCheckpointer,
+    cursor_sort_key,
+    max_cursor,
+)
 def to_snake_case(_str):
     """
     Given a camel_case string, convert it
@@ -33,9 +41,19 @@ class Stream(ABC):
     """
     _name = None
     _json_schema = None
+    # A state checkpoint is emitted once any of these intervals (records, bytes, seconds) is reached
     _state_checkpoint_interval = None
+    _state_checkpoint_bytes = None
+    _state_checkpoint_seconds = 60
+    # Number of records a cursor value may arrive out of order
+    _cursor_out_of_order_window = 0
     _default_cursor = None
     _dat_run_id = None
+    # Number of partitions read at the same time for a partitioned stream
+    _max_concurrent_partitions = 1
+    # Built once per stream instance and shared by its records, see `_build_record_message`
+    _stream_model = None
+    _metadata_constants = None
 
     @classmethod
     @property
@@ -72,7 +90,16 @@ class Stream(ABC):
             read_sync_mode=self.read_sync_mode,
             supported_sync_modes=[ReadSyncMode.FULL_REFRESH, ReadSyncMode.INCREMENTAL]
         )
-    
+
+    def _get_stream_model(self) -> DatDocumentStream:
+        """
+        Returns `as_pydantic_model()`, built once per stream instance and shared by
+        all the records of the stream.
+        """
+        if self._stream_model is None:
+            self._stream_model = self.as_pydantic_model()
+        return self._stream_model
+
     def as_record_message(self,
         configured_stream: DatDocumentStream,
         doc_chunk: str,
@@ -93,23 +120,143 @@ class Stream(ABC):
         Returns:
             DatMessage: A DatMessage containing a DatDocumentMessage representing a record.
         """
+        return self._build_record_message(
+            configured_stream, doc_chunk, data_entity, dat_last_modified,
+            extra_data, extra_metadata, now=int(time.time()))
+
+    def as_record_messages(self,
+        configured_stream: DatDocumentStream,
+        chunks: Iterable[Mapping[str, Any]]) -> List[DatMessage]:
+        """Generates the record messages of many document chunks in one call.
+
+        Args:
+            configured_stream (DatDocumentStream): The configured document stream.
+            chunks (Iterable[Mapping[str, Any]]): One mapping per record with the keyword
+                arguments of `as_record_message`: `doc_chunk`, `data_entity` and optionally
+                `dat_last_modified`, `extra_data` and `extra_metadata`.
+
+        Returns:
+            List[DatMessage]: The record messages, in the order of `chunks`.
+        """
+        now = int(time.time())
+        return [
+            self._build_record_message(
+                configured_stream,
+                chunk['doc_chunk'],
+                chunk['data_entity'],
+                chunk.get('dat_last_modified'),
+                chunk.get('extra_data'),
+                chunk.get('extra_metadata'),
+                now=now,
+            )
+            for chunk in chunks
+        ]
+
+    def as_record_batch_message(self,
+        configured_stream: DatDocumentStream,
+        chunks: Iterable[Mapping[str, Any]]) -> DatMessage:
+        """Generates a single RECORD_BATCH message holding many document chunks.
+
+        Unless `get_metadata` is overridden, the columns are filled straight from the
+        chunks, without building a message per record.
+
+        Args:
+            configured_stream (DatDocumentStream): The configured document stream.
+            chunks (Iterable[Mapping[str, Any]]): One mapping per record, as for
+                `as_record_messages`. `extra_metadata` must hold the `dat_record_id`.
+
+        Returns:
+            DatMessage: A DatMessage containing a DatRecordBatchMessage.
+        """
+        if type(self).get_metadata is not Stream.get_metadata:
+            return DatMessage.as_record_batch(self.as_record_messages(configured_stream, chunks))
+        now = int(time.time())
+        constants = self._get_metadata_constants()
+        ids, doc_chunks, metadata_rows, data_rows = [], [], [], []
+        for chunk in chunks:
+            metadata = dict(
+                constants,
+                dat_document_entity=chunk['data_entity'],
+                dat_last_modified=chunk.get('dat_last_modified') or now,
+                dat_document_chunk=chunk['doc_chunk'],
+            )
+            metadata.update(chunk.get('extra_metadata') or {})
+            ids.append(metadata.pop('dat_record_id'))
+            doc_chunks.append(chunk['doc_chunk'])
+            metadata_rows.append(metadata)
+            data_rows.append(dict(chunk.get('extra_data') or {}))
+        vectors = [row.pop('vectors', None) for row in data_rows]
+        n_with_vectors = sum(vector is not None for vector in vectors)
+        if n_with_vectors not in (0, len(vectors)):
+            raise ValueError('Either all or none of the chunks of a batch must have vectors')
+        return DatMessage(
+            type=Type.RECORD_BATCH,
+            record_batch=DatRecordBatchMessage.from_rows(
+                stream=self._get_stream_model(),
+                namespace=configured_stream.namespace,
+                ids=ids,
+                document_chunks=doc_chunks,
+                metadata_rows=metadata_rows,
+                data_rows=data_rows,
+                vectors=vectors if n_with_vectors else None,
+            )
+        )
+
+    def _get_metadata_constants(self) -> Dict[str, Any]:
+        """
+        Returns the metadata fields that are the same for every record of the stream,
+        computed once per stream instance.
+        """
+        if self._metadata_constants is None:
+            self._metadata_constants = dict(
+                dat_source=self._config.module_name,
+                dat_stream=self.name,
+                dat_run_id=self.dat_run_id,
+            )
+        return self._metadata_constants
+
+    def _build_record_message(self,
+        configured_stream: DatDocumentStream,
+        doc_chunk: str,
+        data_entity: str,
+        dat_last_modified: Optional[int],
+        extra_data: Optional[Mapping[Any, Any]],
+        extra_metadata: Optional[Mapping[Any, Any]],
+        now: int) -> DatMessage:
+        """
+        Builds a record message. `now` is used as `dat_last_modified` when it is not provided.
+
+        Unless `get_metadata` is overridden, the metadata is built straight from the
+        fields that are constant for the stream (`dat_source`, `dat_stream` and
+        `dat_run_id`), which are computed once per stream instance.
+        """
         if extra_data is None:
             extra_data = {}
         if extra_metadata is None:
             extra_metadata = {}
+        if type(self).get_metadata is Stream.get_metadata:
+            metadata = StreamMetadata(
+                dat_document_entity=data_entity,
+                dat_last_modified=dat_last_modified or now,
+                dat_document_chunk=doc_chunk,
+                **self._get_metadata_constants(),
+                **extra_metadata
+            )
+        else:
+            metadata = self.get_metadata(
+                specs=self._config,
+                document_chunk=doc_chunk,
+                data_entity=data_entity,
+                dat_last_modified=dat_last_modified or now,
+                **extra_metadata
+            )
         data = Data(
                     document_chunk=doc_chunk,
-                    metadata=self.get_metadata(
-                        specs=self._config,
-                        document_chunk=doc_chunk,
-                        data_entity=data_entity,
-                        dat_last_modified=dat_last_modified,
-                        **extra_metadata
-                    ),
+                    metadata=metadata,
                     **extra_data
                 )
         doc_msg = DatDocumentMessage(
-                stream=self.as_pydantic_model(),
+                stream=self._get_stream_model(),
                 data=data,
                 namespace=configured_stream.namespace
             )
@@ -117,7 +264,7 @@ class Stream(ABC):
             type=Type.RECORD,
             record=doc_msg
         )
-    
+
     def get_metadata(self,
         specs: ConnectorSpecification,
         document_chunk: str,
@@ -155,15 +302,129 @@ class Stream(ABC):
         cursor_value: Any = None
     ) -> Generator[DatMessage, Any, Any]:
         pass
-    
+
+    def partitions(self,
+        configured_stream: DatDocumentStream,
+        cursor_value: Any = None
+    ) -> Optional[List[Mapping[str, Any]]]:
+        """
+        Declares the slices (e.g. cursor windows or ID ranges) this stream can be read in.
+        Partitioned streams are read with `read_partition_records`, up to
+        `_max_concurrent_partitions` partitions at the same time, and keep a cursor per
+        partition in their state so that an interrupted run resumes only the unfinished ones.
+
+        Args:
+            configured_stream (DatDocumentStream): The configured document stream.
+            cursor_value (Any, optional): The stream level cursor value of an incremental read. Defaults to None.
+
+        Returns:
+            Optional[List[Mapping[str, Any]]]: JSON serializable partitions or None if the stream
+                is not partitioned.
+        """
+        return None
+
+    def partition_key(self, partition: Mapping[str, Any]) -> str:
+        """
+        Returns a stable key identifying the partition in the stream state.
+
+        Args:
+            partition (Mapping[str, Any]): A partition as returned by `partitions`.
+
+        Returns:
+            str: The partition key.
+        """
+        return json.dumps(partition, sort_keys=True, default=str)
+
+    def read_partition_records(self,
+        catalog: DatCatalog,
+        configured_stream: DatDocumentStream,
+        partition: Mapping[str, Any],
+        cursor_value: Any = None
+    ) -> Generator[DatMessage, Any, Any]:
+        """
+        Reads the records of a single partition. Must be implemented by streams that
+        return partitions and must be safe to call from several threads at once.
+
+        Args:
+            catalog (DatCatalog): The catalog.
+            configured_stream (DatDocumentStream): The configured document stream.
+            partition (Mapping[str, Any]): The partition to read.
+            cursor_value (Any, optional): The cursor value to resume the partition from. Defaults to None.
+
+        Yields:
+            Generator[DatMessage, Any, Any]: Records of the partition, ordered by cursor.
+        """
+        raise NotImplementedError()
+
+    def _checkpoint_policy(self) -> CheckpointPolicy:
+        """Returns the policy deciding when the state of this stream is checkpointed.
+
+        Returns:
+            CheckpointPolicy: Built from the `_state_checkpoint_*` class attributes.
+        """
+        return CheckpointPolicy(
+            record_interval=self._state_checkpoint_interval,
+            byte_interval=self._state_checkpoint_bytes,
+            seconds_interval=self._state_checkpoint_seconds,
+        )
+
+    def _get_state_checkpointer(self, initial_cursor: Any = None) -> StateCheckpointer:
+        """Creates the cursor tracker used while this stream is read.
+
+        Args:
+            initial_cursor (Any, optional): The cursor value the read starts from. Defaults to None.
+
+        Returns:
+            StateCheckpointer: A new checkpointer for one read of this stream.
+        """
+        return StateCheckpointer(
+            policy=self._checkpoint_policy(),
+            initial_cursor=initial_cursor,
+            out_of_order_window=self._cursor_out_of_order_window,
+            sort_key=self._cursor_sort_key,
+            is_same_cursor=self._compare_cursor_values,
+        )
+
+    def _cursor_sort_key(self, cursor_value: Any) -> Any:
+        """Orders cursor values. Streams with cursors that do not order naturally as
+        numbers, datetimes, ISO 8601 strings or plain strings should override this.
+
+        Args:
+            cursor_value (Any): A cursor value, never None.
+
+        Returns:
+            Any: A key comparable with the keys of the other cursor values of this stream.
+        """
+        return cursor_sort_key(cursor_value)
+
+    def _compare_cursor_values(self, old_cursor_value: Any, current_cursor_value: Any) -> bool:
+        """Compares old and current cursor values. A checkpoint is only emitted when the
+        cursor is not the same as the one of the previous checkpoint, and orders after it
+        according to `_cursor_sort_key`.
+
+        Args:
+            old_cursor_value (Any): The old cursor value.
+            current_cursor_value (Any): The current cursor value.
+
+        Returns:
+            bool: True if the cursor values are the same, False otherwise.
+        """
+        # Should be implemented by streams
+        return old_cursor_value == current_cursor_value
+
     def _should_checkpoint_state(self, cursor_field: str, stream_state: StreamState, record: DatMessage, _record_count: int) -> bool:
         """Determines whether to checkpoint the stream state based on the provided parameters.
 
+        Deprecated: checkpoints are decided by `_checkpoint_policy`. This is only called
+        for the incremental reads of streams overriding it, which then decide themselves
+        when a checkpoint is due. The checkpointed cursor is still the one that is safe
+        to resume from, and no checkpoint is emitted before there is one.
+
         Args:
             cursor_field (str): The field used for cursor comparison.
-            stream_state (StreamState): The current stream state.
+            stream_state (StreamState): The last checkpointed stream state.
             record (DatMessage): The record to compare.
-            _record_count (int): The current record count.
+            _record_count (int): The number of records read so far.
 
         Returns:
             bool: True if the stream state should be checkpointed, False otherwise.
@@ -177,38 +438,106 @@ class Stream(ABC):
             return True
         else:
             return False
-    
-    def _compare_cursor_values(self, old_cursor_value: Any, current_cursor_value: Any) -> bool:
-        """Compares old and current cursor values.
+
+    def _record_size(self, record: DatMessage) -> int:
+        """Estimates the payload size of a record for byte based checkpointing.
 
         Args:
-            old_cursor_value (Any): The old cursor value.
-            current_cursor_value (Any): The current cursor value.
+            record (DatMessage): The record, or a RECORD_BATCH.
 
         Returns:
-            bool: True if the cursor values are the same, False otherwise.
+            int: Length of the document chunk of the record. For a RECORD_BATCH, the sum
+                of `_record_batch_sizes`.
         """
-        # Should be implemented by streams
-        return old_cursor_value == current_cursor_value
-    
+        if record.type == Type.RECORD_BATCH:
+            return sum(self._record_batch_sizes(record.record_batch))
+        if record.record and record.record.data and record.record.data.document_chunk:
+            return len(record.record.data.document_chunk)
+        return 0
+
+    def _record_batch_sizes(self, record_batch: DatRecordBatchMessage) -> List[int]:
+        """Estimates the payload size of every record of a batch, see `_record_size`.
+
+        Args:
+            record_batch (DatRecordBatchMessage): The batch.
+
+        Returns:
+            List[int]: Length of the document chunk of every record, plus its share of
+                the vector matrix if the batch has one.
+        """
+        sizes = [len(chunk or '') for chunk in record_batch.document_chunks]
+        if record_batch.vectors is not None and len(record_batch):
+            row_nbytes = record_batch.vectors.nbytes // len(record_batch)
+            sizes = [size + row_nbytes for size in sizes]
+        return sizes
+
+    def _observe_record(self, checkpointer: StateCheckpointer, cursor_field: Optional[str], record: DatMessage) -> int:
+        """Passes the cursor and size of a record, or of every record of a RECORD_BATCH,
+        to the checkpointer of a read.
+
+        Args:
+            checkpointer (StateCheckpointer): The checkpointer of the read.
+            cursor_field (str | None): The cursor field if the read is incremental.
+            record (DatMessage): The record or batch read.
+
+        Returns:
+            int: The number of records observed.
+        """
+        if record.type != Type.RECORD_BATCH:
+            checkpointer.observe(self._get_cursor_value_from_record(cursor_field, record), self._record_size(record))
+            return 1
+        record_batch = record.record_batch
+        cursor_values = self._get_cursor_values_from_record_batch(cursor_field, record_batch)
+        for cursor_value, size in zip(cursor_values, self._record_batch_sizes(record_batch)):
+            checkpointer.observe(cursor_value, size)
+        return len(record_batch)
+
     def _get_cursor_value_from_record(self, cursor_field: Optional[str], record: DatMessage) -> Any:
         """Extracts the cursor value from a record.
 
         Args:
             cursor_field (str | None): The cursor field if available.
-            record (DatMessage): The record to extract the cursor value from.
+            record (DatMessage): The record to extract the cursor value from. For a
+                RECORD_BATCH, the largest cursor of its records.
 
         Returns:
             Any: The cursor value extracted from the record.
         """
         if not cursor_field:
             return None
-        
+        if record.type == Type.RECORD_BATCH:
+            return max_cursor(
+                self._get_cursor_values_from_record_batch(cursor_field, record.record_batch),
+                sort_key=self._cursor_sort_key,
+            )
+
         if record.record.data:
             cursor_value = self._cursor_value_from_record_data(cursor_field, record.record.data)\
                 or self._get_cursor_value_from_metadata(cursor_field, record.record.data.metadata)
             return cursor_value
-    
+
+    def _get_cursor_values_from_record_batch(self,
+        cursor_field: Optional[str],
+        record_batch: DatRecordBatchMessage) -> List[Any]:
+        """Extracts the cursor value of every record of a batch, from its data columns
+        or else its metadata columns, as `_get_cursor_value_from_record` does for a record.
+
+        Args:
+            cursor_field (str | None): The cursor field if available.
+            record_batch (DatRecordBatchMessage): The batch.
+
+        Returns:
+            List[Any]: The cursor value of every record, None where it has none.
+        """
+        if not cursor_field:
+            return [None] * len(record_batch)
+        if cursor_field == 'dat_record_id':
+            return list(record_batch.ids)
+        missing = [None] * len(record_batch)
+        data_values = record_batch.data_columns.get(cursor_field, missing)
+        metadata_values = record_batch.metadata.get(cursor_field, missing)
+        return [data_value or metadata_value for data_value, metadata_value in zip(data_values, metadata_values)]
+
     def _cursor_value_from_record_data(self, cursor_field: str, record_data: Data) -> Any:
         """Extracts the cursor value from record data.
 
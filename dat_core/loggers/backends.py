@@ -0,0 +1,133 @@
+import os
+import queue
+import threading
+from typing import List, Optional
+from dat_core.pydantic_models import DatMessage, Level
+from dat_core.serialization import stdout_writer
+
+# Environment variable with the minimum level of the logged messages
+LOG_LEVEL_ENV = 'DAT_LOG_LEVEL'
+# Environment variable selecting the backend, 'sync' or 'buffered'
+LOG_BACKEND_ENV = 'DAT_LOG_BACKEND'
+
+# Levels from the least to the most severe
+LEVEL_SEVERITY = {
+    Level.TRACE: 0,
+    Level.DEBUG: 1,
+    Level.INFO: 2,
+    Level.WARNING: 3,
+    Level.ERROR: 4,
+    Level.FATAL: 5,
+}
+
+
+def get_log_level() -> Level:
+    """
+    Returns the minimum level selected with the `DAT_LOG_LEVEL` environment variable,
+    TRACE, i.e. everything, by default.
+    """
+    return Level(os.environ.get(LOG_LEVEL_ENV, Level.TRACE.value).upper())
+
+
+class LogBackend:
+    """
+    Writes the log messages of the logger. This one writes every message right away to
+    the standard output.
+    """
+
+    def write(self, message: DatMessage) -> None:
+        stdout_writer.write(message)
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class BufferedLogBackend(LogBackend):
+    """
+    Hands the log messages over to a background thread that serializes them and writes
+    them to the standard output in batches, with one flush per batch.
+
+    The queue is bounded: once `max_queue_size` messages are waiting, logging blocks
+    until the writer catches up rather than dropping messages. Log messages may be
+    written after messages that other code writes directly to the standard output in
+    the meantime; call `flush` where the order matters.
+
+    Args:
+        max_queue_size (int, optional): Maximum number of messages waiting to be written. Defaults to 10000.
+        max_batch_size (int, optional): Maximum number of messages written at once. Defaults to 500.
+    """
+
+    def __init__(self, max_queue_size: int = 10000, max_batch_size: int = 500) -> None:
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue_size)
+        self._max_batch_size = max_batch_size
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name='dat-log-writer', daemon=True)
+        self._thread.start()
+
+    def write(self, message: DatMessage) -> None:
+        if self._closed:
+            stdout_writer.write(message)
+            return
+        self._queue.put(message)
+
+    def flush(self) -> None:
+        """
+        Blocks until every message logged so far is written.
+        """
+        if not self._closed:
+            self._queue.join()
+
+    def close(self) -> None:
+        """
+        Writes the pending messages and stops the writer thread. Messages logged afterwards
+        are written right away.
+        """
+        if self._closed:
+            return
+        self._queue.put(None)
+        self._thread.join()
+        self._closed = True
+
+    def _run(self) -> None:
+        stop = False
+        while not stop:
+            batch: List[DatMessage] = []
+            item = self._queue.get()
+            n_items = 1
+            while item is not None:
+                batch.append(item)
+                if len(batch) >= self._max_batch_size:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                    n_items += 1
+                except queue.Empty:
+                    break
+            stop = item is None
+            try:
+                stdout_writer.write_many(batch)
+            except Exception:
+                # A logger must not take the process down, e.g. when stdout was closed
+                pass
+            finally:
+                for _ in range(n_items):
+                    self._queue.task_done()
+
+
+def create_log_backend(name: Optional[str] = None) -> LogBackend:
+    """
+    Returns the backend selected with `name` or else with the `DAT_LOG_BACKEND`
+    environment variable, 'sync' by default.
+
+    Raises:
+        ValueError: If the backend is unknown.
+    """
+    name = (name or os.environ.get(LOG_BACKEND_ENV) or 'sync').lower()
+    if name == 'sync':
+        return LogBackend()
+    if name == 'buffered':
+        return BufferedLogBackend()
+    raise ValueError(f'Unknown log backend {name}, expected sync or buffered')
@@ -1,4 +1,12 @@
+import atexit
+from typing import Any, Tuple
 from dat_core.pydantic_models import DatLogMessage, DatMessage, Type, Level
+from dat_core.loggers.backends import (
+    LEVEL_SEVERITY,
+    LogBackend,
+    create_log_backend,
+    get_log_level,
+)
 
 class DefaultLogger:
     """
@@ -13,6 +21,12 @@ class DefaultLogger:
     - TRACE
     - FATAL
     - CRITICAL
+
+    Messages below the minimum level (`DAT_LOG_LEVEL`, TRACE by default) are dropped
+    before anything is built, and a message given with `args` is only formatted, with
+    `msg % args`, if it is logged. The messages are written by a backend (`DAT_LOG_BACKEND`):
+    right away by default, or in batches by a background thread with 'buffered'. The
+    backend is flushed on FATAL and when the interpreter exits.
     
     This class is implemented as a singleton, meaning only one instance of DefaultLogger will 
     exist throughout the lifetime of the application.
@@ -27,120 +41,134 @@ class DefaultLogger:
         """
         if cls._instance is None:
             cls._instance = super(DefaultLogger, cls).__new__(cls, *args, **kwargs)
+            cls._instance._min_severity = LEVEL_SEVERITY[get_log_level()]
+            cls._instance._backend = create_log_backend()
+            atexit.register(cls._instance.close)
         return cls._instance
 
-    def info(self, msg: str) -> None:
+    def set_level(self, level: Level) -> None:
         """
-        Logs a message at the INFO level.
-        
+        Sets the minimum level of the logged messages.
+
         Args:
-            msg (str): The message to be logged.
+            level (Level): The minimum level.
+        """
+        self._min_severity = LEVEL_SEVERITY[Level(level)]
+
+    def set_backend(self, backend: LogBackend) -> None:
+        """
+        Replaces the backend writing the messages, closing the current one first.
+
+        Args:
+            backend (LogBackend): The new backend.
+        """
+        self._backend.close()
+        self._backend = backend
+
+    def is_enabled_for(self, level: Level) -> bool:
+        """
+        Returns True if messages of the given level are logged, e.g. to skip building an
+        expensive message.
         """
-        _msg = DatMessage(
+        return LEVEL_SEVERITY[level] >= self._min_severity
+
+    def flush(self) -> None:
+        """
+        Blocks until every message logged so far is written.
+        """
+        self._backend.flush()
+
+    def close(self) -> None:
+        """
+        Writes the pending messages and releases the backend.
+        """
+        self._backend.close()
+
+    def _log(self, level: Level, msg: str, args: Tuple[Any, ...]) -> None:
+        if LEVEL_SEVERITY[level] < self._min_severity:
+            return
+        if args:
+            msg = msg % args
+        self._backend.write(DatMessage(
             type=Type.LOG,
             log=DatLogMessage(
-                level=Level.INFO,
+                level=level,
                 message=msg
             )
-        )
-        print(_msg.model_dump_json(), flush=True)
+        ))
+        if level == Level.FATAL:
+            self._backend.flush()
 
-    def debug(self, msg: str) -> None:
+    def info(self, msg: str, *args: Any) -> None:
+        """
+        Logs a message at the INFO level.
+        
+        Args:
+            msg (str): The message to be logged.
+            *args (Any): Values formatted into `msg` with `%`, only if the message is logged.
+        """
+        self._log(Level.INFO, msg, args)
+
+    def debug(self, msg: str, *args: Any) -> None:
         """
         Logs a message at the DEBUG level.
         
         Args:
             msg (str): The message to be logged.
+            *args (Any): Values formatted into `msg` with `%`, only if the message is logged.
         """
-        _msg = DatMessage(
-            type=Type.LOG,
-            log=DatLogMessage(
-                level=Level.DEBUG,  # Adjusted level to DEBUG
-                message=msg
-            )
-        )
-        print(_msg.model_dump_json(), flush=True)
+        self._log(Level.DEBUG, msg, args)
 
-    def error(self, msg: str) -> None:
+    def error(self, msg: str, *args: Any) -> None:
         """
         Logs a message at the ERROR level.
         
         Args:
             msg (str): The message to be logged.
+            *args (Any): Values formatted into `msg` with `%`, only if the message is logged.
         """
-        _msg = DatMessage(
-            type=Type.LOG,
-            log=DatLogMessage(
-                level=Level.ERROR,  # Adjusted level to ERROR
-                message=msg
-            )
-        )
-        print(_msg.model_dump_json(), flush=True)
+        self._log(Level.ERROR, msg, args)
 
-    def warning(self, msg: str) -> None:
+    def warning(self, msg: str, *args: Any) -> None:
         """
         Logs a message at the WARNING level.
         
         Args:
             msg (str): The message to be logged.
+            *args (Any): Values formatted into `msg` with `%`, only if the message is logged.
         """
-        _msg = DatMessage(
-            type=Type.LOG,
-            log=DatLogMessage(
-                level=Level.WARNING,  # Adjusted level to WARNING
-                message=msg
-            )
-        )
-        print(_msg.model_dump_json(), flush=True)
+        self._log(Level.WARNING, msg, args)
 
-    def trace(self, msg: str) -> None:
+    def trace(self, msg: str, *args: Any) -> None:
         """
         Logs a message at the TRACE level.
         
         Args:
             msg (str): The message to be logged.
+            *args (Any): Values formatted into `msg` with `%`, only if the message is logged.
         """
-        _msg = DatMessage(
-            type=Type.LOG,
-            log=DatLogMessage(
-                level=Level.TRACE,  # Adjusted level to TRACE
-                message=msg
-            )
-        )
-        print(_msg.model_dump_json(), flush=True)
+        self._log(Level.TRACE, msg, args)
 
-    def fatal(self, msg: str) -> None:
+    def fatal(self, msg: str, *args: Any) -> None:
         """
         Logs a message at the FATAL level.
         
         Args:
             msg (str): The message to be logged.
+            *args (Any): Values formatted into `msg` with `%`, only if the message is logged.
         """
-        _msg = DatMessage(
-            type=Type.LOG,
-            log=DatLogMessage(
-                level=Level.FATAL,  # Adjusted level to FATAL
-                message=msg
-            )
-        )
-        print(_msg.model_dump_json(), flush=True)
+        self._log(Level.FATAL, msg, args)
 
-    def critical(self, msg: str) -> None:
+    def critical(self, msg: str, *args: Any) -> None:
         """
         Logs a message at the CRITICAL level. In DAT's context,
         FATAL and CRITICAL are same. So this is equivalent to fatal()
         
         Args:
             msg (str): The message to be logged.
+            *args (Any): Values formatted into `msg` with `%`, only if the message is logged.
         """
-        _msg = DatMessage(
-            type=Type.LOG,
-            log=DatLogMessage(
-                level=Level.FATAL,  # Adjusted level to FATAL
-                message=msg
-            )
-        )
-        print(_msg.model_dump_json(), flush=True)
+        self._log(Level.FATAL, msg, args)
 
 
 
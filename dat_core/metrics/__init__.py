@@ -0,0 +1,9 @@
+from dat_core.metrics.registry import (
+    DEFAULT_LATENCY_BUCKETS,
+    METRICS_INTERVAL_ENV,
+    Counter,
+    Gauge,
+    Histogram,
+    MetricsRegistry,
+    metrics,
+)
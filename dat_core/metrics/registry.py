@@ -0,0 +1,223 @@
+import bisect
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+from dat_core.pydantic_models import (
+    DatMessage,
+    DatTraceMessage,
+    Metric,
+    MetricType,
+    TraceType,
+    Type,
+)
+
+# Environment variable with the number of seconds between two TRACE messages, 0 disables them
+METRICS_INTERVAL_ENV = 'DAT_METRICS_INTERVAL'
+DEFAULT_METRICS_INTERVAL = 10.0
+# Upper bounds, in seconds, of the buckets of latency histograms
+DEFAULT_LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 60.0)
+
+_LabelsKey = Tuple[Tuple[str, str], ...]
+
+
+class Counter:
+    """
+    A value that only goes up, e.g. a number of records.
+    """
+
+    def __init__(self, name: str, labels: Dict[str, str]) -> None:
+        self.name = name
+        self.labels = labels
+        self.value = 0.0
+        self._lock = threading.Lock()
+        self._reported_value = 0.0
+
+    def inc(self, amount: float = 1) -> None:
+        with self._lock:
+            self.value += amount
+
+    def _snapshot(self, elapsed: float) -> Metric:
+        with self._lock:
+            value = self.value
+        rate = (value - self._reported_value) / elapsed if elapsed > 0 else None
+        self._reported_value = value
+        return Metric(name=self.name, type=MetricType.COUNTER, labels=self.labels, value=value, rate=rate)
+
+
+class Gauge:
+    """
+    A value that goes up and down, e.g. a number of buffered records.
+    """
+
+    def __init__(self, name: str, labels: Dict[str, str]) -> None:
+        self.name = name
+        self.labels = labels
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+    def inc(self, amount: float = 1) -> None:
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1) -> None:
+        self.inc(-amount)
+
+    def _snapshot(self, elapsed: float) -> Metric:
+        return Metric(name=self.name, type=MetricType.GAUGE, labels=self.labels, value=self.value)
+
+
+class Histogram:
+    """
+    The distribution of observed values, e.g. latencies in seconds, over fixed buckets.
+    """
+
+    def __init__(self, name: str, labels: Dict[str, str], buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS) -> None:
+        self.name = name
+        self.labels = labels
+        self._bounds = sorted(buckets)
+        self._bucket_counts = [0] * (len(self._bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        idx = bisect.bisect_left(self._bounds, value)
+        with self._lock:
+            self._bucket_counts[idx] += 1
+            self.count += 1
+            self.sum += value
+            if self.min is None or value < self.min:
+                self.min = value
+            if self.max is None or value > self.max:
+                self.max = value
+
+    @contextmanager
+    def time(self) -> Iterator[None]:
+        """
+        Observes the number of seconds spent in the `with` block.
+        """
+        _start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - _start)
+
+    def _snapshot(self, elapsed: float) -> Metric:
+        with self._lock:
+            cumulative = 0
+            buckets = {}
+            for bound, bucket_count in zip(self._bounds + [float('inf')], self._bucket_counts):
+                cumulative += bucket_count
+                buckets['+Inf' if bound == float('inf') else repr(bound)] = cumulative
+            return Metric(
+                name=self.name, type=MetricType.HISTOGRAM, labels=self.labels,
+                count=self.count, sum=self.sum, min=self.min, max=self.max, buckets=buckets,
+            )
+
+
+class MetricsRegistry:
+    """
+    Holds the counters, gauges and histograms of a connector and turns them into TRACE
+    messages. Metrics are identified by their name and labels and created on first use:
+
+        metrics.counter('source_records', stream='users').inc()
+        with metrics.histogram('loader_load_seconds', stream='users').time():
+            ...
+
+    The instrumented parts of dat-core yield `due_trace_message()` along with their
+    output, i.e. a TRACE message every `interval` seconds (`DAT_METRICS_INTERVAL`, 10 by
+    default, 0 disables TRACE messages), and `trace_message()` when they are done.
+
+    Args:
+        interval (Optional[float], optional): Seconds between two TRACE messages. Defaults
+            to the `DAT_METRICS_INTERVAL` environment variable.
+    """
+
+    def __init__(self, interval: Optional[float] = None) -> None:
+        self.interval = interval if interval is not None else \
+            float(os.environ.get(METRICS_INTERVAL_ENV, DEFAULT_METRICS_INTERVAL))
+        self._metrics: Dict[Tuple[str, _LabelsKey], object] = {}
+        self._lock = threading.Lock()
+        self._last_emitted_at = time.monotonic()
+
+    @property
+    def enabled(self) -> bool:
+        """
+        False if TRACE messages are disabled.
+        """
+        return self.interval > 0
+
+    def counter(self, name: str, **labels: Optional[str]) -> Counter:
+        return self._get_or_create(Counter, name, labels)
+
+    def gauge(self, name: str, **labels: Optional[str]) -> Gauge:
+        return self._get_or_create(Gauge, name, labels)
+
+    def histogram(self, name: str, buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS, **labels: Optional[str]) -> Histogram:
+        return self._get_or_create(Histogram, name, labels, buckets)
+
+    def _get_or_create(self, metric_class: type, name: str, labels: Dict[str, Any], *args: Any):
+        # Labels without a value, e.g. the namespace of most streams, are left out
+        labels = {label: str(value) for label, value in labels.items() if value is not None}
+        key = (name, tuple(sorted(labels.items())))
+        metric = self._metrics.get(key)
+        if metric is None:
+            with self._lock:
+                metric = self._metrics.get(key)
+                if metric is None:
+                    metric = self._metrics[key] = metric_class(name, labels, *args)
+        if not isinstance(metric, metric_class):
+            raise TypeError(f'Metric {name} {labels} is a {type(metric).__name__}, not a {metric_class.__name__}')
+        return metric
+
+    def collect(self) -> List[Metric]:
+        """
+        Returns a snapshot of every metric. Counter rates are computed over the time
+        elapsed since the previous snapshot.
+        """
+        now = time.monotonic()
+        with self._lock:
+            metrics = list(self._metrics.values())
+            elapsed = now - self._last_emitted_at
+            self._last_emitted_at = now
+        return [metric._snapshot(elapsed) for metric in metrics]
+
+    def trace_message(self) -> Optional[DatMessage]:
+        """
+        Returns a METRICS TRACE message with a snapshot of every metric, or None if TRACE
+        messages are disabled or there is no metric.
+        """
+        if not self.enabled or not self._metrics:
+            return None
+        return DatMessage(
+            type=Type.TRACE,
+            trace=DatTraceMessage(type=TraceType.METRICS, metrics=self.collect()),
+        )
+
+    def due_trace_message(self) -> Optional[DatMessage]:
+        """
+        Returns `trace_message()` if `interval` seconds have elapsed since the previous one,
+        None otherwise. Cheap enough to be called for every record.
+        """
+        if not self.enabled or time.monotonic() - self._last_emitted_at < self.interval:
+            return None
+        return self.trace_message()
+
+    def clear(self) -> None:
+        """
+        Removes every metric.
+        """
+        with self._lock:
+            self._metrics.clear()
+            self._last_emitted_at = time.monotonic()
+
+
+# Use this object to record metrics in other modules
+metrics = MetricsRegistry()
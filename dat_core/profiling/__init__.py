@@ -0,0 +1,11 @@
+from dat_core.profiling.profiler import (
+    PROFILE_DIR_ENV,
+    PROFILE_ENV,
+    ProfileMode,
+    RunProfiler,
+    StackSampler,
+    aprofile_messages,
+    get_profile_mode,
+    profile_messages,
+    profile_process,
+)
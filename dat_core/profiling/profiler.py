@@ -0,0 +1,367 @@
+import atexit
+import concurrent.futures.thread
+import cProfile
+import collections
+import os
+import pstats
+import queue
+import selectors
+import sys
+import threading
+from typing import (
+    Any, AsyncIterator, Dict, FrozenSet, Iterator,
+    List, Optional, Tuple
+)
+from dat_core.pydantic_models import (
+    DatMessage,
+    DatProfileSummary,
+    DatTraceMessage,
+    EnumWithStr,
+    HotFunction,
+    StreamStatus,
+    TraceType,
+    Type,
+)
+
+# Environment variable enabling the profiling mode, 'cprofile' (or 1) or 'sampling'
+PROFILE_ENV = 'DAT_PROFILE'
+# Environment variable with the directory the profiles are written to, the working directory by default
+PROFILE_DIR_ENV = 'DAT_PROFILE_DIR'
+# Seconds between two stack samples
+DEFAULT_SAMPLING_INTERVAL = 0.005
+# Number of functions listed in the PROFILE trace messages
+N_HOT_FUNCTIONS = 15
+
+
+class ProfileMode(EnumWithStr):
+    CPROFILE = 'cprofile'
+    SAMPLING = 'sampling'
+
+
+def get_profile_mode() -> Optional[ProfileMode]:
+    """
+    Returns the profiling mode selected with the `DAT_PROFILE` environment variable, None
+    if profiling is disabled, which is the default.
+
+    Raises:
+        ValueError: If the variable holds an unknown mode.
+    """
+    value = os.environ.get(PROFILE_ENV, '').lower()
+    if value in ('', '0', 'false', 'off'):
+        return None
+    if value in ('1', 'true', 'on'):
+        return ProfileMode.CPROFILE
+    return ProfileMode(value)
+
+
+def _frame_label(code: Any) -> str:
+    return f'{code.co_filename}:{code.co_firstlineno}({code.co_name})'
+
+
+def _idle_frame_labels() -> FrozenSet[str]:
+    """
+    Returns the labels of the functions a thread blocks in while it waits for work or for
+    another thread, e.g. an idle pool worker or the log writer waiting on its queue.
+    """
+    functions = [
+        threading.Condition.wait, threading.Event.wait, threading.Thread.join,
+        queue.Queue.get, queue.Queue.put, concurrent.futures.thread._worker,
+    ]
+    if hasattr(threading.Thread, '_wait_for_tstate_lock'):
+        functions.append(threading.Thread._wait_for_tstate_lock)
+    functions += [
+        selector.select for selector in vars(selectors).values()
+        if isinstance(selector, type) and issubclass(selector, selectors.BaseSelector) and 'select' in vars(selector)
+    ]
+    return frozenset(_frame_label(function.__code__) for function in functions)
+
+
+_IDLE_FRAME_LABELS = _idle_frame_labels()
+
+
+class StackSampler:
+    """
+    Samples the Python stacks of every thread but its own from a background thread, every
+    `interval` seconds. Sampling does not slow down the sampled threads apart from
+    holding the GIL while a sample is taken.
+
+    Args:
+        interval (float, optional): Seconds between two samples. Defaults to 5 ms.
+    """
+
+    def __init__(self, interval: float = DEFAULT_SAMPLING_INTERVAL) -> None:
+        self.interval = interval
+        self._stacks: Dict[Tuple[str, ...], int] = collections.Counter()
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name='dat-stack-sampler', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._thread is not None:
+            self._stopped.set()
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        while not self._stopped.wait(self.interval):
+            samples = []
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame.f_code))
+                    frame = frame.f_back
+                stack.reverse()
+                samples.append(tuple(stack))
+            with self._lock:
+                for stack in samples:
+                    self._stacks[stack] += 1
+
+    def stacks(self) -> Dict[Tuple[str, ...], int]:
+        """
+        Returns the number of samples of every stack seen so far, outermost frame first.
+        """
+        with self._lock:
+            return dict(self._stacks)
+
+    def write_collapsed(self, path: str) -> None:
+        """
+        Writes the stacks in the collapsed format of flamegraph.pl and speedscope, one
+        `frame;frame;frame count` line per stack.
+        """
+        with open(path, 'w') as _f:
+            for stack, count in sorted(self.stacks().items()):
+                _f.write(f"{';'.join(stack)} {count}\n")
+
+    def hot_functions(self, n: int = N_HOT_FUNCTIONS) -> List[HotFunction]:
+        """
+        Returns the `n` functions found the most often at the top of the stacks. The
+        stacks of idle threads, blocked waiting on a lock, queue or selector, are left out:
+        they are still written by `write_collapsed`.
+        """
+        leaves: Dict[str, int] = collections.Counter()
+        for stack, count in self.stacks().items():
+            if stack and stack[-1] not in _IDLE_FRAME_LABELS:
+                leaves[stack[-1]] += count
+        return [HotFunction(function=function, samples=count) for function, count in leaves.most_common(n)]
+
+
+class RunProfiler:
+    """
+    Profiles an operation of a connector, e.g. `read`, and writes the profile next to the
+    run, in `DAT_PROFILE_DIR`:
+
+    - `dat-profile-<name>-<pid>.collapsed`: the sampled stacks of every thread, for
+      flamegraphs.
+    - `dat-profile-<name>-<pid>.pstats`: the cProfile statistics of the profiled thread,
+      for `python -m pstats` or snakeviz, in the `cprofile` mode only.
+
+    The `sampling` mode only samples stacks and is cheap enough for production syncs;
+    cProfile slows down pure Python code noticeably but counts every call.
+
+    Args:
+        name (str): The profiled operation, used in the file names.
+        mode (ProfileMode, optional): What to profile with. Defaults to cProfile.
+        directory (Optional[str], optional): Where to write the profiles. Defaults to
+            `DAT_PROFILE_DIR` or the working directory.
+        sampling_interval (float, optional): Seconds between two stack samples. Defaults to 5 ms.
+    """
+
+    def __init__(self,
+        name: str,
+        mode: ProfileMode = ProfileMode.CPROFILE,
+        directory: Optional[str] = None,
+        sampling_interval: float = DEFAULT_SAMPLING_INTERVAL,
+    ) -> None:
+        self.name = name
+        self.mode = mode
+        self.directory = directory or os.environ.get(PROFILE_DIR_ENV) or os.getcwd()
+        self._sampler = StackSampler(sampling_interval)
+        self._profile: Optional[cProfile.Profile] = None
+        self._running = False
+        self.artifacts: List[str] = []
+
+    @property
+    def _path_prefix(self) -> str:
+        return os.path.join(self.directory, f'dat-profile-{self.name}-{os.getpid()}')
+
+    def start(self) -> None:
+        self._sampler.start()
+        if self.mode == ProfileMode.CPROFILE:
+            self._profile = cProfile.Profile()
+            try:
+                self._profile.enable()
+            except ValueError:
+                # Another profiler is already active on this thread, only sample stacks
+                self._profile = None
+        self._running = True
+
+    def stop(self) -> None:
+        """
+        Stops profiling and writes the profiles.
+        """
+        if not self._running:
+            return
+        self._running = False
+        if self._profile is not None:
+            self._profile.disable()
+        self._sampler.stop()
+        self.write_artifacts()
+
+    def write_artifacts(self) -> List[str]:
+        """
+        Writes the profiles gathered so far and returns their paths.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        artifacts = [f'{self._path_prefix}.collapsed']
+        self._sampler.write_collapsed(artifacts[0])
+        if self._profile is not None:
+            artifacts.append(f'{self._path_prefix}.pstats')
+            self._with_profile_paused(lambda: self._profile.dump_stats(artifacts[1]))
+        self.artifacts = artifacts
+        return artifacts
+
+    def hot_functions(self, n: int = N_HOT_FUNCTIONS) -> List[HotFunction]:
+        """
+        Returns the `n` functions with the most time spent in themselves, from cProfile, or
+        else the `n` functions sampled the most often.
+        """
+        if self._profile is None:
+            return self._sampler.hot_functions(n)
+        stats = self._with_profile_paused(lambda: pstats.Stats(self._profile).stats)
+        hottest = sorted(stats.items(), key=lambda item: item[1][2], reverse=True)[:n]
+        return [
+            HotFunction(
+                function=f'{filename}:{line}({function})',
+                calls=n_calls,
+                self_seconds=self_time,
+                cumulative_seconds=cumulative_time,
+            )
+            for (filename, line, function), (_, n_calls, self_time, cumulative_time, _) in hottest
+        ]
+
+    def summary_message(self, stream: Optional[str] = None) -> DatMessage:
+        """
+        Writes the profiles gathered so far and returns a PROFILE trace message listing
+        the hottest functions.
+
+        Args:
+            stream (Optional[str], optional): The stream that just completed. Defaults to None.
+        """
+        if self._running:
+            self.write_artifacts()
+        return DatMessage(
+            type=Type.TRACE,
+            trace=DatTraceMessage(
+                type=TraceType.PROFILE,
+                profile=DatProfileSummary(
+                    name=self.name,
+                    stream=stream,
+                    artifacts=self.artifacts,
+                    hot_functions=self.hot_functions(),
+                ),
+            ),
+        )
+
+    def _with_profile_paused(self, func):
+        # pstats disables the profiler to read it, resume it afterwards
+        try:
+            return func()
+        finally:
+            if self._running:
+                self._profile.enable()
+
+
+def _completed_stream(message: Any) -> Optional[str]:
+    """
+    Returns the name of the stream a COMPLETED state message belongs to, None for any
+    other message.
+    """
+    if message.type != Type.STATE:
+        return None
+    if hasattr(message, 'peek'):
+        # A LazyDatMessage, read the status without validating it
+        if message.peek(('state', 'stream_state', 'stream_status')) != StreamStatus.COMPLETED.value:
+            return None
+        return message.peek(('state', 'stream', 'name'))
+    if message.state.stream_state.stream_status != StreamStatus.COMPLETED:
+        return None
+    return message.state.stream.name
+
+
+def profile_messages(messages: Iterator[DatMessage], name: str) -> Iterator[DatMessage]:
+    """
+    Passes the messages through, profiling everything running on this thread (and
+    sampling every thread) until they are exhausted if the profiling mode is enabled. A
+    PROFILE trace message follows every COMPLETED state message and the last message.
+
+    Args:
+        messages (Iterator[DatMessage]): The output of the profiled operation.
+        name (str): The profiled operation, e.g. read.
+    """
+    mode = get_profile_mode()
+    if mode is None:
+        yield from messages
+        return
+    profiler = RunProfiler(name, mode)
+    profiler.start()
+    try:
+        for message in messages:
+            yield message
+            stream = _completed_stream(message)
+            if stream is not None:
+                yield profiler.summary_message(stream)
+    finally:
+        profiler.stop()
+    yield profiler.summary_message()
+
+
+async def aprofile_messages(messages: AsyncIterator[DatMessage], name: str) -> AsyncIterator[DatMessage]:
+    """
+    Asyncio counterpart of `profile_messages`.
+    """
+    mode = get_profile_mode()
+    if mode is None:
+        async for message in messages:
+            yield message
+        return
+    profiler = RunProfiler(name, mode)
+    profiler.start()
+    try:
+        async for message in messages:
+            yield message
+            stream = _completed_stream(message)
+            if stream is not None:
+                yield profiler.summary_message(stream)
+    finally:
+        profiler.stop()
+    yield profiler.summary_message()
+
+
+_process_profilers: Dict[str, Optional[RunProfiler]] = {}
+
+
+def profile_process(name: str) -> None:
+    """
+    Starts profiling the rest of the process on the calling thread if the profiling mode
+    is enabled, for operations without a single entry point like `generate`, which is
+    called once per record. Does nothing if `name` is already profiled. The profiles are
+    written when the process exits.
+
+    Args:
+        name (str): The profiled operation, e.g. generate.
+    """
+    if name in _process_profilers:
+        return
+    mode = get_profile_mode()
+    profiler = _process_profilers[name] = RunProfiler(name, mode) if mode is not None else None
+    if profiler is not None:
+        profiler.start()
+        atexit.register(profiler.stop)
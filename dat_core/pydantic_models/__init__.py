@@ -8,4 +8,7 @@ from dat_core.pydantic_models.stream_metadata import *
 from dat_core.pydantic_models.connection import *
 from dat_core.pydantic_models.dat_connection_status import *
 from dat_core.pydantic_models.dat_state_message import *
+from dat_core.pydantic_models.dat_trace_message import *
 from dat_core.pydantic_models.custom_schema_generator import CustomGenerateJsonSchema
+from dat_core.pydantic_models.schema_resolver import resolve_refs
+from dat_core.pydantic_models.vectors import Vector, VectorMatrix, encode_vectors, decode_vectors
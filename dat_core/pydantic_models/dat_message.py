@@ -7,7 +7,7 @@ from __future__ import annotations
 from enum import Enum
 from datetime import datetime
 from typing import Any, Dict, List, Optional
-from pydantic import AnyUrl, BaseModel, Extra, Field
+from pydantic import AnyUrl, BaseModel, Extra, Field, model_validator
 from dat_core.pydantic_models.dat_catalog import DatCatalog
 from dat_core.pydantic_models.dat_log_message import DatLogMessage
 from dat_core.pydantic_models.stream_metadata import StreamMetadata
@@ -15,6 +15,8 @@ from dat_core.pydantic_models.connector_specification import ConnectorSpecificat
 from dat_core.pydantic_models.dat_document_stream import DatDocumentStream
 from dat_core.pydantic_models.dat_connection_status import DatConnectionStatus
 from dat_core.pydantic_models.dat_state_message import DatStateMessage
+from dat_core.pydantic_models.dat_trace_message import DatTraceMessage
+from dat_core.pydantic_models.vectors import Vector, VectorMatrix, vectors_equal
 
 class Type(Enum):
     RECORD = 'RECORD'
@@ -24,6 +26,7 @@ class Type(Enum):
     CONNECTION_STATUS = 'CONNECTION_STATUS'
     CATALOG = 'CATALOG'
     TRACE = 'TRACE'
+    RECORD_BATCH = 'RECORD_BATCH'
 
 class Data(BaseModel):
     class Config:
@@ -32,14 +35,17 @@ class Data(BaseModel):
     document_chunk: Optional[str] = Field(
         None, description='document chunks emitted by source'
     )
-    vectors: Optional[List[float]] = Field(
-        None, description='vectors generated by a Generator'
+    vectors: Optional[Vector] = Field(
+        None, description='vectors generated by a Generator, as a float32 or float16 array'
     )
     metadata: Optional[StreamMetadata] = Field(
         None,
         description='metadata generated by a Source, to be passed through Generator and loaded to Destination',
     )
 
+    def __eq__(self, other: Any) -> bool:
+        return _equal_with_vectors(self, other)
+
 
 class DatDocumentMessage(BaseModel):
     class Config:
@@ -59,6 +65,228 @@ class DatDocumentMessage(BaseModel):
     )
 
 
+class DatRecordBatchMessage(BaseModel):
+    """
+    Column oriented form of a list of DatDocumentMessage of one stream. The i-th entry
+    of every column belongs to the i-th record; the stream, namespace and emission time
+    are stored once for the whole batch.
+    """
+    class Config:
+        extra = 'allow'
+
+    namespace: Optional[str] = Field(
+        None, description='namespace the data is associated with'
+    )
+    stream: DatDocumentStream = Field(
+        ..., description='stream the data is associated with'
+    )
+    ids: List[str] = Field(..., description='dat_record_id of every record')
+    document_chunks: List[Optional[str]] = Field(
+        ..., description='document chunk of every record'
+    )
+    vectors: Optional[VectorMatrix] = Field(
+        None, description='2-D float32 or float16 array with the vectors of every record, one row per record'
+    )
+    metadata: Dict[str, List[Any]] = Field(
+        default_factory=dict,
+        description='metadata columns, i.e. every StreamMetadata field but dat_record_id',
+    )
+    data_columns: Dict[str, List[Any]] = Field(
+        default_factory=dict,
+        description='columns of the extra fields of Data',
+    )
+    emitted_at: float = Field(
+        ...,
+        description='when the batch was emitted. epoch in millisecond.',
+        default_factory=lambda: datetime.now().timestamp(),
+    )
+
+    @model_validator(mode='after')
+    def _check_column_lengths(self) -> DatRecordBatchMessage:
+        n_records = len(self.ids)
+        columns = [('document_chunks', self.document_chunks)]
+        columns += [(f'metadata.{name}', column) for name, column in self.metadata.items()]
+        columns += [(f'data_columns.{name}', column) for name, column in self.data_columns.items()]
+        if self.vectors is not None:
+            columns.append(('vectors', self.vectors))
+        for name, column in columns:
+            if len(column) != n_records:
+                raise ValueError(f'Column {name} has {len(column)} entries, expected {n_records}')
+        return self
+
+    def __eq__(self, other: Any) -> bool:
+        return _equal_with_vectors(self, other)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @classmethod
+    def from_records(cls, records: List[DatDocumentMessage]) -> DatRecordBatchMessage:
+        """
+        Builds a batch from records of one stream. The batch takes the stream, namespace
+        and emission time of the first record.
+
+        Args:
+            records (List[DatDocumentMessage]): The records, at least one, all with metadata.
+
+        Returns:
+            DatRecordBatchMessage: The batch.
+
+        Raises:
+            ValueError: If there are no records, they belong to different streams, some
+                have no metadata, or only some have vectors.
+        """
+        if not records:
+            raise ValueError('Cannot build a record batch without records')
+        first = records[0]
+        ids, chunks, vectors, metadata_rows, data_rows = [], [], [], [], []
+        for record in records:
+            if (record.namespace, record.stream.name) != (first.namespace, first.stream.name):
+                raise ValueError('All the records of a batch must belong to the same stream')
+            if record.data.metadata is None:
+                raise ValueError('All the records of a batch must have metadata')
+            metadata = record.data.metadata.model_dump()
+            ids.append(metadata.pop('dat_record_id'))
+            metadata_rows.append(metadata)
+            data_rows.append(record.data.model_extra or {})
+            chunks.append(record.data.document_chunk)
+            vectors.append(record.data.vectors)
+        n_with_vectors = sum(vector is not None for vector in vectors)
+        if n_with_vectors not in (0, len(records)):
+            raise ValueError('Either all or none of the records of a batch must have vectors')
+        return cls.from_rows(
+            stream=first.stream,
+            namespace=first.namespace,
+            ids=ids,
+            document_chunks=chunks,
+            metadata_rows=metadata_rows,
+            data_rows=data_rows,
+            vectors=vectors if n_with_vectors else None,
+            emitted_at=first.emitted_at,
+        )
+
+    @classmethod
+    def from_rows(cls,
+        stream: DatDocumentStream,
+        namespace: Optional[str],
+        ids: List[str],
+        document_chunks: List[Optional[str]],
+        metadata_rows: List[Dict[str, Any]],
+        data_rows: Optional[List[Dict[str, Any]]] = None,
+        **fields: Any) -> DatRecordBatchMessage:
+        """
+        Builds a batch from plain per record values, turning the metadata and data rows
+        into columns. A column is None for the records whose row has no such key.
+
+        Args:
+            stream (DatDocumentStream): The stream of the records.
+            namespace (Optional[str]): The namespace of the records.
+            ids (List[str]): The dat_record_id of every record.
+            document_chunks (List[Optional[str]]): The document chunk of every record.
+            metadata_rows (List[Dict[str, Any]]): The metadata of every record, without dat_record_id.
+            data_rows (Optional[List[Dict[str, Any]]], optional): The extra data fields of
+                every record. Defaults to None.
+            **fields (Any): Other fields of the batch, e.g. `vectors`.
+
+        Returns:
+            DatRecordBatchMessage: The batch.
+        """
+        return cls(
+            stream=stream,
+            namespace=namespace,
+            ids=ids,
+            document_chunks=document_chunks,
+            metadata=_rows_to_columns(metadata_rows),
+            data_columns=_rows_to_columns(data_rows or []),
+            **fields,
+        )
+
+    def take(self, indices: List[int]) -> DatRecordBatchMessage:
+        """
+        Returns a batch of the records of this one at the given positions, in that order.
+        """
+        return self.model_copy(update=dict(
+            ids=[self.ids[idx] for idx in indices],
+            document_chunks=[self.document_chunks[idx] for idx in indices],
+            vectors=self.vectors[indices] if self.vectors is not None else None,
+            metadata={name: [column[idx] for idx in indices] for name, column in self.metadata.items()},
+            data_columns={name: [column[idx] for idx in indices] for name, column in self.data_columns.items()},
+        ))
+
+    def to_records(self) -> List[DatDocumentMessage]:
+        """
+        Splits the batch back into one DatDocumentMessage per record. Extra metadata and
+        data fields that a record did not have are left out.
+
+        Returns:
+            List[DatDocumentMessage]: The records, in the order of the batch.
+        """
+        vectors = self.vectors if self.vectors is not None else [None] * len(self)
+        records = []
+        for idx, record_id in enumerate(self.ids):
+            metadata = _row(self.metadata, idx, StreamMetadata.model_fields)
+            metadata['dat_record_id'] = record_id
+            records.append(DatDocumentMessage(
+                namespace=self.namespace,
+                stream=self.stream,
+                data=Data(
+                    document_chunk=self.document_chunks[idx],
+                    vectors=vectors[idx],
+                    metadata=StreamMetadata(**metadata),
+                    **_row(self.data_columns, idx, Data.model_fields),
+                ),
+                emitted_at=self.emitted_at,
+            ))
+        return records
+
+    def to_record_messages(self) -> List[DatMessage]:
+        """
+        Returns one RECORD DatMessage per record of the batch, see `to_records`.
+        """
+        return [DatMessage(type=Type.RECORD, record=record) for record in self.to_records()]
+
+
+def _equal_with_vectors(model: BaseModel, other: Any) -> bool:
+    """
+    Compares models holding vectors: the arrays cannot be compared by the default
+    equality of pydantic models.
+    """
+    if not isinstance(other, BaseModel):
+        return NotImplemented
+    if type(model) is not type(other) or not vectors_equal(model.vectors, other.vectors):
+        return False
+    return BaseModel.__eq__(model.model_copy(update={'vectors': None}), other.model_copy(update={'vectors': None}))
+
+
+def _rows_to_columns(rows: List[Dict[str, Any]]) -> Dict[str, List[Any]]:
+    """
+    Turns a list of dicts into a dict of lists, padding with None the values a row does not have.
+    """
+    columns: Dict[str, List[Any]] = {}
+    for idx, row in enumerate(rows):
+        for name, value in row.items():
+            if name not in columns:
+                columns[name] = [None] * idx
+            columns[name].append(value)
+        for column in columns.values():
+            if len(column) == idx:
+                column.append(None)
+    return columns
+
+
+def _row(columns: Dict[str, List[Any]], idx: int, fields: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Returns the values of row `idx`, leaving out the missing values of the columns
+    that are not model fields.
+    """
+    row = {}
+    for name, column in columns.items():
+        value = column[idx]
+        if value is not None or name in fields:
+            row[name] = value
+    return row
+
+
 class DatMessage(BaseModel):
     class Config:
         extra = 'allow'
@@ -76,10 +304,17 @@ class DatMessage(BaseModel):
     record: Optional[DatDocumentMessage] = Field(
         None, description='record message: the record'
     )
+    record_batch: Optional[DatRecordBatchMessage] = Field(
+        None, description='record batch message: many records of one stream in columns'
+    )
     state: Optional[DatStateMessage] = Field(
         None,
         description='schema message: the state. Must be the last message produced. The platform uses this information',
     )
+    trace: Optional[DatTraceMessage] = Field(
+        None,
+        description='trace message: a message to communicate information about the status and performance of a connector',
+    )
 
     @classmethod
     def as_dat_log(cls, message, level='DEBUG'):
@@ -87,3 +322,13 @@ class DatMessage(BaseModel):
             type=Type.LOG,
             log=DatLogMessage(level=level, message=message)
         )
+
+    @classmethod
+    def as_record_batch(cls, messages: List[DatMessage]):
+        """
+        Packs RECORD messages of one stream into a single RECORD_BATCH message.
+        """
+        return cls(
+            type=Type.RECORD_BATCH,
+            record_batch=DatRecordBatchMessage.from_records([msg.record for msg in messages])
+        )
@@ -0,0 +1,94 @@
+# generated by datamodel-codegen:
+#   filename:  DatTraceMessage.yml
+
+from __future__ import annotations
+
+from enum import Enum
+from typing import Dict, List, Optional
+from datetime import datetime
+from pydantic import BaseModel, Field
+
+
+class TraceType(Enum):
+    METRICS = 'METRICS'
+    PROFILE = 'PROFILE'
+
+
+class MetricType(Enum):
+    COUNTER = 'COUNTER'
+    GAUGE = 'GAUGE'
+    HISTOGRAM = 'HISTOGRAM'
+
+
+class Metric(BaseModel):
+    class Config:
+        extra = 'allow'
+
+    name: str = Field(..., description='name of the metric')
+    type: MetricType = Field(..., description='kind of metric')
+    labels: Dict[str, str] = Field(
+        default_factory=dict, description='labels of the metric, e.g. the stream'
+    )
+    value: Optional[float] = Field(
+        None, description='total of a counter, current value of a gauge'
+    )
+    rate: Optional[float] = Field(
+        None, description='per second increase of a counter since the previous trace message'
+    )
+    count: Optional[int] = Field(None, description='number of observations of a histogram')
+    sum: Optional[float] = Field(None, description='sum of the observations of a histogram')
+    min: Optional[float] = Field(None, description='smallest observation of a histogram')
+    max: Optional[float] = Field(None, description='largest observation of a histogram')
+    buckets: Optional[Dict[str, int]] = Field(
+        None,
+        description='cumulative number of observations of a histogram less than or equal to each upper bound',
+    )
+
+
+class HotFunction(BaseModel):
+    class Config:
+        extra = 'allow'
+
+    function: str = Field(..., description='the function, as file:line(name)')
+    calls: Optional[int] = Field(None, description='number of calls, with cProfile')
+    self_seconds: Optional[float] = Field(
+        None, description='time spent in the function itself, with cProfile'
+    )
+    cumulative_seconds: Optional[float] = Field(
+        None, description='time spent in the function and its callees, with cProfile'
+    )
+    samples: Optional[int] = Field(
+        None, description='number of stack samples the function was running in, with the sampling profiler'
+    )
+
+
+class DatProfileSummary(BaseModel):
+    class Config:
+        extra = 'allow'
+
+    name: str = Field(..., description='the profiled operation, e.g. read')
+    stream: Optional[str] = Field(None, description='the stream that just completed')
+    artifacts: List[str] = Field(
+        default_factory=list, description='paths of the profile files written so far'
+    )
+    hot_functions: List[HotFunction] = Field(
+        default_factory=list, description='the functions taking the most time, hottest first'
+    )
+
+
+class DatTraceMessage(BaseModel):
+    class Config:
+        extra = 'allow'
+
+    type: TraceType = Field(..., description='the type of trace message')
+    metrics: Optional[List[Metric]] = Field(
+        None, description='the metrics of the connector, for METRICS trace messages'
+    )
+    profile: Optional[DatProfileSummary] = Field(
+        None, description='the profile of the connector so far, for PROFILE trace messages'
+    )
+    emitted_at: Optional[float] = Field(
+        ...,
+        description='when the trace message was emitted. epoch in millisecond.',
+        default_factory=lambda: datetime.now().timestamp(),
+    )
@@ -0,0 +1,72 @@
+from typing import Any, Dict, Set
+
+# Placeholder for a definition whose resolution is still in progress
+_IN_PROGRESS = object()
+
+
+def resolve_refs(schema: Dict[str, Any], merge_siblings: bool = False) -> Dict[str, Any]:
+    """
+    Inlines the local `$ref`s (e.g. `#/$defs/Advanced`) of a JSON schema generated by
+    `CustomGenerateJsonSchema`, working directly on the dict tree.
+
+    Every referenced definition is resolved once and the resolved subtree is shared by
+    all of its references and by its entry under `$defs`, like the targets of jsonref
+    proxies are, so modifying a resolved definition in place is seen from every reference. A reference back to a definition that is still being resolved, i.e.
+    a recursive schema, is left as a `$ref`. The input schema is not modified.
+
+    Args:
+        schema (Dict[str, Any]): The JSON schema.
+        merge_siblings (bool, optional): Keep the keys next to a `$ref` by merging them into
+            a copy of the referenced schema. By default they are dropped, as jsonref does.
+            Defaults to False.
+
+    Returns:
+        Dict[str, Any]: The schema with its references inlined.
+    """
+    resolved: Dict[str, Any] = {}
+    # Resolved copy of every dict of the input, so that a definition and its references share one object
+    resolved_nodes: Dict[int, Dict[str, Any]] = {}
+    in_progress: Set[str] = set()
+
+    def _lookup(ref: str) -> Any:
+        node = schema
+        for token in ref[1:].split('/'):
+            if not token:
+                continue
+            token = token.replace('~1', '/').replace('~0', '~')
+            node = node[int(token)] if isinstance(node, list) else node[token]
+        return node
+
+    def _resolve_ref(ref: str) -> Any:
+        if ref in resolved:
+            return resolved[ref]
+        if ref in in_progress:
+            return _IN_PROGRESS
+        in_progress.add(ref)
+        try:
+            target = _resolve(_lookup(ref))
+        finally:
+            in_progress.discard(ref)
+        resolved[ref] = target
+        return target
+
+    def _resolve(node: Any) -> Any:
+        if isinstance(node, dict):
+            ref = node.get('$ref')
+            if isinstance(ref, str) and ref.startswith('#'):
+                target = _resolve_ref(ref)
+                if target is _IN_PROGRESS:
+                    return {k: v if k == '$ref' else _resolve(v) for k, v in node.items()}
+                if merge_siblings and len(node) > 1 and isinstance(target, dict):
+                    merged = dict(target)
+                    merged.update({k: _resolve(v) for k, v in node.items() if k != '$ref'})
+                    return merged
+                return target
+            if id(node) not in resolved_nodes:
+                resolved_nodes[id(node)] = {k: _resolve(v) for k, v in node.items()}
+            return resolved_nodes[id(node)]
+        if isinstance(node, list):
+            return [_resolve(item) for item in node]
+        return node
+
+    return _resolve(schema)
@@ -0,0 +1,113 @@
+import base64
+from typing import Annotated, Any, Dict, Optional
+import numpy as np
+from pydantic import BeforeValidator, PlainSerializer, SerializationInfo, WithJsonSchema
+
+# Dtypes a vector is kept in, anything else is converted to float32
+VECTOR_DTYPES = {'float32': np.float32, 'float16': np.float16}
+# Serialization context keeping the vectors as arrays in python mode, e.g. to write them as raw bytes
+KEEP_ARRAYS_CONTEXT = {'vectors_as_arrays': True}
+
+
+def encode_vectors(vectors: np.ndarray) -> Dict[str, Any]:
+    """
+    Encodes an array of vectors for JSON as its little-endian bytes in base64.
+
+    Args:
+        vectors (np.ndarray): A float32 or float16 array.
+
+    Returns:
+        Dict[str, Any]: The dtype, shape and base64 data of the array.
+    """
+    dtype = np.dtype(vectors.dtype).newbyteorder('<')
+    return {
+        'dtype': vectors.dtype.name,
+        'shape': list(vectors.shape),
+        'data': base64.b64encode(np.ascontiguousarray(vectors, dtype=dtype).tobytes()).decode('ascii'),
+    }
+
+
+def decode_vectors(value: Any, ndim: int) -> Optional[np.ndarray]:
+    """
+    Returns the vectors given as an array, nested lists of numbers or the output of
+    `encode_vectors` as a float32 or float16 array with `ndim` dimensions. Encoded data
+    is read straight from the decoded bytes.
+
+    Raises:
+        ValueError: If the value has another number of dimensions or an unknown dtype.
+    """
+    if value is None:
+        return None
+    if isinstance(value, dict):
+        dtype_name = value.get('dtype', 'float32')
+        if dtype_name not in VECTOR_DTYPES:
+            raise ValueError(f'Unsupported vector dtype {dtype_name}, expected one of {list(VECTOR_DTYPES)}')
+        data = bytearray(base64.b64decode(value['data']))
+        vectors = np.frombuffer(data, dtype=np.dtype(VECTOR_DTYPES[dtype_name]).newbyteorder('<'))
+        vectors = vectors.astype(VECTOR_DTYPES[dtype_name], copy=False)
+        if 'shape' in value:
+            vectors = vectors.reshape(value['shape'])
+    elif isinstance(value, np.ndarray) and value.dtype.name in VECTOR_DTYPES:
+        vectors = value
+    else:
+        vectors = np.asarray(value, dtype=np.float32)
+    if vectors.ndim != ndim:
+        raise ValueError(f'Expected vectors with {ndim} dimension(s), got {vectors.ndim}')
+    return vectors
+
+
+def _serialize_vectors(vectors: Optional[np.ndarray], info: SerializationInfo) -> Any:
+    """
+    Dumps vectors as `encode_vectors` in JSON and as nested lists in python mode, so that
+    the dump can be compared and passed to `json.dumps`. The arrays are kept as they are
+    with the `KEEP_ARRAYS_CONTEXT` context.
+    """
+    if vectors is None:
+        return None
+    if info.mode_is_json():
+        return encode_vectors(vectors)
+    if info.context and info.context.get('vectors_as_arrays'):
+        return vectors
+    return vectors.tolist()
+
+
+def vectors_equal(vectors: Optional[np.ndarray], other: Optional[np.ndarray]) -> bool:
+    """
+    True if both are None or both hold the same values, for the equality of the models
+    holding vectors.
+    """
+    if vectors is None or other is None:
+        return vectors is other
+    return vectors.shape == other.shape and bool(np.array_equal(vectors, other))
+
+
+def _vectors_type(ndim: int, description: str) -> Any:
+    item_schema: Dict[str, Any] = {'type': 'number'}
+    for _ in range(ndim):
+        item_schema = {'type': 'array', 'items': item_schema}
+    return Annotated[
+        Any,
+        BeforeValidator(lambda value: decode_vectors(value, ndim)),
+        PlainSerializer(_serialize_vectors),
+        WithJsonSchema({
+            'description': description,
+            'anyOf': [
+                item_schema,
+                {
+                    'type': 'object',
+                    'properties': {
+                        'dtype': {'type': 'string', 'enum': list(VECTOR_DTYPES)},
+                        'shape': {'type': 'array', 'items': {'type': 'integer'}},
+                        'data': {'type': 'string', 'contentEncoding': 'base64'},
+                    },
+                    'required': ['data'],
+                },
+            ],
+        }),
+    ]
+
+
+# A vector as a 1-D float32 or float16 numpy array, base64 encoded in JSON
+Vector = _vectors_type(1, 'vector as numbers or as base64 little-endian bytes')
+# Many vectors as a 2-D float32 or float16 numpy array, one row per vector, base64 encoded in JSON
+VectorMatrix = _vectors_type(2, 'vectors, one row per vector, as numbers or as base64 little-endian bytes')
@@ -0,0 +1,16 @@
+from dat_core.serialization.wire import (
+    MSGPACK_HEADER,
+    WIRE_FORMAT_ENV,
+    MessageWriter,
+    WireFormat,
+    decode_msgpack,
+    encode_msgpack,
+    get_wire_format,
+    stdout_writer,
+)
+from dat_core.serialization.lazy import LazyDatMessage
+from dat_core.serialization.decoder import (
+    MalformedMessage,
+    MessageDecoder,
+    read_messages,
+)
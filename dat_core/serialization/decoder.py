@@ -0,0 +1,170 @@
+from typing import BinaryIO, Callable, Iterator, Optional, Union
+from pydantic import TypeAdapter
+from dat_core.pydantic_models import DatMessage
+from dat_core.serialization.lazy import LazyDatMessage
+from dat_core.serialization.wire import MSGPACK_HEADER, _FRAME_LENGTH, WireFormat, decode_msgpack
+
+# Number of bytes read from the stream at once
+DEFAULT_BLOCK_SIZE = 1 << 20
+# Number of bytes of a malformed message kept in its report
+_MAX_REPORTED_BYTES = 200
+# Parses and validates a JSON line in one pass, without building the intermediate dicts in Python
+_MESSAGE_ADAPTER = TypeAdapter(DatMessage)
+
+
+class MalformedMessage:
+    """
+    A message of the input stream that could not be decoded.
+
+    Args:
+        position (int): The line number (JSON) or frame number (msgpack) of the message, from 1.
+        error (str): Why it could not be decoded.
+        raw (bytes): The start of the message.
+    """
+
+    def __init__(self, position: int, error: str, raw: bytes) -> None:
+        self.position = position
+        self.error = error
+        self.raw = raw[:_MAX_REPORTED_BYTES]
+
+    def __repr__(self) -> str:
+        return f'MalformedMessage(position={self.position}, error={self.error!r}, raw={self.raw!r})'
+
+
+def log_malformed_message(malformed: MalformedMessage) -> None:
+    # Imported here as the logger writes through this package
+    from dat_core.loggers import logger
+    logger.error(f'Skipping malformed message #{malformed.position}: {malformed.error}')
+
+
+class MessageDecoder:
+    """
+    Turns a byte stream of DatMessages, e.g. the stdin of a destination, into validated
+    messages. The stream is read in large blocks that are split on the offsets of their
+    newlines, without a `readline` or text decoding per line, and every message is parsed
+    and validated straight from its bytes with `TypeAdapter(DatMessage).validate_json`
+    (or decoded with `decode_msgpack` for the msgpack wire format, detected from the
+    stream header). A message that cannot be decoded is reported to `on_error` and
+    skipped, so one bad line does not abort the sync.
+
+    Args:
+        block_size (int, optional): Number of bytes read at once. Defaults to 1 MiB.
+        on_error (Optional[Callable[[MalformedMessage], None]], optional): Called for every
+            malformed message. Defaults to logging an error.
+        lazy (bool, optional): Yield `LazyDatMessage`s that only decode the message type
+            up front. Defaults to False.
+    """
+
+    def __init__(self,
+        block_size: int = DEFAULT_BLOCK_SIZE,
+        on_error: Optional[Callable[[MalformedMessage], None]] = None,
+        lazy: bool = False,
+    ) -> None:
+        self.block_size = block_size
+        self.on_error = on_error or log_malformed_message
+        self.lazy = lazy
+        self.n_malformed = 0
+
+    def decode(self, stream: BinaryIO) -> Iterator[Union[DatMessage, LazyDatMessage]]:
+        """
+        Yields the messages of the stream, in order.
+
+        Args:
+            stream (BinaryIO): The binary stream, e.g. `sys.stdin.buffer`.
+
+        Yields:
+            Iterator[Union[DatMessage, LazyDatMessage]]: The valid messages, lazy ones if `lazy` is set.
+        """
+        head = stream.read(len(MSGPACK_HEADER))
+        if head == MSGPACK_HEADER:
+            yield from self._decode_msgpack(stream)
+        else:
+            yield from self._decode_json_lines(head, stream)
+
+    def _report(self, position: int, error: str, raw: bytes) -> None:
+        self.n_malformed += 1
+        self.on_error(MalformedMessage(position, error, raw))
+
+    def _decode_json_lines(self, pending: bytes, stream: BinaryIO) -> Iterator[Union[DatMessage, LazyDatMessage]]:
+        line_number = 0
+        while True:
+            block = stream.read(self.block_size)
+            data = pending + block if pending else block
+            start = 0
+            end = data.find(b'\n')
+            while end != -1:
+                line_number += 1
+                message = self._decode_json_line(line_number, data[start:end])
+                if message is not None:
+                    yield message
+                start = end + 1
+                end = data.find(b'\n', start)
+            pending = data[start:]
+            if not block:
+                break
+        if pending:
+            message = self._decode_json_line(line_number + 1, pending)
+            if message is not None:
+                yield message
+
+    def _decode_json_line(self, line_number: int, line: bytes) -> Optional[Union[DatMessage, LazyDatMessage]]:
+        if not line or line.isspace():
+            return None
+        try:
+            if self.lazy:
+                return LazyDatMessage(line, WireFormat.JSON)
+            return _MESSAGE_ADAPTER.validate_json(line)
+        except ValueError as exc:
+            self._report(line_number, str(exc), line)
+            return None
+
+    def _decode_msgpack(self, stream: BinaryIO) -> Iterator[Union[DatMessage, LazyDatMessage]]:
+        frame_number = 0
+        data = b''
+        start = 0
+        eof = False
+        while True:
+            # Wait for a whole frame, reading the stream by blocks
+            available = len(data) - start
+            needed = _FRAME_LENGTH.size
+            if available >= _FRAME_LENGTH.size:
+                needed += _FRAME_LENGTH.unpack_from(data, start)[0]
+            if available < needed:
+                if eof:
+                    break
+                block = stream.read(max(self.block_size, needed - available))
+                eof = not block
+                data = data[start:] + block
+                start = 0
+                continue
+            frame_number += 1
+            payload = data[start + _FRAME_LENGTH.size:start + needed]
+            start += needed
+            try:
+                message = LazyDatMessage(payload, WireFormat.MSGPACK) if self.lazy else decode_msgpack(payload)
+            except Exception as exc:
+                self._report(frame_number, str(exc), payload)
+                continue
+            yield message
+        if len(data) > start:
+            self._report(frame_number + 1, 'Truncated msgpack frame at the end of the stream', data[start:])
+
+
+def read_messages(stream: BinaryIO,
+    on_error: Optional[Callable[[MalformedMessage], None]] = None,
+    lazy: bool = False,
+) -> Iterator[Union[DatMessage, LazyDatMessage]]:
+    """
+    Reads the messages of a stream with a `MessageDecoder`, detecting the wire format
+    from the first bytes of the stream.
+
+    Args:
+        stream (BinaryIO): The binary stream to read from, e.g. `sys.stdin.buffer`.
+        on_error (Optional[Callable[[MalformedMessage], None]], optional): Called for every
+            malformed message. Defaults to logging an error.
+        lazy (bool, optional): Yield `LazyDatMessage`s. Defaults to False.
+
+    Yields:
+        Iterator[Union[DatMessage, LazyDatMessage]]: The messages.
+    """
+    return MessageDecoder(on_error=on_error, lazy=lazy).decode(stream)
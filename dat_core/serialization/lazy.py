@@ -0,0 +1,115 @@
+import json
+from typing import Any, Dict, Optional, Sequence
+import msgpack
+from dat_core.pydantic_models import DatMessage, Type
+from dat_core.serialization.wire import WireFormat, _unpack_ext, decode_msgpack
+
+# What a message serialized with `model_dump_json` starts with
+_JSON_TYPE_PREFIX = b'{"type":"'
+
+
+class LazyDatMessage:
+    """
+    A DatMessage received on the wire that is only decoded as far as it is used.
+
+    Only the message `type` is decoded up front. Any other attribute, e.g. `state` or
+    `record`, validates the full DatMessage on first access and is then read from it.
+    Until that happens `MessageWriter` re-emits the original bytes verbatim, so messages
+    that are merely passed through, like STATE messages in a destination, are never
+    validated nor serialized again. `peek` reads a field from the raw message without
+    validating it.
+
+    Args:
+        raw (bytes): The message, a JSON line or a msgpack payload.
+        wire_format (WireFormat): The format of `raw`.
+        type (Optional[Type], optional): The message type if known. Defaults to None,
+            i.e. read from `raw`.
+    """
+
+    def __init__(self, raw: bytes, wire_format: WireFormat, type: Optional[Type] = None) -> None:
+        self.raw = raw
+        self.wire_format = wire_format
+        self._data: Optional[Dict[str, Any]] = None
+        self._message: Optional[DatMessage] = None
+        self.type = type if type is not None else self._read_type()
+
+    @property
+    def is_materialized(self) -> bool:
+        """
+        True once the full DatMessage has been validated.
+        """
+        return self._message is not None
+
+    @property
+    def message(self) -> DatMessage:
+        """
+        The validated DatMessage, built on first access.
+        """
+        if self._message is None:
+            if self.wire_format == WireFormat.JSON:
+                self._message = DatMessage.model_validate(self._raw_data())
+            else:
+                self._message = decode_msgpack(self.raw)
+            self._data = None
+        return self._message
+
+    def __getattr__(self, name: str) -> Any:
+        # Only called for the attributes not set in __init__, i.e. the DatMessage fields
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self.message, name)
+
+    def peek(self, path: Sequence[str]) -> Any:
+        """
+        Returns the raw value at `path`, e.g. `('state', 'stream_state', 'stream_status')`,
+        without validating the message. Enums are returned as their values. Returns None
+        if a key along the path is missing or None.
+        """
+        if self._message is not None:
+            value: Any = self._message.model_dump(mode='json', include=_nested_include(path), warnings=False)
+        else:
+            value = self._raw_data()
+        for key in path:
+            if not isinstance(value, dict):
+                return None
+            value = value.get(key)
+        return value
+
+    def model_dump_json(self, **kwargs: Any) -> str:
+        """
+        The original JSON line if the message was not materialized, see `DatMessage.model_dump_json`.
+        """
+        if self._message is None and self.wire_format == WireFormat.JSON and not kwargs:
+            return self.raw.decode()
+        return self.message.model_dump_json(**kwargs)
+
+    def _raw_data(self) -> Dict[str, Any]:
+        if self._data is None:
+            if self.wire_format == WireFormat.JSON:
+                self._data = json.loads(self.raw)
+            else:
+                self._data = msgpack.unpackb(self.raw, ext_hook=_unpack_ext, raw=False)
+        return self._data
+
+    def _read_type(self) -> Type:
+        if self.wire_format == WireFormat.JSON and self.raw.startswith(_JSON_TYPE_PREFIX):
+            end = self.raw.find(b'"', len(_JSON_TYPE_PREFIX))
+            if end != -1:
+                try:
+                    return Type(self.raw[len(_JSON_TYPE_PREFIX):end].decode())
+                except ValueError:
+                    pass
+        try:
+            return Type(self._raw_data()['type'])
+        except (KeyError, TypeError) as exc:
+            raise ValueError('Message has no type') from exc
+
+    def __repr__(self) -> str:
+        return f'LazyDatMessage(type={self.type}, materialized={self.is_materialized})'
+
+
+def _nested_include(path: Sequence[str]) -> Any:
+    include: Any = True
+    for key in reversed(path):
+        include = {key: include}
+    return include
@@ -0,0 +1,168 @@
+import io
+import os
+import struct
+import sys
+from datetime import date, datetime
+from enum import Enum
+from typing import Any, BinaryIO, List, Optional, TextIO, Union
+import msgpack
+import numpy as np
+from dat_core.pydantic_models import DatMessage, EnumWithStr
+from dat_core.pydantic_models.vectors import KEEP_ARRAYS_CONTEXT, VECTOR_DTYPES
+
+# Environment variable selecting the format messages are written in
+WIRE_FORMAT_ENV = 'DAT_WIRE_FORMAT'
+# Written once at the start of a msgpack stream. A JSON stream starts with '{' instead
+MSGPACK_HEADER = b'\x00DATMSGPACK1\n'
+# Every msgpack message is preceded by its length
+_FRAME_LENGTH = struct.Struct('>I')
+# msgpack extension type of numpy arrays
+_NDARRAY_EXT_TYPE = 1
+
+
+class WireFormat(EnumWithStr):
+    JSON = 'json'
+    MSGPACK = 'msgpack'
+
+
+def get_wire_format() -> WireFormat:
+    """
+    Returns the wire format selected with the `DAT_WIRE_FORMAT` environment variable,
+    JSON by default.
+
+    Raises:
+        ValueError: If the variable holds an unknown format.
+    """
+    return WireFormat(os.environ.get(WIRE_FORMAT_ENV, WireFormat.JSON.value).lower())
+
+
+def _pack_default(value: Any) -> Any:
+    if isinstance(value, np.ndarray):
+        dtype = value.dtype.name if value.dtype.name in VECTOR_DTYPES else 'float32'
+        data = np.ascontiguousarray(value, dtype=np.dtype(VECTOR_DTYPES[dtype]).newbyteorder('<'))
+        return msgpack.ExtType(
+            _NDARRAY_EXT_TYPE, msgpack.packb([dtype, list(value.shape), data.tobytes()]))
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+
+def _unpack_ext(code: int, data: bytes) -> Any:
+    if code != _NDARRAY_EXT_TYPE:
+        return msgpack.ExtType(code, data)
+    dtype, shape, buffer = msgpack.unpackb(data)
+    array = np.frombuffer(bytearray(buffer), dtype=np.dtype(VECTOR_DTYPES[dtype]).newbyteorder('<'))
+    return array.astype(VECTOR_DTYPES[dtype], copy=False).reshape(shape)
+
+
+def encode_msgpack(message: DatMessage) -> bytes:
+    """
+    Encodes a message as msgpack. Vectors are written as their raw little-endian bytes.
+
+    Args:
+        message (DatMessage): The message.
+
+    Returns:
+        bytes: The msgpack payload, without framing.
+    """
+    # The stream models keep their enums as plain strings, the serializer warnings about
+    # it are both spurious and costly in python mode
+    return msgpack.packb(
+        message.model_dump(context=KEEP_ARRAYS_CONTEXT, warnings=False), default=_pack_default, use_bin_type=True)
+
+
+def decode_msgpack(payload: bytes) -> DatMessage:
+    """
+    Decodes a message encoded with `encode_msgpack`.
+
+    Args:
+        payload (bytes): The msgpack payload, without framing.
+
+    Returns:
+        DatMessage: The message.
+    """
+    return DatMessage.model_validate(msgpack.unpackb(payload, ext_hook=_unpack_ext, raw=False))
+
+
+class MessageWriter:
+    """
+    Writes messages to a stream in a wire format: newline delimited JSON, or msgpack
+    frames (a 4 byte big-endian length followed by the payload) after `MSGPACK_HEADER`.
+
+    Args:
+        stream (Union[BinaryIO, TextIO]): Where to write. JSON may be written to a text
+            stream, msgpack needs a binary one.
+        wire_format (Optional[WireFormat], optional): The format. Defaults to the one
+            selected with the `DAT_WIRE_FORMAT` environment variable.
+    """
+
+    def __init__(self, stream: Union[BinaryIO, TextIO], wire_format: Optional[WireFormat] = None) -> None:
+        self.wire_format = wire_format or get_wire_format()
+        self._stream = stream
+        self._binary = not isinstance(stream, io.TextIOBase)
+        if self.wire_format == WireFormat.MSGPACK and not self._binary:
+            raise ValueError('The msgpack wire format needs a binary stream')
+        self._header_written = False
+
+    def write(self, message: DatMessage) -> None:
+        """
+        Writes a message. A `LazyDatMessage` that was not materialized is written as the
+        bytes it was received as, if they are in the same wire format.
+        """
+        # Imported here as the lazy message is built on top of this module
+        from dat_core.serialization.lazy import LazyDatMessage
+        raw = None
+        if isinstance(message, LazyDatMessage) and not message.is_materialized \
+                and message.wire_format == self.wire_format:
+            raw = message.raw
+        if self.wire_format == WireFormat.JSON:
+            if raw is not None:
+                self._stream.write(raw + b'\n' if self._binary else raw.decode() + '\n')
+                return
+            line = message.model_dump_json() + '\n'
+            self._stream.write(line.encode() if self._binary else line)
+            return
+        payload = raw if raw is not None else encode_msgpack(message)
+        if not self._header_written:
+            self._stream.write(MSGPACK_HEADER)
+            self._header_written = True
+        self._stream.write(_FRAME_LENGTH.pack(len(payload)) + payload)
+
+    def flush(self) -> None:
+        self._stream.flush()
+
+
+class _StdoutWriter:
+    """
+    Writes messages to the current `sys.stdout` in the selected wire format, the binary
+    one going through `sys.stdout.buffer`.
+    """
+
+    def __init__(self) -> None:
+        self._writer: Optional[MessageWriter] = None
+
+    def write(self, message: DatMessage) -> None:
+        self.write_many([message])
+
+    def write_many(self, messages: List[DatMessage]) -> None:
+        """
+        Writes messages with a single flush.
+        """
+        if not messages:
+            return
+        wire_format = get_wire_format()
+        if wire_format == WireFormat.JSON:
+            lines = [message.model_dump_json() for message in messages]
+            print('\n'.join(lines), flush=True)
+            return
+        if self._writer is None or self._writer._stream is not sys.stdout.buffer:
+            self._writer = MessageWriter(sys.stdout.buffer, wire_format)
+        for message in messages:
+            self._writer.write(message)
+        self._writer.flush()
+
+
+# Use this object to write messages to the standard output in other modules
+stdout_writer = _StdoutWriter()
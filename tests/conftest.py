@@ -0,0 +1,55 @@
+from typing import Any, Dict, List, Optional
+from dat_core.connectors.destinations.loader import Loader
+from dat_core.pydantic_models import (
+    DatCatalog,
+    DatDocumentMessage,
+    DatDocumentStream,
+    DatMessage,
+    Data,
+    StreamMetadata,
+    Type,
+)
+
+
+class InMemoryLoader(Loader):
+    """
+    Loader keeping every call in memory: the record ids and chunks of each load and the delete filters.
+    """
+
+    def __init__(self, config: Any = None) -> None:
+        super().__init__(config)
+        self.loaded: List[List[str]] = []
+        self.loaded_chunks: List[str] = []
+        self.loaded_batches: List[List[str]] = []
+        self.deleted: List[Dict[str, Any]] = []
+
+    def load(self, document_chunks: List[DatDocumentMessage], namespace: str, stream: str) -> None:
+        self.loaded.append([doc.data.metadata.dat_record_id for doc in document_chunks])
+        self.loaded_chunks += [doc.data.document_chunk for doc in document_chunks]
+
+    def delete(self, filter: Any, namespace: str) -> None:
+        self.deleted.append(filter)
+
+    def check(self) -> Optional[str]:
+        return None
+
+    def initiate_sync(self, configured_catalog: DatCatalog) -> None:
+        pass
+
+    def prepare_metadata_filter(self, filter: Dict[str, Any]) -> Any:
+        return filter
+
+
+def make_record_message(stream: str, idx: int, chunk: Optional[str] = None) -> DatMessage:
+    """
+    RECORD message of `stream` in the `ns` namespace with the `<stream>-<idx>` record id.
+    """
+    return DatMessage(type=Type.RECORD, record=DatDocumentMessage(
+        namespace='ns',
+        stream=DatDocumentStream(name=stream),
+        data=Data(
+            document_chunk=f'{stream} chunk {idx}' if chunk is None else chunk,
+            metadata=StreamMetadata(
+                dat_source='src', dat_stream=stream, dat_run_id='run', dat_record_id=f'{stream}-{idx}'),
+        ),
+    ))
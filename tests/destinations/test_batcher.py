@@ -0,0 +1,147 @@
+import pytest
+from dat_core.connectors.destinations.batcher import AdaptiveBatchSize, BatchPolicy, StreamBatcher
+from dat_core.metrics import metrics
+from dat_core.pydantic_models import (
+    DatDocumentMessage,
+    DatDocumentStream,
+    DatMessage,
+    Data,
+    StreamMetadata,
+    Type,
+)
+
+
+class FakeClock:
+
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def make_record_message(idx: int) -> DatMessage:
+    return DatMessage(type=Type.RECORD, record=DatDocumentMessage(
+        stream=DatDocumentStream(name='docs'),
+        data=Data(
+            document_chunk=f'chunk {idx}',
+            vectors=[0.5, float(idx)],
+            metadata=StreamMetadata(dat_source='src', dat_stream='docs', dat_run_id='run', dat_record_id=str(idx)),
+        ),
+    ))
+
+
+class TestStreamBatcher:
+
+    def test_batches_linger_at_most_max_linger_seconds(self):
+        """
+        GIVEN a batcher with a linger time of 5 seconds
+        WHEN a stream stops receiving records
+        THEN its partial batch expires 5 seconds after its first record
+        AND the batches of other streams are left alone until their own deadline
+        """
+        clock = FakeClock()
+        batcher = StreamBatcher(BatchPolicy(100, max_linger_seconds=5), size_of=lambda _: 1, clock=clock)
+        batcher.add('a', 'a-0')
+        clock.now = 3
+        batcher.add('b', 'b-0')
+        batcher.add('a', 'a-1')
+        assert batcher.expired() == []
+
+        clock.now = 5
+        assert batcher.expired() == [('a', ['a-0', 'a-1'])]
+        assert 'a' not in batcher and len(batcher) == 1
+        clock.now = 7.9
+        assert batcher.expired() == []
+        clock.now = 8
+        assert batcher.expired() == [('b', ['b-0'])]
+        assert batcher.drain() == []
+
+    def test_memory_budget_flushes_full_buffers_and_spills_the_others(self):
+        """
+        GIVEN a batch size of 20 and a memory budget of 4 bytes, with records of 1 byte
+        WHEN stream a holds 5 records and streams b and c 1 record each
+        THEN enforcing the budget flushes the batch of stream a, a quarter full
+        AND once stream c holds 4 records, enforcing it again spills them
+        AND the spilled records are read back first, unchanged, with the batch of stream c
+        """
+        batcher = StreamBatcher(BatchPolicy(20), size_of=lambda _: 1)
+        for idx in range(5):
+            batcher.add('a', make_record_message(idx))
+        batcher.add('b', make_record_message(10))
+        batcher.add('c', make_record_message(20))
+        flushed = batcher.enforce_budget(4)
+        assert [(key, len(batch)) for key, batch in flushed] == [('a', 5)]
+        assert batcher.nbytes == 2
+
+        for idx in range(21, 24):
+            batcher.add('c', make_record_message(idx))
+        assert batcher.enforce_budget(4) == []
+        assert batcher.nbytes == 1 and len(batcher) == 5 and batcher.spilled_nbytes > 0
+
+        batcher.add('c', make_record_message(24))
+        batch = batcher.pop('c')
+        assert [m.record.data.metadata.dat_record_id for m in batch] == ['20', '21', '22', '23', '24']
+        assert [m.record.data.vectors[1] for m in batch] == [20.0, 21.0, 22.0, 23.0, 24.0]
+        assert batcher.nbytes == 1
+        batcher.close()
+
+
+class TestAdaptiveBatchSize:
+
+    def test_batch_size_grows_additively_and_shrinks_multiplicatively(self):
+        """
+        GIVEN an adaptive batch size starting at 100, between 20 and 130, with a 1 second target
+        WHEN loads are fast, partial, slow or failing
+        THEN fast full batches add 10 records up to 130
+        AND partial batches leave the size alone
+        AND slow or failed loads halve the size down to 20
+        AND the size of every stream is reported by a gauge
+        """
+        key = ('ns', 'docs')
+        sizer = AdaptiveBatchSize(100, min_size=20, max_size=130, target_seconds=1.0)
+        sizer.record_success(key, 100, 0.5)
+        assert sizer.size(key) == 110
+        sizer.record_success(key, 50, 0.5)
+        assert sizer.size(key) == 110
+        for _ in range(3):
+            sizer.record_success(key, 200, 0.5)
+        assert sizer.size(key) == 130
+        sizer.record_success(key, 130, 1.5)
+        assert sizer.size(key) == 65
+        with pytest.raises(TimeoutError):
+            with sizer.observe(key, 65):
+                raise TimeoutError()
+        assert sizer.size(key) == 32
+        sizer.record_failure(key)
+        assert sizer.size(key) == 20
+        assert sizer.size(('ns', 'faqs')) == 100
+        assert metrics.gauge('destination_batch_size', namespace='ns', stream='docs').value == 20
+
+    def test_batch_size_of_streams_without_namespace_is_reported(self):
+        """
+        GIVEN an adaptive batch size of a stream without namespace
+        WHEN a load succeeds and a trace message is built
+        THEN the gauge of the stream is reported without a namespace label
+        """
+        sizer = AdaptiveBatchSize(10, min_size=1, max_size=100, target_seconds=1.0)
+        sizer.record_success((None, 'no-namespace'), 10, 0.1)
+        gauges = [
+            metric for metric in metrics.trace_message().trace.metrics
+            if metric.name == 'destination_batch_size' and metric.labels.get('stream') == 'no-namespace'
+        ]
+        assert [(gauge.labels, gauge.value) for gauge in gauges] == [({'stream': 'no-namespace'}, 11)]
+
+    def test_batcher_uses_the_size_of_every_stream(self):
+        """
+        GIVEN a batcher taking the batch size of every stream from a function
+        WHEN records of two streams are added
+        THEN every stream's batch is full at its own size
+        """
+        sizes = {'a': 2, 'b': 3}
+        batcher = StreamBatcher(BatchPolicy(100), size_of=lambda _: 1, max_records_of=sizes.get)
+        assert batcher.add('a', 'a-0') is None
+        assert batcher.add('b', 'b-0') is None
+        assert batcher.add('a', 'a-1') == ['a-0', 'a-1']
+        assert batcher.add('b', 'b-1') is None
+        assert batcher.add('b', 'b-2') == ['b-0', 'b-1', 'b-2']
@@ -0,0 +1,78 @@
+from dat_core.connectors.content_hash import ContentHashFilter, ContentHashIndex
+from dat_core.connectors.destinations.data_processor import DataProcessor
+from dat_core.metrics import metrics
+from dat_core.pydantic_models import (
+    DatCatalog,
+    DatDocumentStream,
+    DatMessage,
+    WriteSyncMode,
+)
+from conftest import InMemoryLoader, make_record_message
+
+
+def make_catalog() -> DatCatalog:
+    return DatCatalog(document_streams=[
+        DatDocumentStream(name='docs', namespace='ns', write_sync_mode=WriteSyncMode.APPEND),
+        DatDocumentStream(name='faqs', namespace='ns', write_sync_mode=WriteSyncMode.REPLACE),
+        DatDocumentStream(name='pages', namespace='ns', write_sync_mode=WriteSyncMode.UPSERT),
+    ])
+
+
+class TestContentHash:
+
+    def test_unchanged_chunks_are_only_loaded_once(self, tmp_path):
+        """
+        GIVEN a first run loading 3 chunks of an APPEND stream and 1 of a REPLACE stream
+        WHEN a second run re-emits them with a single chunk of the APPEND stream changed
+        THEN the second run only loads the changed chunk and the REPLACE stream's chunk
+        AND the skipped records are counted
+        """
+        index = ContentHashIndex(str(tmp_path / 'content_hashes.sqlite'))
+        first_run = [make_record_message('docs', idx, f'chunk {idx}') for idx in range(3)]
+        first_run.append(make_record_message('faqs', 0, 'faq'))
+        loader = InMemoryLoader()
+        list(DataProcessor(None, loader, 10, content_hash_index=index).processor(make_catalog(), first_run))
+        assert loader.loaded_chunks == ['chunk 0', 'chunk 1', 'chunk 2', 'faq']
+
+        skipped = metrics.counter('content_hash_skipped_records', stream='docs')
+        n_skipped = skipped.value
+        second_run = [make_record_message('docs', idx, f'chunk {idx}') for idx in range(3)]
+        second_run[1] = make_record_message('docs', 1, 'chunk 1, edited')
+        second_run.append(make_record_message('faqs', 0, 'faq'))
+        loader = InMemoryLoader()
+        list(DataProcessor(None, loader, 10, content_hash_index=index).processor(make_catalog(), second_run))
+        assert loader.loaded_chunks == ['chunk 1, edited', 'faq']
+        assert skipped.value - n_skipped == 2
+
+    def test_upsert_streams_are_not_filtered(self, tmp_path):
+        """
+        GIVEN a first run loading a document of an UPSERT stream as 2 chunks sharing one dat_record_id
+        WHEN a second run re-emits it with only its first chunk changed
+        THEN both chunks are loaded again, as loading the changed one deletes the previous version of both
+        """
+        index = ContentHashIndex(str(tmp_path / 'content_hashes.sqlite'))
+        first_run = [make_record_message('pages', 0, 'intro'), make_record_message('pages', 0, 'body')]
+        loader = InMemoryLoader()
+        list(DataProcessor(None, loader, 10, content_hash_index=index).processor(make_catalog(), first_run))
+        assert loader.loaded_chunks == ['intro', 'body']
+
+        second_run = [make_record_message('pages', 0, 'intro, edited'), make_record_message('pages', 0, 'body')]
+        loader = InMemoryLoader()
+        list(DataProcessor(None, loader, 10, content_hash_index=index).processor(make_catalog(), second_run))
+        assert loader.loaded_chunks == ['intro, edited', 'body']
+
+    def test_filter_before_the_generator(self, tmp_path):
+        """
+        GIVEN an index holding the hash of a loaded chunk
+        WHEN a RECORD_BATCH with that chunk and a new one goes through the filter
+        THEN the batch only holds the new chunk
+        AND the filter does not store the hash of the new chunk
+        """
+        index = ContentHashIndex(str(tmp_path / 'content_hashes.sqlite'))
+        index.update_records([make_record_message('docs', 0, 'chunk 0').record])
+        batch = DatMessage.as_record_batch([make_record_message('docs', idx, f'chunk {idx}') for idx in range(2)])
+
+        filtered = list(ContentHashFilter(index).filter([batch]))
+        assert filtered[0].record_batch.ids == ['docs-1']
+        assert filtered[0].record_batch.document_chunks == ['chunk 1']
+        assert index.get(('src', 'docs', 'docs-1')) is None
@@ -0,0 +1,400 @@
+import json
+import time
+from typing import Any, List
+import numpy as np
+import pytest
+from dat_core.metrics import metrics
+from dat_core.connectors.destinations.batcher import record_payload_size
+from dat_core.connectors.destinations.columns import ColumnBatch
+from dat_core.connectors.destinations.data_processor import DataProcessor, UpsertStrategy
+from dat_core.connectors.destinations.dead_letter import DeadLetterFile
+from dat_core.connectors.destinations.retry import PayloadTooLargeError, RetryPolicy
+from dat_core.pydantic_models import (
+    DatCatalog,
+    DatDocumentMessage,
+    DatDocumentStream,
+    DatMessage,
+    DatRecordBatchMessage,
+    DatStateMessage,
+    StreamState,
+    StreamStatus,
+    Type,
+    WriteSyncMode,
+)
+from conftest import InMemoryLoader, make_record_message
+
+
+class BatchLoader(InMemoryLoader):
+
+    def load_record_batch(self, record_batch: DatRecordBatchMessage, namespace: str, stream: str) -> None:
+        self.loaded_batches.append(list(record_batch.ids))
+
+
+class EventLoader(InMemoryLoader):
+    """
+    Loader taking `delay` seconds per load and recording its loads in a shared event list.
+    """
+
+    def __init__(self, events: List[Any], delay: float = 0.0) -> None:
+        super().__init__()
+        self.events = events
+        self.delay = delay
+
+    def load(self, document_chunks: List[DatDocumentMessage], namespace: str, stream: str) -> None:
+        time.sleep(self.delay)
+        super().load(document_chunks, namespace, stream)
+        self.events.append(len(document_chunks))
+
+
+class PickyLoader(InMemoryLoader):
+    """
+    Loader failing with a ConnectionError on its first `n_flaky` loads, rejecting batches
+    of more than `max_records` records as too large and any batch with a `poison` record.
+    """
+
+    def __init__(self, n_flaky: int = 0, max_records: int = 100, poison: str = '') -> None:
+        super().__init__()
+        self.n_flaky = n_flaky
+        self.max_records = max_records
+        self.poison = poison
+
+    def load(self, document_chunks: List[DatDocumentMessage], namespace: str, stream: str) -> None:
+        if self.n_flaky:
+            self.n_flaky -= 1
+            raise ConnectionError('connection reset')
+        ids = [doc.data.metadata.dat_record_id for doc in document_chunks]
+        if len(ids) > self.max_records or self.poison in ids:
+            raise PayloadTooLargeError(f'{len(ids)} records')
+        super().load(document_chunks, namespace, stream)
+
+
+class ColumnLoader(InMemoryLoader):
+    """
+    Loader implementing load_batch, keeping the columns of every batch.
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.batches = []
+
+    def load_batch(self, batch: ColumnBatch, namespace: str, stream: str) -> None:
+        self.batches.append((list(batch.ids), batch.vectors, batch.vectors.copy(), batch.texts, batch.metadata))
+
+
+def make_state_message(stream: str, status: StreamStatus) -> DatMessage:
+    return DatMessage(type=Type.STATE, state=DatStateMessage(
+        stream=DatDocumentStream(name=stream, namespace='ns'),
+        stream_state=StreamState(data={}, stream_status=status),
+    ))
+
+
+def make_catalog(write_sync_mode: WriteSyncMode = WriteSyncMode.APPEND) -> DatCatalog:
+    return DatCatalog(document_streams=[
+        DatDocumentStream(name='docs', namespace='ns', write_sync_mode=write_sync_mode),
+    ])
+
+
+class TestDataProcessor:
+
+    def test_record_batch_is_loaded_natively(self):
+        """
+        GIVEN records of a stream followed by a RECORD_BATCH message of the same stream
+        WHEN they are processed with a loader implementing load_record_batch
+        THEN the records received before the batch are loaded first
+        AND the batch is loaded as a whole
+        AND the records of the batch are deleted first for an UPSERT stream
+        """
+        loader = BatchLoader()
+        messages = [
+            make_record_message('docs', 0),
+            DatMessage.as_record_batch([make_record_message('docs', idx) for idx in (1, 2)]),
+        ]
+        processor = DataProcessor(None, loader, batch_size=10)
+        list(processor.processor(make_catalog(WriteSyncMode.UPSERT), messages))
+
+        assert loader.loaded == [['docs-0']]
+        assert loader.loaded_batches == [['docs-1', 'docs-2']]
+        assert sorted(loader.deleted[-1]['dat_record_id']) == ['docs-1', 'docs-2', 'not_set']
+        assert processor.n_records_per_stream[('ns', 'docs')] == 3
+
+    def test_record_batch_falls_back_to_load(self):
+        """
+        GIVEN a RECORD_BATCH message
+        WHEN it is processed with a loader only implementing load
+        THEN the batch is loaded as records
+        """
+        loader = InMemoryLoader()
+        messages = [DatMessage.as_record_batch([make_record_message('docs', idx) for idx in range(3)])]
+        list(DataProcessor(None, loader, batch_size=10).processor(make_catalog(), messages))
+
+        assert loader.loaded == [['docs-0', 'docs-1', 'docs-2']]
+
+    def test_streams_are_batched_separately_from_a_generator(self):
+        """
+        GIVEN two interleaved streams read from a generator and a batch size of 3
+        WHEN they are processed
+        THEN every load holds the records of a single stream
+        AND a stream's batch is only loaded once it holds 3 records or at the end
+        """
+        catalog = DatCatalog(document_streams=[
+            DatDocumentStream(name=name, namespace='ns') for name in ('docs', 'faqs')
+        ])
+        messages = (
+            make_record_message(name, idx)
+            for idx in range(4) for name in ('docs', 'faqs', 'docs')
+        )
+        loader = InMemoryLoader()
+        list(DataProcessor(None, loader, batch_size=3).processor(catalog, messages))
+
+        assert loader.loaded == [
+            ['docs-0', 'docs-0', 'docs-1'],
+            ['faqs-0', 'faqs-1', 'faqs-2'],
+            ['docs-1', 'docs-2', 'docs-2'],
+            ['docs-3', 'docs-3'],
+            ['faqs-3'],
+        ]
+
+    def test_batches_are_flushed_on_payload_bytes(self):
+        """
+        GIVEN records of the same size and a limit of 2.5 records' payload bytes per batch
+        WHEN they are processed with a batch size of 10
+        THEN a batch is loaded as soon as it reaches the limit, i.e. every 3 records
+        """
+        messages = [make_record_message('docs', idx) for idx in range(7)]
+        max_batch_bytes = int(2.5 * record_payload_size(messages[0]))
+        loader = InMemoryLoader()
+        processor = DataProcessor(None, loader, batch_size=10, max_batch_bytes=max_batch_bytes)
+        list(processor.processor(make_catalog(), messages))
+
+        assert [len(ids) for ids in loader.loaded] == [3, 3, 1]
+
+    def test_states_wait_for_the_records_before_them(self):
+        """
+        GIVEN 2 records, a RUNNING state, 10 records and a COMPLETED state
+        WHEN they are processed with a batch size of 10
+        THEN the RUNNING state is only yielded once its 2 records are loaded, with the next 8
+        AND the COMPLETED state once the last 2 records are loaded
+        """
+        events = []
+        messages = [make_record_message('docs', idx) for idx in range(2)]
+        messages.append(make_state_message('docs', StreamStatus.RUNNING))
+        messages += [make_record_message('docs', idx) for idx in range(2, 12)]
+        messages.append(make_state_message('docs', StreamStatus.COMPLETED))
+
+        processor = DataProcessor(None, EventLoader(events), batch_size=10)
+        for message in processor.processor(make_catalog(), messages):
+            if message.type == Type.STATE:
+                events.append(message.state.stream_state.stream_status)
+
+        assert events == [10, StreamStatus.RUNNING, 2, StreamStatus.COMPLETED]
+
+    def test_batches_are_loaded_concurrently(self):
+        """
+        GIVEN 8 batches of records, a COMPLETED state and a loader taking 50 ms per batch
+        WHEN they are processed with 4 workers
+        THEN every batch is loaded in less than half the time of sequential loads
+        AND the state is yielded after all of them
+        """
+        events = []
+        loader = EventLoader(events, delay=0.05)
+        messages = [make_record_message('docs', idx) for idx in range(40)]
+        messages.append(make_state_message('docs', StreamStatus.COMPLETED))
+
+        _start = time.monotonic()
+        processor = DataProcessor(None, loader, batch_size=5, max_workers=4)
+        for message in processor.processor(make_catalog(), messages):
+            if message.type == Type.STATE:
+                events.append(message.state.stream_state.stream_status)
+        elapsed = time.monotonic() - _start
+
+        assert elapsed < 8 * 0.05 / 2
+        assert events == [5] * 8 + [StreamStatus.COMPLETED]
+        assert sorted(id_ for ids in loader.loaded for id_ in ids) == sorted(f'docs-{idx}' for idx in range(40))
+
+    def test_batch_size_adapts_to_the_loads(self):
+        """
+        GIVEN a batch size of 2 adaptive up to 4 and a fast loader
+        WHEN 15 records are processed
+        THEN every full batch grows the next one by a record, up to 4
+        """
+        loader = InMemoryLoader()
+        messages = [make_record_message('docs', idx) for idx in range(15)]
+        processor = DataProcessor(None, loader, batch_size=2, max_batch_size=4)
+        list(processor.processor(make_catalog(), messages))
+
+        assert [len(ids) for ids in loader.loaded] == [2, 3, 4, 4, 2]
+        assert processor.batch_sizer.size(('ns', 'docs')) == 4
+
+    def test_transient_load_errors_are_retried(self):
+        """
+        GIVEN a loader failing twice with a connection error
+        WHEN a batch is processed
+        THEN it is loaded on the third attempt
+        """
+        sleeps = []
+        loader = PickyLoader(n_flaky=2)
+        messages = [make_record_message('docs', idx) for idx in range(3)]
+        processor = DataProcessor(None, loader, batch_size=10, retry_policy=RetryPolicy(sleep=sleeps.append))
+        list(processor.processor(make_catalog(), messages))
+
+        assert loader.loaded == [['docs-0', 'docs-1', 'docs-2']]
+        assert len(sleeps) == 2
+
+    def test_too_large_batches_are_split_and_failures_dead_lettered(self, tmp_path):
+        """
+        GIVEN a loader accepting at most 2 records per batch and rejecting the record docs-5
+        WHEN a batch of 8 records is processed with a dead letter file
+        THEN the batch is split in halves until they are accepted
+        AND docs-5 is written to the dead letter file
+        AND replaying the file to a loader accepting it loads docs-5
+        """
+        path = str(tmp_path / 'dead_letters.jsonl')
+        loader = PickyLoader(max_records=2, poison='docs-5')
+        messages = [make_record_message('docs', idx) for idx in range(8)]
+        processor = DataProcessor(None, loader, batch_size=10, dead_letter_path=path)
+        list(processor.processor(make_catalog(), messages))
+
+        assert loader.loaded == [['docs-0', 'docs-1'], ['docs-2', 'docs-3'], ['docs-4'], ['docs-6', 'docs-7']]
+        assert processor.n_records_per_stream[('ns', 'docs')] == 7
+        assert processor.dead_letters.n_records == 1
+
+        replay_loader = InMemoryLoader()
+        list(DataProcessor(None, replay_loader, batch_size=10).processor(make_catalog(), DeadLetterFile(path).read()))
+        assert replay_loader.loaded == [['docs-5']]
+
+    def test_load_errors_fail_the_sync_without_dead_letter_file(self):
+        """
+        GIVEN a loader rejecting the record docs-1
+        WHEN records are processed without a dead letter file
+        THEN the error is raised
+        """
+        loader = PickyLoader(poison='docs-1')
+        messages = [make_record_message('docs', idx) for idx in range(2)]
+        with pytest.raises(PayloadTooLargeError):
+            list(DataProcessor(None, loader, batch_size=10).processor(make_catalog(), messages))
+
+    def test_upsert_sweep_deletes_once_the_stream_is_completed(self):
+        """
+        GIVEN an UPSERT stream of 5 records, a COMPLETED state and a loader deleting at most
+            2 record ids at once
+        WHEN they are processed with the SWEEP upsert strategy and a batch size of 2
+        THEN every batch is loaded without delete
+        AND the 5 records are deleted in 3 chunks before the COMPLETED state is yielded
+        """
+        events = []
+        loader = EventLoader(events)
+        loader.MAX_DELETE_FILTER_IDS = 2
+        messages = [make_record_message('docs', idx) for idx in range(5)]
+        messages.append(make_state_message('docs', StreamStatus.COMPLETED))
+
+        processor = DataProcessor(None, loader, batch_size=2, upsert_strategy=UpsertStrategy.SWEEP)
+        for message in processor.processor(make_catalog(WriteSyncMode.UPSERT), messages):
+            if message.type == Type.STATE:
+                events.append(len(loader.deleted))
+
+        assert events == [2, 2, 1, 3]
+        assert [sorted(_filter['dat_record_id']) for _filter in loader.deleted] == [
+            ['docs-0', 'docs-1', 'not_set'], ['docs-2', 'docs-3', 'not_set'], ['docs-4', 'not_set'],
+        ]
+        assert loader.deleted[0]['dat_run_id'] == 'run'
+
+    def test_failed_sweep_deletes_are_dead_lettered(self, tmp_path):
+        """
+        GIVEN an UPSERT stream of 5 records, a COMPLETED state and a loader deleting at most
+            2 record ids at once, failing to delete docs-2 and docs-3
+        WHEN they are processed with the SWEEP upsert strategy, with and without a dead letter file
+        THEN the other chunks are still deleted
+        AND with a dead letter file, the failed delete is written to it with its record ids
+            and the COMPLETED state is yielded
+        AND without one, the error is raised and the COMPLETED state is not yielded
+        """
+        class FailingDeleteLoader(InMemoryLoader):
+            MAX_DELETE_FILTER_IDS = 2
+
+            def delete(self, filter, namespace):
+                if 'docs-2' in filter['dat_record_id']:
+                    raise ValueError('invalid filter')
+                super().delete(filter, namespace)
+
+        def make_messages():
+            messages = [make_record_message('docs', idx) for idx in range(5)]
+            return messages + [make_state_message('docs', StreamStatus.COMPLETED)]
+
+        path = str(tmp_path / 'dead_letters.jsonl')
+        loader = FailingDeleteLoader()
+        processor = DataProcessor(None, loader, batch_size=2, upsert_strategy=UpsertStrategy.SWEEP,
+                                  dead_letter_path=path)
+        states = [msg for msg in processor.processor(make_catalog(WriteSyncMode.UPSERT), make_messages())
+                  if msg.type == Type.STATE]
+        assert [sorted(_filter['dat_record_id']) for _filter in loader.deleted] == [
+            ['docs-0', 'docs-1', 'not_set'], ['docs-4', 'not_set']]
+        assert [msg.state.stream_state.stream_status for msg in states] == [StreamStatus.COMPLETED]
+        assert processor.dead_letters.n_deletes == 1
+        [log] = list(DeadLetterFile(path).read())
+        assert json.loads(log.log.message)['ids'] == ['docs-2', 'docs-3']
+
+        loader = FailingDeleteLoader()
+        processor = DataProcessor(None, loader, batch_size=2, upsert_strategy=UpsertStrategy.SWEEP)
+        states = []
+        with pytest.raises(ValueError):
+            for message in processor.processor(make_catalog(WriteSyncMode.UPSERT), make_messages()):
+                if message.type == Type.STATE:
+                    states.append(message)
+        assert len(loader.deleted) == 2
+        assert states == []
+
+    def test_buffers_stay_within_the_memory_budget(self):
+        """
+        GIVEN 3 interleaved streams and a memory budget of 4 records' payload bytes
+        WHEN 10 records of each are processed with a batch size of 4
+        THEN the buffered bytes never exceed the budget
+        AND every record is loaded once, in order within its stream
+        """
+        catalog = DatCatalog(document_streams=[
+            DatDocumentStream(name=name, namespace='ns') for name in ('docs', 'faqs', 'news')
+        ])
+        messages = [make_record_message(name, idx) for idx in range(10) for name in ('docs', 'faqs', 'news')]
+        budget = 4 * record_payload_size(messages[0])
+        loader = InMemoryLoader()
+        buffered_bytes = metrics.gauge('destination_buffered_bytes')
+        observed = []
+
+        def observing(messages):
+            for message in messages:
+                observed.append(buffered_bytes.value)
+                yield message
+
+        processor = DataProcessor(None, loader, batch_size=4, memory_budget_bytes=budget)
+        list(processor.processor(catalog, observing(messages)))
+
+        assert max(observed) <= budget
+        for name in ('docs', 'faqs', 'news'):
+            loaded = [id_ for ids in loader.loaded for id_ in ids if id_.startswith(name)]
+            assert loaded == [f'{name}-{idx}' for idx in range(10)]
+
+    def test_loaders_implementing_load_batch_get_columns(self):
+        """
+        GIVEN a loader implementing load_batch and records with 2-dimension vectors
+        WHEN 4 records and then a RECORD_BATCH of 2 records are processed with a batch size of 2
+        THEN the loader gets the ids, a float32 vector matrix, the texts and the metadata
+        AND the batches of records share the same vector buffer
+        AND the RECORD_BATCH is passed as columns too
+        """
+        messages = [make_record_message('docs', idx) for idx in range(4)]
+        batch_records = [make_record_message('docs', idx) for idx in (4, 5)]
+        for idx, message in enumerate(messages + batch_records):
+            message.record.data.vectors = [float(idx), 1.0]
+        messages.append(DatMessage.as_record_batch(batch_records))
+        loader = ColumnLoader()
+        list(DataProcessor(None, loader, batch_size=2).processor(make_catalog(), messages))
+
+        assert loader.loaded == []
+        assert [ids for ids, *_ in loader.batches] == [['docs-0', 'docs-1'], ['docs-2', 'docs-3'], ['docs-4', 'docs-5']]
+        _, vectors, vectors_copy, texts, metadata = loader.batches[1]
+        assert vectors.dtype == np.float32 and vectors.flags.c_contiguous
+        assert vectors_copy.tolist() == [[2.0, 1.0], [3.0, 1.0]]
+        assert np.shares_memory(loader.batches[0][1], vectors)
+        assert texts == ['docs chunk 2', 'docs chunk 3']
+        assert metadata[0]['dat_record_id'] == 'docs-2' and metadata[0]['dat_run_id'] == 'run'
+        assert loader.batches[2][2].tolist() == [[4.0, 1.0], [5.0, 1.0]]
+        assert loader.batches[2][4][1]['dat_record_id'] == 'docs-5'
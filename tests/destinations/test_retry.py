@@ -0,0 +1,71 @@
+import pytest
+from dat_core.connectors.destinations.retry import (
+    PayloadTooLargeError,
+    RetryPolicy,
+    is_payload_too_large_error,
+    is_retryable_error,
+)
+
+
+class HttpError(Exception):
+
+    def __init__(self, status_code: int) -> None:
+        super().__init__(f'HTTP {status_code}')
+        self.status_code = status_code
+
+
+class TestRetryPolicy:
+
+    def test_transient_errors_are_retried_with_a_growing_backoff(self):
+        """
+        GIVEN a call failing 3 times with a 503 error and a policy of 4 attempts
+        WHEN it is called through the policy
+        THEN it is retried until it succeeds
+        AND every backoff is jittered below its exponential ceiling
+        """
+        sleeps = []
+        errors = [HttpError(503)] * 3
+
+        def flaky():
+            if errors:
+                raise errors.pop()
+            return 'ok'
+
+        policy = RetryPolicy(max_attempts=4, initial_backoff=1, max_backoff=3, sleep=sleeps.append)
+        assert policy.call(flaky) == 'ok'
+        assert len(sleeps) == 3
+        assert all(0 <= delay <= ceiling for delay, ceiling in zip(sleeps, (1, 2, 3)))
+
+    def test_permanent_errors_are_raised(self):
+        """
+        GIVEN a call failing with a 400 error, and one always timing out
+        WHEN they are called through a policy of 3 attempts
+        THEN the 400 error is raised without retry
+        AND the timeout is raised after 3 attempts
+        """
+        sleeps = []
+        policy = RetryPolicy(max_attempts=3, sleep=sleeps.append)
+
+        def fail(error):
+            raise error
+
+        with pytest.raises(HttpError):
+            policy.call(fail, HttpError(400))
+        assert sleeps == []
+        with pytest.raises(TimeoutError):
+            policy.call(fail, TimeoutError())
+        assert len(sleeps) == 2
+
+    def test_error_classifiers(self):
+        """
+        GIVEN errors of destination clients
+        WHEN they are classified
+        THEN rate limits and connection errors are retryable
+        AND 413 errors and messages about the request size mean the payload is too large
+        """
+        assert is_retryable_error(HttpError(429)) and is_retryable_error(ConnectionResetError())
+        assert not is_retryable_error(HttpError(413)) and not is_retryable_error(ValueError('bad vector'))
+        assert is_payload_too_large_error(HttpError(413))
+        assert is_payload_too_large_error(PayloadTooLargeError())
+        assert is_payload_too_large_error(ValueError('Request size exceeds the maximum of 2MB'))
+        assert not is_payload_too_large_error(HttpError(503))
@@ -1,13 +1,17 @@
-from dat_core.connectors.destinations.vector_db_helpers.utils import create_chunks
+import threading
+import time
+import pytest
+from dat_core.connectors.destinations.retry import RetryPolicy
+from dat_core.connectors.destinations.vector_db_helpers.utils import create_chunks, map_chunks
 
 
 class TestDestination:
 
     def test_create_chunks(self, ):
         """
-        GIVEN a list of 1000 items
+        GIVEN a list of 112 items
         WHEN create_chunks is called with a batch_size of 100
-        THEN 10 chunks of 100 items are returned
+        THEN a chunk of 100 items and a last chunk of the 12 remaining items are returned
         """
         _chunk_cnt = 0
         input_list = list(range(112))
@@ -15,4 +19,56 @@ class TestDestination:
         for chunk in chunks:
             _chunk_cnt += 1
             print(f"Count {_chunk_cnt} - chunk: {chunk}")
-            assert len(chunk) == 100
+            assert len(chunk) == (100 if _chunk_cnt == 1 else 12)
+        assert _chunk_cnt == 2
+
+    def test_map_chunks_runs_chunks_in_parallel_in_order(self):
+        """
+        GIVEN 100 items and a worker taking longer on the first chunks, failing once on chunk 3
+        WHEN map_chunks is called with a batch_size of 10, 4 workers and retries
+        THEN the results are returned in the order of the chunks
+        AND at most 4 chunks were sent at the same time, and more than 1
+        AND the failed chunk was sent again
+        """
+        lock = threading.Lock()
+        running = []
+        max_running = []
+        failures = [3]
+
+        def send(chunk):
+            with lock:
+                running.append(chunk)
+                max_running.append(len(running))
+            try:
+                time.sleep(0.01 * (10 - chunk[0] // 10))
+                if failures and chunk[0] // 10 in failures:
+                    failures.pop()
+                    raise ConnectionError('connection reset')
+                return sum(chunk)
+            finally:
+                with lock:
+                    running.remove(chunk)
+
+        results = map_chunks(range(100), 10, send, max_workers=4, retry_policy=RetryPolicy(sleep=lambda _: None))
+        assert results == [sum(range(idx, idx + 10)) for idx in range(0, 100, 10)]
+        assert 1 < max(max_running) <= 4
+        assert failures == []
+
+    def test_map_chunks_stops_on_the_first_fatal_error(self):
+        """
+        GIVEN 1000 items and a worker failing on the second chunk
+        WHEN map_chunks is called with a batch_size of 10 and 2 workers
+        THEN the error is raised
+        AND the chunks after the window of chunks in flight are never sent
+        """
+        sent = []
+
+        def send(chunk):
+            sent.append(chunk[0])
+            if chunk[0] == 10:
+                raise ValueError('invalid vector')
+            time.sleep(0.01)
+
+        with pytest.raises(ValueError):
+            map_chunks(range(1000), 10, send, max_workers=2)
+        assert len(sent) < 10
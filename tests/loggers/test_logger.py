@@ -0,0 +1,54 @@
+import json
+from dat_core.loggers import logger
+from dat_core.loggers.backends import BufferedLogBackend, LogBackend
+from dat_core.pydantic_models import Level
+
+
+class CountingStr:
+
+    def __init__(self) -> None:
+        self.calls = 0
+
+    def __str__(self) -> str:
+        self.calls += 1
+        return 'value'
+
+
+class TestLogger:
+
+    def test_level_threshold_and_lazy_formatting(self, capsys):
+        """
+        GIVEN the logger with a minimum level of INFO
+        WHEN messages with arguments are logged at DEBUG and INFO
+        THEN only the INFO message is written
+        AND the arguments are only formatted for the INFO message
+        """
+        argument = CountingStr()
+        logger.set_level(Level.INFO)
+        try:
+            logger.debug('debug %s', argument)
+            logger.info('info %s', argument)
+        finally:
+            logger.set_level(Level.TRACE)
+
+        lines = capsys.readouterr().out.splitlines()
+        assert [json.loads(line)['log']['message'] for line in lines] == ['info value']
+        assert argument.calls == 1
+
+    def test_buffered_backend_flushes_on_fatal(self, capsys):
+        """
+        GIVEN the logger with the buffered backend
+        WHEN messages are logged, the last one at FATAL
+        THEN every message is written, in order, by the time fatal returns
+        """
+        logger.set_backend(BufferedLogBackend(max_queue_size=4, max_batch_size=3))
+        try:
+            for idx in range(10):
+                logger.info('message %d', idx)
+            logger.fatal('stopping')
+            lines = capsys.readouterr().out.splitlines()
+        finally:
+            logger.set_backend(LogBackend())
+
+        messages = [json.loads(line)['log']['message'] for line in lines]
+        assert messages == [f'message {idx}' for idx in range(10)] + ['stopping']
@@ -0,0 +1,141 @@
+import time
+from typing import Any, Dict, Iterator, Optional, Tuple
+from dat_core.connectors.destinations.data_processor import DataProcessor
+from dat_core.connectors.generators.base import GeneratorBase
+from dat_core.connectors.sources.base import _ReadMetrics
+from dat_core.metrics import MetricsRegistry, metrics
+from dat_core.pydantic_models import (
+    ConnectorSpecification,
+    DatCatalog,
+    DatDocumentStream,
+    DatMessage,
+    MetricType,
+    TraceType,
+    Type,
+)
+from conftest import InMemoryLoader, make_record_message
+
+
+class EchoGenerator(GeneratorBase):
+
+    def check_connection(self, config: ConnectorSpecification) -> Tuple[bool, Optional[Any]]:
+        return True, None
+
+    def generate(self, config: ConnectorSpecification, dat_message: DatMessage) -> Iterator[DatMessage]:
+        yield dat_message
+
+
+class SuperEchoGenerator(EchoGenerator):
+
+    def generate(self, config: ConnectorSpecification, dat_message: DatMessage) -> Iterator[DatMessage]:
+        yield from super().generate(config, dat_message)
+
+
+def metrics_by_name(trace: DatMessage, stream: str) -> Dict[str, Any]:
+    return {metric.name: metric for metric in trace.trace.metrics if metric.labels.get('stream') == stream}
+
+
+class TestMetricsRegistry:
+
+    def test_trace_message_snapshots_every_metric(self):
+        """
+        GIVEN a registry with a counter, a gauge and a histogram
+        WHEN a trace message is built
+        THEN it holds the counter total and rate, the gauge value and the histogram buckets
+        AND the same name and labels return the same metric
+        """
+        registry = MetricsRegistry(interval=60)
+        registry.counter('records', stream='a').inc(10)
+        assert registry.counter('records', stream='a').value == 10
+        registry.gauge('buffered', stream='a').set(3)
+        histogram = registry.histogram('latency', buckets=(0.1, 1.0), stream='a')
+        for value in (0.05, 0.5, 5.0):
+            histogram.observe(value)
+
+        trace = registry.trace_message()
+        assert trace.type == Type.TRACE and trace.trace.type == TraceType.METRICS
+        by_name = metrics_by_name(trace, 'a')
+        assert by_name['records'].type == MetricType.COUNTER
+        assert by_name['records'].value == 10 and by_name['records'].rate > 0
+        assert by_name['buffered'].value == 3
+        assert by_name['latency'].buckets == {'0.1': 1, '1.0': 2, '+Inf': 3}
+        assert (by_name['latency'].count, by_name['latency'].min, by_name['latency'].max) == (3, 0.05, 5.0)
+
+        # Nothing was counted since the previous snapshot
+        assert metrics_by_name(registry.trace_message(), 'a')['records'].rate == 0
+
+    def test_trace_messages_are_emitted_on_interval(self):
+        """
+        GIVEN registries with a short interval and with an interval of 0
+        WHEN trace messages are requested
+        THEN a periodic one is only returned once the interval elapsed
+        AND no trace message is ever returned with an interval of 0
+        """
+        registry = MetricsRegistry(interval=0.05)
+        registry.counter('records').inc()
+        assert registry.due_trace_message() is None
+        time.sleep(0.06)
+        assert registry.due_trace_message() is not None
+        assert registry.due_trace_message() is None
+
+        disabled = MetricsRegistry(interval=0)
+        disabled.counter('records').inc()
+        assert disabled.due_trace_message() is None and disabled.trace_message() is None
+
+
+class TestInstrumentation:
+
+    def test_data_processor_reports_loaded_records(self):
+        """
+        GIVEN 25 records of a stream and a batch size of 10
+        WHEN they are processed
+        THEN the last message is a TRACE with the number of loaded records
+        AND the latency of the 3 batches and their loads
+        """
+        stream = 'metered-destination'
+        catalog = DatCatalog(document_streams=[DatDocumentStream(name=stream, namespace='ns')])
+        messages = [make_record_message(stream, idx) for idx in range(25)]
+
+        output = list(DataProcessor(None, InMemoryLoader(), batch_size=10).processor(catalog, messages))
+
+        assert output[-1].type == Type.TRACE
+        by_name = metrics_by_name(output[-1], stream)
+        assert by_name['destination_records'].value == 25
+        assert by_name['destination_batch_seconds'].count == 3
+        assert by_name['loader_load_seconds'].count == 3
+
+    def test_generator_calls_are_counted_once(self):
+        """
+        GIVEN a generator whose generate calls its parent's generate
+        WHEN it generates records
+        THEN every call is counted and timed once
+        AND the output is unchanged
+        """
+        stream = 'metered-generator'
+        generator = SuperEchoGenerator()
+        messages = [make_record_message(stream, idx) for idx in range(3)]
+
+        output = [out for msg in messages for out in generator.generate(None, msg)]
+
+        assert output == messages
+        assert metrics.counter('generator_calls', stream=stream).value == 3
+        assert metrics.histogram('generator_seconds', stream=stream).count == 3
+
+    def test_source_bytes_are_utf8_bytes(self):
+        """
+        GIVEN a record and a record batch with non-ASCII document chunks
+        WHEN they are counted as read
+        THEN source_bytes holds the UTF-8 size of the chunks, not their length
+        """
+        stream = 'metered-source'
+        record = make_record_message(stream, 0)
+        record.record.data.document_chunk = 'café'
+        batch = DatMessage.as_record_batch([make_record_message(stream, idx) for idx in (1, 2)])
+        batch.record_batch.document_chunks = ['naïve', None]
+
+        read_metrics = _ReadMetrics()
+        read_metrics.observe(record)
+        read_metrics.observe(batch)
+
+        assert metrics.counter('source_records', stream=stream).value == 3
+        assert metrics.counter('source_bytes', stream=stream).value == len('café'.encode()) + len('naïve'.encode())
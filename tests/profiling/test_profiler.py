@@ -0,0 +1,122 @@
+import os
+import pstats
+import queue
+import threading
+import time
+from typing import List
+from dat_core.connectors.destinations.data_processor import DataProcessor
+from dat_core.profiling import PROFILE_DIR_ENV, PROFILE_ENV, StackSampler
+from dat_core.pydantic_models import (
+    DatCatalog,
+    DatDocumentMessage,
+    DatDocumentStream,
+    DatMessage,
+    DatStateMessage,
+    StreamState,
+    StreamStatus,
+    TraceType,
+    Type,
+)
+from conftest import InMemoryLoader, make_record_message
+
+
+class SlowLoader(InMemoryLoader):
+
+    def load(self, document_chunks: List[DatDocumentMessage], namespace: str, stream: str) -> None:
+        time.sleep(0.05)
+        super().load(document_chunks, namespace, stream)
+
+
+def make_messages(stream: DatDocumentStream, n_records: int) -> List[DatMessage]:
+    records = [make_record_message(stream.name, idx) for idx in range(n_records)]
+    completed = DatMessage(type=Type.STATE, state=DatStateMessage(
+        stream=stream, stream_state=StreamState(data={}, stream_status=StreamStatus.COMPLETED)))
+    return records + [completed]
+
+
+def process_with_profiling(mode: str, directory: str) -> List[DatMessage]:
+    stream = DatDocumentStream(name='docs', namespace='ns')
+    os.environ[PROFILE_ENV] = mode
+    os.environ[PROFILE_DIR_ENV] = directory
+    try:
+        processor = DataProcessor(None, SlowLoader(), batch_size=2)
+        return list(processor.processor(DatCatalog(document_streams=[stream]), make_messages(stream, 4)))
+    finally:
+        del os.environ[PROFILE_ENV]
+        del os.environ[PROFILE_DIR_ENV]
+
+
+def profile_traces(messages: List[DatMessage]) -> List[DatMessage]:
+    return [msg for msg in messages if msg.type == Type.TRACE and msg.trace.type == TraceType.PROFILE]
+
+
+class TestProfiling:
+
+    def test_sampling_profile_of_processor(self, tmp_path):
+        """
+        GIVEN the sampling profiling mode
+        WHEN records and a COMPLETED state are processed with a slow loader
+        THEN a PROFILE trace follows the COMPLETED state and the last message
+        AND the collapsed stacks written next to the run show the loader
+        """
+        messages = process_with_profiling('sampling', str(tmp_path))
+
+        traces = profile_traces(messages)
+        assert len(traces) == 2
+        assert traces[0].trace.profile.stream == 'docs' and traces[1].trace.profile.stream is None
+        profile = traces[-1].trace.profile
+        assert profile.name == 'write'
+        assert [os.path.basename(path) for path in profile.artifacts] == [f'dat-profile-write-{os.getpid()}.collapsed']
+        with open(profile.artifacts[0]) as _f:
+            stacks = _f.read()
+        assert '(load)' in stacks
+        assert any('(load)' in hot.function and hot.samples for hot in profile.hot_functions)
+
+    def test_cprofile_profile_of_processor(self, tmp_path):
+        """
+        GIVEN the cprofile profiling mode
+        WHEN records are processed
+        THEN a pstats file is written along with the collapsed stacks
+        AND the hot functions of the last PROFILE trace come with call counts and times
+        """
+        messages = process_with_profiling('cprofile', str(tmp_path))
+
+        profile = profile_traces(messages)[-1].trace.profile
+        assert [path.rsplit('.', 1)[1] for path in profile.artifacts] == ['collapsed', 'pstats']
+        stats = pstats.Stats(profile.artifacts[1])
+        assert any(function == 'load' for (_, _, function) in stats.stats)
+        assert all(hot.calls and hot.self_seconds is not None for hot in profile.hot_functions)
+
+    def test_idle_threads_are_left_out_of_hot_functions(self, tmp_path):
+        """
+        GIVEN a thread blocked on a queue and a thread doing work
+        WHEN their stacks are sampled
+        THEN the hot functions only list the working thread
+        AND the collapsed stacks still hold the idle thread
+        """
+        def busy(stop: threading.Event) -> None:
+            while not stop.is_set():
+                sum(range(1000))
+
+        stop = threading.Event()
+        idle_queue: queue.Queue = queue.Queue()
+        threads = [
+            threading.Thread(target=idle_queue.get, daemon=True),
+            threading.Thread(target=busy, args=(stop,), daemon=True),
+        ]
+        sampler = StackSampler(interval=0.001)
+        for thread in threads:
+            thread.start()
+        sampler.start()
+        time.sleep(0.1)
+        sampler.stop()
+        stop.set()
+        idle_queue.put(None)
+
+        hot_functions = [hot.function for hot in sampler.hot_functions()]
+        assert any('(busy)' in function for function in hot_functions)
+        assert not any('(wait)' in function or '(get)' in function for function in hot_functions)
+        path = str(tmp_path / 'stacks.collapsed')
+        sampler.write_collapsed(path)
+        with open(path) as _f:
+            assert '(wait)' in _f.read()
@@ -0,0 +1,137 @@
+import json
+import numpy as np
+from dat_core.pydantic_models import (
+    Data,
+    DatDocumentMessage,
+    DatDocumentStream,
+    DatMessage,
+    DatRecordBatchMessage,
+    StreamMetadata,
+    Type,
+    decode_vectors,
+    resolve_refs,
+)
+
+
+class TestResolveRefs:
+
+    def test_inlines_shared_and_recursive_refs(self):
+        """
+        GIVEN a schema referencing one definition twice and a recursive definition
+        WHEN resolve_refs is called
+        THEN the shared definition is inlined as a single object
+        AND the recursive reference is kept as a $ref
+        AND the input schema is left untouched
+        """
+        schema = {
+            '$defs': {
+                'Leaf': {'type': 'string'},
+                'Node': {'type': 'object', 'properties': {'child': {'$ref': '#/$defs/Node'}}},
+            },
+            'properties': {
+                'a': {'$ref': '#/$defs/Leaf'},
+                'b': {'$ref': '#/$defs/Leaf', 'default': None},
+                'tree': {'$ref': '#/$defs/Node'},
+            },
+        }
+        resolved = resolve_refs(schema)
+
+        assert resolved['properties']['a'] == {'type': 'string'}
+        assert resolved['properties']['a'] is resolved['properties']['b'] is resolved['$defs']['Leaf']
+        assert resolved['properties']['tree']['properties']['child'] == {'$ref': '#/$defs/Node'}
+        assert schema['properties']['a'] == {'$ref': '#/$defs/Leaf'}
+        assert resolve_refs(schema, merge_siblings=True)['properties']['b'] == {'type': 'string', 'default': None}
+
+
+class TestRecordBatch:
+
+    def test_round_trip_with_per_record_messages(self):
+        """
+        GIVEN record messages of one stream with vectors and extra metadata
+        WHEN they are packed into a RECORD_BATCH message, sent as JSON and split again
+        THEN the vectors are a 2-D float32 array
+        AND the records are the same as the original ones
+        """
+        messages = [
+            DatMessage(type=Type.RECORD, record=DatDocumentMessage(
+                namespace='ns',
+                stream=DatDocumentStream(name='docs'),
+                data=Data(
+                    document_chunk=f'chunk {idx}',
+                    vectors=[0.5, float(idx)],
+                    metadata=StreamMetadata(
+                        dat_source='src', dat_stream='docs', dat_run_id='run', dat_record_id=str(idx),
+                        **({'page': idx} if idx else {})),
+                ),
+                emitted_at=1.0,
+            ))
+            for idx in range(3)
+        ]
+        batch_message = DatMessage.as_record_batch(messages)
+        assert batch_message.type == Type.RECORD_BATCH
+        assert batch_message.record_batch.vectors.dtype == np.float32
+        assert batch_message.record_batch.vectors.shape == (3, 2)
+        assert batch_message.record_batch.metadata['page'] == [None, 1, 2]
+
+        received = DatMessage.model_validate_json(batch_message.model_dump_json())
+        assert [msg.model_dump(mode='json') for msg in received.record_batch.to_record_messages()] == \
+            [msg.model_dump(mode='json') for msg in messages]
+
+
+class TestVectors:
+
+    def test_vectors_are_numpy_arrays_encoded_in_base64(self):
+        """
+        GIVEN vectors given as a list of numbers and as a float16 array
+        WHEN they are set on Data and sent as JSON
+        THEN they are kept as float32 and float16 arrays
+        AND the JSON holds their little-endian bytes in base64
+        AND they decode back to the same arrays
+        """
+        as_list = Data(vectors=[0.25, -1.5, 3.0])
+        as_float16 = Data(vectors=np.array([0.5, 2.0], dtype=np.float16))
+        assert as_list.vectors.dtype == np.float32
+        assert as_float16.vectors.dtype == np.float16
+
+        for data in (as_list, as_float16):
+            encoded = data.model_dump(mode='json')['vectors']
+            assert encoded['dtype'] == data.vectors.dtype.name
+            assert isinstance(encoded['data'], str)
+            received = Data.model_validate_json(data.model_dump_json())
+            assert received.vectors.dtype == data.vectors.dtype
+            np.testing.assert_array_equal(received.vectors, data.vectors)
+
+        assert decode_vectors([[1.0, 2.0]], ndim=2).shape == (1, 2)
+
+    def test_models_with_vectors_compare_and_dump_to_python(self):
+        """
+        GIVEN records and record batches holding vectors
+        WHEN they are compared and dumped in python mode
+        THEN models with the same values are equal, whatever the way their vectors were given
+        AND models with other vectors or other fields are not
+        AND the dumps hold the vectors as lists and can be passed to json.dumps
+        """
+        def make_message(vectors, chunk='chunk'):
+            return DatMessage(type=Type.RECORD, record=DatDocumentMessage(
+                stream=DatDocumentStream(name='docs'),
+                data=Data(document_chunk=chunk, vectors=vectors),
+                emitted_at=1.0,
+            ))
+
+        message = make_message([0.25, -1.5])
+        assert message == make_message(np.array([0.25, -1.5], dtype=np.float32))
+        assert message != make_message([0.25, 1.5])
+        assert message != make_message([0.25, -1.5, 0.0])
+        assert message != make_message(None)
+        assert message != make_message([0.25, -1.5], chunk='other')
+
+        dumped = message.model_dump()
+        assert dumped['record']['data']['vectors'] == [0.25, -1.5]
+        assert json.loads(json.dumps(message.record.data.model_dump()))['vectors'] == [0.25, -1.5]
+
+        batch = DatRecordBatchMessage(
+            stream=DatDocumentStream(name='docs'), ids=['a'], document_chunks=['chunk'],
+            vectors=[[0.25, -1.5]], emitted_at=1.0)
+        assert batch == batch.model_copy(update={'vectors': np.array([[0.25, -1.5]], dtype=np.float32)})
+        assert batch != batch.model_copy(update={'vectors': np.array([[0.25, 1.5]], dtype=np.float32)})
+        assert json.loads(json.dumps(batch.model_dump()))['vectors'] == [[0.25, -1.5]]
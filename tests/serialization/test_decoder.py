@@ -0,0 +1,83 @@
+import io
+import pytest
+from dat_core.connectors.destinations.data_processor import DataProcessor
+from dat_core.pydantic_models import (
+    DatCatalog,
+    DatDocumentStream,
+    DatMessage,
+    DatStateMessage,
+    StreamState,
+    StreamStatus,
+    Type,
+)
+from dat_core.serialization import MessageDecoder, MessageWriter, WireFormat
+from conftest import InMemoryLoader, make_record_message
+
+
+class TestMessageDecoder:
+
+    @pytest.mark.parametrize('wire_format', list(WireFormat))
+    def test_malformed_messages_are_reported_and_skipped(self, wire_format):
+        """
+        GIVEN a stream with a malformed message between valid ones
+        WHEN it is decoded with a block size smaller than a message
+        THEN the valid messages are yielded in order
+        AND the malformed one is reported with its position
+        """
+        buffer = io.BytesIO()
+        writer = MessageWriter(buffer, wire_format)
+        writer.write(DatMessage.as_dat_log('first'))
+        if wire_format == WireFormat.JSON:
+            buffer.write(b'{"type": "RECORD", "record": \n\n')
+        else:
+            buffer.write(b'\x00\x00\x00\x02\xc1\xc1')
+        writer.write(DatMessage.as_dat_log('second'))
+        buffer.seek(0)
+
+        reported = []
+        decoder = MessageDecoder(block_size=16, on_error=reported.append)
+        messages = list(decoder.decode(buffer))
+
+        assert [msg.log.message for msg in messages] == ['first', 'second']
+        assert [malformed.position for malformed in reported] == [2]
+        assert decoder.n_malformed == 1
+
+
+class TestLazyDatMessage:
+
+    def test_state_messages_pass_through_without_validation(self):
+        """
+        GIVEN a JSON stream with a STATE and a RECORD message decoded lazily
+        WHEN the messages go through the DataProcessor and are written back
+        THEN the STATE message is never validated and is re-emitted verbatim
+        AND the RECORD message is validated when it is loaded
+        """
+        stream = DatDocumentStream(name='docs', namespace='ns')
+        state = DatMessage(type=Type.STATE, state=DatStateMessage(
+            stream=stream,
+            stream_state=StreamState(data={'cursor': 1}, stream_status=StreamStatus.COMPLETED),
+        ))
+        record = make_record_message('docs', 0)
+        buffer = io.BytesIO()
+        writer = MessageWriter(buffer, WireFormat.JSON)
+        writer.write(record)
+        writer.write(state)
+        state_line = buffer.getvalue().splitlines()[1]
+        buffer.seek(0)
+
+        messages = list(MessageDecoder(lazy=True).decode(buffer))
+        assert [msg.type for msg in messages] == [Type.RECORD, Type.STATE]
+        assert not any(msg.is_materialized for msg in messages)
+
+        loader = InMemoryLoader()
+        catalog = DatCatalog(document_streams=[stream])
+        output = [msg for msg in DataProcessor(None, loader, batch_size=10).processor(catalog, messages)
+                  if msg.type != Type.TRACE]
+        assert loader.loaded == [['docs-0']]
+        assert messages[0].is_materialized
+        assert output == [messages[1]] and not output[0].is_materialized
+
+        out = io.BytesIO()
+        MessageWriter(out, WireFormat.JSON).write(output[0])
+        assert out.getvalue() == state_line + b'\n'
+        assert output[0].state.stream_state.stream_status == StreamStatus.COMPLETED
@@ -0,0 +1,49 @@
+import io
+import numpy as np
+import pytest
+from dat_core.pydantic_models import (
+    Data,
+    DatDocumentMessage,
+    DatDocumentStream,
+    DatMessage,
+    StreamMetadata,
+    Type,
+)
+from dat_core.serialization import MSGPACK_HEADER, MessageWriter, WireFormat, read_messages
+
+
+def make_messages():
+    record = DatMessage(type=Type.RECORD, record=DatDocumentMessage(
+        namespace='ns',
+        stream=DatDocumentStream(name='docs'),
+        data=Data(
+            document_chunk='chunk',
+            vectors=np.array([0.5, -2.0, 3.25], dtype=np.float16),
+            metadata=StreamMetadata(dat_source='src', dat_stream='docs', dat_run_id='run', dat_record_id='1'),
+        ),
+    ))
+    return [DatMessage.as_dat_log('starting', level='INFO'), record]
+
+
+class TestWireFormat:
+
+    @pytest.mark.parametrize('wire_format', list(WireFormat))
+    def test_round_trip_with_format_detection(self, wire_format):
+        """
+        GIVEN a log and a record message with float16 vectors
+        WHEN they are written in a wire format and read back
+        THEN the reader detects the format from the first bytes
+        AND the messages and the vectors are unchanged
+        """
+        messages = make_messages()
+        buffer = io.BytesIO()
+        writer = MessageWriter(buffer, wire_format)
+        for message in messages:
+            writer.write(message)
+
+        assert buffer.getvalue().startswith(MSGPACK_HEADER) == (wire_format == WireFormat.MSGPACK)
+        buffer.seek(0)
+        received = list(read_messages(buffer))
+        assert [msg.model_dump(mode='json') for msg in received] == \
+            [msg.model_dump(mode='json') for msg in messages]
+        assert received[1].record.data.vectors.dtype == np.float16
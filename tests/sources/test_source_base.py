@@ -0,0 +1,476 @@
+import asyncio
+import time
+from typing import Any, Generator, List, Mapping
+from dat_core.connectors.sources.base import SourceBase, PARTITIONS_STATE_KEY
+from dat_core.connectors.sources.stream import Stream
+from dat_core.connectors.sources.async_stream import AsyncStream
+from dat_core.connectors.sources.checkpoint import CheckpointPolicy, StateCheckpointer
+from dat_core.connectors.schema_cache import SchemaCache, schema_cache_key
+from dat_core.pydantic_models import (
+    ConnectorSpecification,
+    DatCatalog,
+    DatDocumentMessage,
+    DatDocumentStream,
+    DatMessage,
+    Data,
+    ReadSyncMode,
+    StreamMetadata,
+    StreamState,
+    StreamStatus,
+    Type,
+)
+
+
+def make_record(stream_name: str, idx: int) -> DatMessage:
+    return DatMessage(
+        type=Type.RECORD,
+        record=DatDocumentMessage(
+            stream=DatDocumentStream(name=stream_name),
+            data=Data(
+                document_chunk=f'{stream_name} chunk {idx}',
+                metadata=StreamMetadata(
+                    dat_source='test_source',
+                    dat_stream=stream_name,
+                    dat_record_id=str(idx),
+                    dat_run_id='run',
+                    dat_last_modified=idx,
+                ),
+            ),
+        ),
+    )
+
+
+class SlowStream(Stream):
+    _n_records = 5
+    _delay = 0.02
+
+    def __init__(self, name: str) -> None:
+        self._name = name
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    def read_records(self, catalog: DatCatalog, configured_stream: DatDocumentStream,
+                     cursor_value: Any = None) -> Generator[DatMessage, Any, Any]:
+        for idx in range(self._n_records):
+            time.sleep(self._delay)
+            yield make_record(self.name, idx)
+
+
+class AsyncSlowStream(AsyncStream):
+    _n_records = 5
+    _delay = 0.02
+
+    def __init__(self, name: str) -> None:
+        self._name = name
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    async def read_records(self, catalog: DatCatalog, configured_stream: DatDocumentStream,
+                           cursor_value: Any = None):
+        for idx in range(self._n_records):
+            await asyncio.sleep(self._delay)
+            yield make_record(self.name, idx)
+
+
+class PartitionedStream(Stream):
+    _name = 'tickets'
+    _default_cursor = 'dat_last_modified'
+    _max_concurrent_partitions = 3
+    _state_checkpoint_interval = 2
+
+    def read_records(self, catalog, configured_stream, cursor_value=None):
+        raise NotImplementedError()
+
+    def partitions(self, configured_stream, cursor_value=None):
+        return [{'start': start, 'end': start + 10} for start in (0, 10, 20)]
+
+    def read_partition_records(self, catalog, configured_stream, partition, cursor_value=None):
+        start = partition['start'] if cursor_value is None else cursor_value + 1
+        for idx in range(start, partition['end']):
+            yield make_record(self.name, idx)
+
+
+class IncrementalStream(SlowStream):
+    _default_cursor = 'dat_last_modified'
+    _n_records = 50
+    _delay = 0
+    _state_checkpoint_interval = 20
+    _state_checkpoint_seconds = None
+
+
+class BatchIncrementalStream(IncrementalStream):
+    _n_records = 25
+    _batch_size = 10
+    _state_checkpoint_interval = 10
+
+    def _get_metadata_constants(self):
+        return {'dat_source': 'test_source', 'dat_stream': self.name, 'dat_run_id': 'run'}
+
+    def read_records(self, catalog, configured_stream, cursor_value=None):
+        # Cursors start at 1, a chunk without dat_last_modified is stamped with the current time
+        start = 1 if cursor_value is None else cursor_value + 1
+        for batch_start in range(start, self._n_records + 1, self._batch_size):
+            yield self.as_record_batch_message(configured_stream, [
+                {
+                    'data_entity': f'doc-{idx}',
+                    'doc_chunk': f'{self.name} chunk {idx}',
+                    'dat_last_modified': idx,
+                    'extra_metadata': {'dat_record_id': str(idx)},
+                }
+                for idx in range(batch_start, min(batch_start + self._batch_size, self._n_records + 1))
+            ])
+
+
+class DummySource(SourceBase):
+    _stream_names = ['first', 'second', 'third', 'fourth']
+
+    def check_connection(self, config):
+        return True, None
+
+    def streams(self, config: Mapping[str, Any], json_schemas=None) -> List[Stream]:
+        return [SlowStream(name) for name in self._stream_names]
+
+
+class PartitionedSource(DummySource):
+
+    def streams(self, config: Mapping[str, Any], json_schemas=None) -> List[Stream]:
+        return [PartitionedStream()]
+
+
+class IncrementalSource(DummySource):
+
+    def streams(self, config: Mapping[str, Any], json_schemas=None) -> List[Stream]:
+        return [IncrementalStream('events')]
+
+
+class BatchIncrementalSource(DummySource):
+
+    def streams(self, config: Mapping[str, Any], json_schemas=None) -> List[Stream]:
+        return [BatchIncrementalStream('events')]
+
+
+class AsyncDummySource(DummySource):
+
+    def streams(self, config: Mapping[str, Any], json_schemas=None) -> List[Stream]:
+        return [AsyncSlowStream(name) for name in self._stream_names]
+
+
+def make_catalog(names: List[str], read_sync_mode=ReadSyncMode.FULL_REFRESH) -> DatCatalog:
+    return DatCatalog(document_streams=[
+        DatDocumentStream(name=name, read_sync_mode=read_sync_mode) for name in names
+    ])
+
+
+def make_config() -> ConnectorSpecification:
+    return ConnectorSpecification(
+        name='dummy', module_name='dummy', connection_specification={'dat_name': 'dummy'})
+
+
+def without_traces(messages: List[DatMessage]) -> List[DatMessage]:
+    return [msg for msg in messages if msg.type != Type.TRACE]
+
+
+def messages_per_stream(messages: List[DatMessage]) -> Mapping[str, List[DatMessage]]:
+    per_stream = {}
+    for msg in messages:
+        name = msg.state.stream.name if msg.type == Type.STATE else msg.record.stream.name
+        per_stream.setdefault(name, []).append(msg)
+    return per_stream
+
+
+class TestSourceBaseRead:
+
+    def test_concurrent_read_keeps_per_stream_order(self):
+        """
+        GIVEN a source with 4 slow streams and 4 read workers
+        WHEN read is called
+        THEN every stream is read in less time than a sequential read would take
+        AND each stream keeps its STARTED, records, COMPLETED ordering
+        """
+        source = DummySource()
+        source._max_concurrent_streams = 4
+        source._concurrent_read_queue_size = 2
+        _start = time.monotonic()
+        messages = without_traces(list(source.read(make_config(), make_catalog(DummySource._stream_names))))
+        elapsed = time.monotonic() - _start
+
+        sequential_time = len(DummySource._stream_names) * SlowStream._n_records * SlowStream._delay
+        assert elapsed < sequential_time
+        per_stream = messages_per_stream(messages)
+        assert set(per_stream) == set(DummySource._stream_names)
+        for name, stream_messages in per_stream.items():
+            statuses = [m.state.stream_state.stream_status for m in stream_messages if m.type == Type.STATE]
+            assert statuses[0] == StreamStatus.STARTED
+            assert statuses[-1] == StreamStatus.COMPLETED
+            chunks = [m.record.data.document_chunk for m in stream_messages if m.type == Type.RECORD]
+            assert chunks == [f'{name} chunk {idx}' for idx in range(SlowStream._n_records)]
+
+    def test_sequential_read_is_default(self):
+        """
+        GIVEN a source with default settings
+        WHEN read is called
+        THEN streams are read one after another in catalog order
+        """
+        messages = without_traces(list(DummySource().read(make_config(), make_catalog(DummySource._stream_names))))
+        names = []
+        for msg in messages:
+            name = msg.state.stream.name if msg.type == Type.STATE else msg.record.stream.name
+            if not names or names[-1] != name:
+                names.append(name)
+        assert names == DummySource._stream_names
+
+    def test_aread_async_streams_concurrently(self):
+        """
+        GIVEN a source with 4 async streams and a concurrency of 4
+        WHEN aread is consumed on an event loop
+        THEN the streams overlap in time
+        AND each stream keeps its STARTED, records, COMPLETED ordering
+        """
+        source = AsyncDummySource()
+        source._max_concurrent_streams = 4
+
+        async def consume():
+            return without_traces([msg async for msg in source.aread(make_config(), make_catalog(DummySource._stream_names))])
+
+        _start = time.monotonic()
+        messages = asyncio.run(consume())
+        elapsed = time.monotonic() - _start
+
+        assert elapsed < len(DummySource._stream_names) * AsyncSlowStream._n_records * AsyncSlowStream._delay
+        for name, stream_messages in messages_per_stream(messages).items():
+            assert stream_messages[0].state.stream_state.stream_status == StreamStatus.STARTED
+            assert stream_messages[-1].state.stream_state.stream_status == StreamStatus.COMPLETED
+            chunks = [m.record.data.document_chunk for m in stream_messages if m.type == Type.RECORD]
+            assert chunks == [f'{name} chunk {idx}' for idx in range(AsyncSlowStream._n_records)]
+
+    def test_read_bridges_async_streams(self):
+        """
+        GIVEN a source with async streams
+        WHEN the synchronous read is called
+        THEN it yields the same messages as aread
+        """
+        source = AsyncDummySource()
+
+        async def consume():
+            return without_traces([msg async for msg in source.aread(make_config(), make_catalog(DummySource._stream_names))])
+
+        sync_messages = without_traces(list(source.read(make_config(), make_catalog(DummySource._stream_names))))
+        async_messages = asyncio.run(consume())
+        strip = lambda msgs: [(m.type, m.state.stream_state.stream_status if m.state else m.record.data.document_chunk)
+                              for m in msgs]
+        assert strip(sync_messages) == strip(async_messages)
+
+    def test_partitioned_read_resumes_unfinished_partitions(self):
+        """
+        GIVEN a stream with 3 partitions of 10 records each
+        AND a state where the first partition is completed and the second stopped at record 14
+        WHEN read is called incrementally
+        THEN only records 15-29 are read
+        AND the COMPLETED state holds the maximum cursor without the partitions
+        """
+        stream = PartitionedStream()
+        state_data = {
+            PARTITIONS_STATE_KEY: {
+                stream.partition_key({'start': 0, 'end': 10}): {'cursor': 9, 'completed': True},
+                stream.partition_key({'start': 10, 'end': 20}): {'cursor': 14, 'completed': False},
+            }
+        }
+        catalog = make_catalog(['tickets'], read_sync_mode=ReadSyncMode.INCREMENTAL)
+        messages = without_traces(list(PartitionedSource().read(
+            make_config(), catalog, state={'tickets': StreamState(data=state_data)})))
+
+        record_ids = sorted(int(m.record.data.metadata.dat_record_id) for m in messages if m.type == Type.RECORD)
+        assert record_ids == list(range(15, 30))
+        running = [m.state.stream_state.data for m in messages
+                   if m.type == Type.STATE and m.state.stream_state.stream_status == StreamStatus.RUNNING]
+        assert all(v['completed'] for v in running[-1][PARTITIONS_STATE_KEY].values())
+        completed = messages[-1].state.stream_state
+        assert completed.stream_status == StreamStatus.COMPLETED
+        assert completed.data == {'dat_last_modified': 29}
+
+    def test_incremental_read_checkpoints_on_record_interval(self):
+        """
+        GIVEN an incremental stream of 50 records with a changing cursor and a record interval of 20
+        WHEN read is called
+        THEN a RUNNING state without cursor is emitted before the first record
+        AND RUNNING states are emitted after records 20 and 40 only
+        AND the COMPLETED state holds the cursor of the last record
+        """
+        catalog = make_catalog(['events'], read_sync_mode=ReadSyncMode.INCREMENTAL)
+        messages = without_traces(list(IncrementalSource().read(make_config(), catalog)))
+
+        running = [m.state.stream_state.data for m in messages
+                   if m.type == Type.STATE and m.state.stream_state.stream_status == StreamStatus.RUNNING]
+        assert running == [{}, {'dat_last_modified': 19}, {'dat_last_modified': 39}]
+        assert messages[1].type == Type.STATE and messages[2].type == Type.RECORD
+        assert messages[-1].state.stream_state.data == {'dat_last_modified': 49}
+
+    def test_incremental_read_honors_the_cursor_hooks_of_streams(self):
+        """
+        GIVEN incremental streams resuming from cursor 5, one with out of order cursors,
+            one with cursors the same per ten records and one deciding its own checkpoints
+        WHEN read is called
+        THEN the first RUNNING state holds the cursor the read resumed from
+        AND no checkpoint passes a cursor that may still arrive out of order
+        AND no checkpoint repeats a cursor the same as the previous one
+        AND the streams overriding _should_checkpoint_state decide when to checkpoint
+        """
+        class ShuffledStream(IncrementalStream):
+            _n_records = 6
+            _state_checkpoint_interval = 1
+            _cursor_out_of_order_window = 2
+
+            def read_records(self, catalog, configured_stream, cursor_value=None):
+                for idx in (7, 6, 9, 8, 10, 11):
+                    yield make_record(self.name, idx)
+
+        class TensStream(ShuffledStream):
+            _n_records = 30
+            _cursor_out_of_order_window = 0
+
+            def read_records(self, catalog, configured_stream, cursor_value=None):
+                for idx in range(cursor_value + 1, self._n_records):
+                    yield make_record(self.name, idx)
+
+            def _compare_cursor_values(self, old_cursor_value, current_cursor_value):
+                return old_cursor_value // 10 == current_cursor_value // 10
+
+        class LegacyStream(TensStream):
+
+            def _should_checkpoint_state(self, cursor_field, stream_state, record, _record_count):
+                return _record_count in (3, 13)
+
+        class HookSource(DummySource):
+
+            def streams(self, config, json_schemas=None):
+                return [ShuffledStream('shuffled'), TensStream('tens'), LegacyStream('legacy')]
+
+        catalog = make_catalog(['shuffled', 'tens', 'legacy'], read_sync_mode=ReadSyncMode.INCREMENTAL)
+        state = {name: StreamState(data={'dat_last_modified': 5}, stream_status=StreamStatus.COMPLETED)
+                 for name in ('shuffled', 'tens', 'legacy')}
+        messages = without_traces(list(HookSource().read(make_config(), catalog, state=state)))
+        running = {}
+        for msg in messages:
+            if msg.type == Type.STATE and msg.state.stream_state.stream_status == StreamStatus.RUNNING:
+                running.setdefault(msg.state.stream.name, []).append(msg.state.stream_state.data['dat_last_modified'])
+        assert running == {'shuffled': [5, 6, 8, 10], 'tens': [5, 10, 20], 'legacy': [5, 8, 18]}
+
+
+    def test_incremental_read_of_record_batches(self):
+        """
+        GIVEN an incremental stream yielding its 25 records in batches of 10 with a record interval of 10
+        WHEN read and aread are called, then read again from the COMPLETED state
+        THEN every record of a batch counts towards the record interval and the cursor
+        AND the COMPLETED state holds the largest cursor of the last batch
+        AND the next read resumes after it
+        """
+        catalog = make_catalog(['events'], read_sync_mode=ReadSyncMode.INCREMENTAL)
+
+        async def aread():
+            return [msg async for msg in BatchIncrementalSource().aread(make_config(), catalog)]
+
+        for messages in (list(BatchIncrementalSource().read(make_config(), catalog)), asyncio.run(aread())):
+            messages = without_traces(messages)
+            batches = [m.record_batch for m in messages if m.type == Type.RECORD_BATCH]
+            assert [len(batch) for batch in batches] == [10, 10, 5]
+            states = [m.state.stream_state for m in messages if m.type == Type.STATE]
+            assert [state.stream_status for state in states][-2:] == [StreamStatus.RUNNING, StreamStatus.COMPLETED]
+            # Checkpointed after the second batch, holding records 11 to 20
+            assert states[-2].data == {'dat_last_modified': 20}
+            assert states[-1].data == {'dat_last_modified': 25}
+
+        resumed = without_traces(list(BatchIncrementalSource().read(
+            make_config(), catalog, state={'events': states[-1]})))
+        assert not [m for m in resumed if m.type == Type.RECORD_BATCH]
+
+
+class TestStateCheckpointer:
+
+    def test_typed_cursor_with_out_of_order_window(self):
+        """
+        GIVEN ISO 8601 cursors arriving at most 2 records late
+        WHEN they are observed with an out of order window of 2
+        THEN the checkpointed cursor never passes a cursor that may still arrive
+        """
+        checkpointer = StateCheckpointer(CheckpointPolicy(record_interval=1), out_of_order_window=2)
+        cursors = ['2024-01-02T00:00:00', '2024-01-01T00:00:00+00:00', '2024-01-03T00:00:00Z', '2024-01-04']
+        checkpoints = []
+        for cursor in cursors:
+            checkpointer.observe(cursor)
+            if checkpointer.should_checkpoint():
+                checkpoints.append(checkpointer.checkpoint())
+        assert checkpoints == ['2024-01-01T00:00:00+00:00', '2024-01-03T00:00:00Z']
+        assert checkpointer.max_cursor == '2024-01-04'
+
+
+class TestSchemaCache:
+
+    def test_discover_is_cached_and_can_be_precomputed(self, tmp_path):
+        """
+        GIVEN a source whose catalog schema was written with write_schema_cache
+        WHEN the cache is cleared, loaded from that directory and discover is called twice
+        THEN the schema is served from the cache
+        AND modifying a returned schema does not affect the next call
+        """
+        source = DummySource()
+        expected = source.discover(None)
+        source.write_schema_cache(str(tmp_path))
+
+        cache = SchemaCache()
+        cache.load(str(tmp_path))
+        key = schema_cache_key('catalog', DatCatalog)
+        build_calls = []
+        first = cache.get_or_build(key, lambda: build_calls.append(1))
+        first['properties'].clear()
+        assert cache.get_or_build(key, lambda: build_calls.append(1)) == expected
+        assert not build_calls
+
+
+class TestRecordMessages:
+
+    def test_bulk_records_match_single_records(self):
+        """
+        GIVEN a stream with its config set
+        WHEN records are built one by one and in bulk
+        THEN both give the same messages and share the stream model
+        """
+        stream = SlowStream('chunks')
+        stream._config = make_config()
+        configured_stream = DatDocumentStream(name='chunks', namespace='ns')
+        chunks = [
+            {'doc_chunk': f'chunk {idx}', 'data_entity': 'file.txt', 'dat_last_modified': idx,
+             'extra_metadata': {'dat_record_id': str(idx)}}
+            for idx in range(3)
+        ]
+        single = [stream.as_record_message(configured_stream, **chunk) for chunk in chunks]
+        bulk = stream.as_record_messages(configured_stream, chunks)
+        exclude = {'record': {'emitted_at'}}
+        assert [msg.model_dump(exclude=exclude) for msg in bulk] == \
+            [msg.model_dump(exclude=exclude) for msg in single]
+        assert bulk[0].record.data.metadata.dat_stream == 'chunks'
+        assert bulk[0].record.namespace == 'ns'
+        assert bulk[0].record.stream is bulk[-1].record.stream
+
+    def test_record_batch_matches_single_records(self):
+        """
+        GIVEN a stream with its config set
+        WHEN chunks are turned into a RECORD_BATCH message
+        THEN splitting it gives the messages built one by one
+        """
+        stream = SlowStream('chunks')
+        stream._config = make_config()
+        configured_stream = DatDocumentStream(name='chunks', namespace='ns')
+        chunks = [
+            {'doc_chunk': f'chunk {idx}', 'data_entity': 'file.txt', 'dat_last_modified': idx,
+             'extra_metadata': {'dat_record_id': str(idx)}}
+            for idx in range(3)
+        ]
+        batch = stream.as_record_batch_message(configured_stream, chunks)
+        assert batch.type == Type.RECORD_BATCH
+        exclude = {'record': {'emitted_at'}}
+        assert [msg.model_dump(exclude=exclude) for msg in batch.record_batch.to_record_messages()] == \
+            [stream.as_record_message(configured_stream, **chunk).model_dump(exclude=exclude) for chunk in chunks]